@@ -6,10 +6,8 @@
 # - Exporta PDF simples com o plano diário
 # - Integra com Supabase (plano, follow up, medidas, diário, jejum)
 
-import io
 from datetime import datetime, date
 import streamlit as st
-import pandas as pd
 from pathlib import Path
 
 st.set_page_config(
@@ -40,22 +38,37 @@ from helpers import (
     set_nav,
     splash_once,
     render_onboarding,
-    apply_theme, get_meal_plan_for_target,
+    apply_theme, get_meal_plan_for_target, get_meal_plans_near,
     is_user_coaching,
-    render_auth_gate
+    is_user_coach,
+    render_auth_gate,
+    db_user_rows, db_insert_row, db_insert_rows, db_delete_row,
+    lazy_import, module_available,
 )
+from services.fasting import (
+    PROTOCOLS as FASTING_PROTOCOLS,
+    refresh_history as fasting_refresh_history,
+    record_inserted as fasting_record_inserted,
+    current_fast as fasting_current_fast,
+    current_streak as fasting_current_streak,
+    weekly_compliance as fasting_weekly_compliance,
+    week_start as fasting_week_start,
+    history_table as fasting_history_table,
+)
+from services.water import load_water_ml, set_water_ml, flush_water, water_history
+from services.tracing import begin_rerun, end_rerun
+from services.fanout import Reads, fan_out
+from services.profiling import section
 
 apply_theme()
+begin_rerun("app")
 splash_once()
 
-# Reportlab (PDF export)
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+# pandas só carrega quando uma aba realmente monta DataFrame
+pd = lazy_import("pandas")
+
+# Reportlab (PDF export) — importado só ao gerar o PDF
+REPORTLAB_AVAILABLE = module_available("reportlab")
 
 
 # -------------------------------------------------------
@@ -92,25 +105,44 @@ def grams_from_gkg(peso, p_gkg, f_gkg, kcal_alvo):
     return prot_g, carb_g, gord_g, kcal_rest
 
 
-def gerar_pdf_bytes(resumo: dict) -> bytes:
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    story.append(Paragraph("Plano Diário", styles["Title"]))
-    story.append(Spacer(1, 12))
-    for k, v in resumo.items():
-        story.append(Paragraph(f"{k}: {v}", styles["Normal"]))
-    doc.build(story)
-    pdf = buf.getvalue()
-    buf.close()
-    return pdf
+def exportar_pdf_plano(resumo: dict, nome_pdf: str):
+    """Botão de download do PDF do plano. O PDF vem do cache (hash do
+       resumo) ou é gerado em segundo plano sem bloquear o script; um
+       fragmento consulta o resultado e, quando fica pronto, reexecuta a
+       página uma vez. Nesse rerun "Calcular" não está pressionado: o
+       botão vem do último plano guardado em st.session_state["_plano_pdf"]."""
+    from services.pdf_export import plan_pdf
+
+    pdf_bytes, status = plan_pdf(resumo)
+    if status == "gerando":
+        _aguardar_pdf_plano(resumo, nome_pdf)
+    else:
+        _botao_pdf_plano(pdf_bytes, status, nome_pdf)
+
+
+@st.fragment(run_every=0.5)
+def _aguardar_pdf_plano(resumo: dict, nome_pdf: str):
+    from services.pdf_export import plan_pdf
+
+    _, status = plan_pdf(resumo, wait=0.0)
+    if status == "gerando":
+        st.button("⏳ Gerando PDF…", disabled=True, key="btn_pdf_gerando")
+    else:
+        st.rerun()      # para o run_every: o rerun completo já encontra o PDF no cache
+
+
+def _botao_pdf_plano(pdf_bytes, status: str, nome_pdf: str):
+    if status == "ok":
+        st.download_button("📄 Baixar PDF", data=pdf_bytes, file_name=nome_pdf, mime="application/pdf")
+    else:
+        st.error("Não foi possível gerar o PDF agora. Tente calcular novamente em instantes.")
 
 
 # -------------------------------------------------------
 # Render principal
-def render_app_calorias():
+def render_app_calorias(leituras: Reads | None = None):
     st.subheader("🍽️ Calorias & Macros")
+    leituras = leituras or Reads()      # pré-carregadas pelo roteador
 
     session = st.session_state.get("sb_session")
     uid = session.user.id if session else None
@@ -122,7 +154,7 @@ def render_app_calorias():
     # =====================================================
     # ABA PLANO DIÁRIO
     # =====================================================
-    with aba_plano:
+    with aba_plano, section("aba:plano"):
         with st.form("dados_basicos_plano"):
             st.subheader("1) Dados básicos")
             col1, col2 = st.columns(2)
@@ -208,6 +240,8 @@ def render_app_calorias():
             st.session_state["prot_g"] = float(prot_g)
             st.session_state["carb_g"] = float(carb_g)
             st.session_state["gord_g"] = float(gord_g)
+            st.session_state["sexo_rda"] = "F" if sexo == "Feminino" else "M"
+            st.session_state["idade_rda"] = int(idade)
 
             st.subheader("Resultados")
             m1, m2, m3 = st.columns(3)
@@ -253,9 +287,9 @@ def render_app_calorias():
                     "agua_l": round(agua / 1000, 2),
                     "avisos": avisos,
                 }
-                pdf_bytes = gerar_pdf_bytes(resumo)
                 nome_pdf = f"Plano_Diario_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf"
-                st.download_button("📄 Baixar PDF", data=pdf_bytes, file_name=nome_pdf, mime="application/pdf")
+                st.session_state["_plano_pdf"] = (resumo, nome_pdf)   # sobrevive ao rerun do poller
+                exportar_pdf_plano(resumo, nome_pdf)
             else:
                 st.info("Para exportar PDF, instale **reportlab** (`pip install reportlab`).")
     
@@ -293,47 +327,107 @@ def render_app_calorias():
                         st.caption("Você ainda não tem planos salvos.")
                 except Exception as e:
                     st.warning(f"Não foi possível listar planos: {e}")
+        elif REPORTLAB_AVAILABLE and st.session_state.get("_plano_pdf"):
+            st.write("**Exportar** (último plano calculado)")
+            exportar_pdf_plano(*st.session_state["_plano_pdf"])
         else:
             st.info(
                 "Preencha os dados e clique em **Calcular** para ver resultados e liberar a exportação em PDF."
             ) 
 
-            # === [Sugestão de Cardápio] ===
-            st.divider()
-            st.subheader("Sugestão de Cardápio")
-
-            if "kcal_alvo" in locals():  # só roda se kcal_alvo já foi calculado
-                uid = st.session_state.get("user_id")
-                plan_id = st.session_state.get("plan_id", "FREE")
-
-                cardapio = get_meal_plan_for_target(round(kcal_alvo))
-
-                if cardapio:
-                    if plan_id == "FREE":
-                        st.info("Exemplo gratuito de cardápio (upgrade para ver todos).")
-                        st.write(f"**{cardapio['titulo']}** — {cardapio['kcal_alvo']} kcal")
-                        st.json(cardapio["refeicoes"])  # exemplo simples
-                    else:  # PRO
-                        st.success("Seu cardápio premium baseado no cálculo:")
-                        st.write(f"**{cardapio['titulo']}** — {cardapio['kcal_alvo']} kcal")
-                        for refeicao in cardapio["refeicoes"]:
-                            st.markdown(f"**{refeicao['nome']}**")
-                            for item in refeicao["itens"]:
-                                st.write(f"- {item}")
-                else:
-                    st.warning("Nenhum cardápio correspondente cadastrado ainda.")
+        # === [Sugestão de Cardápio] ===
+        st.divider()
+        st.subheader("Sugestão de Cardápio")
+
+        kcal_sugestao = st.session_state.get("kcal_alvo")   # salvo no último "Calcular"
+        if kcal_sugestao:
+            plan_id = st.session_state.get("plan_id", "FREE")
+
+            if plan_id == "FREE":
+                cardapio = get_meal_plan_for_target(round(kcal_sugestao))
             else:
-                st.caption("⚠️ Calcule seus macros primeiro para ver um cardápio sugerido.")
+                opcoes = get_meal_plans_near(round(kcal_sugestao), k=3)
+                cardapio = opcoes[0] if opcoes else None
+                if len(opcoes) > 1:
+                    escolha = st.radio(
+                        "Opções próximas do seu alvo",
+                        range(len(opcoes)),
+                        format_func=lambda i: f"{opcoes[i]['titulo']} — {opcoes[i]['kcal_alvo']} kcal",
+                        horizontal=True,
+                        key="cardapio_opcao",
+                    )
+                    cardapio = opcoes[escolha]
+
+            if cardapio:
+                if plan_id == "FREE":
+                    st.info("Exemplo gratuito de cardápio (upgrade para ver todos).")
+                    st.write(f"**{cardapio['titulo']}** — {cardapio['kcal_alvo']} kcal")
+                    st.json(cardapio["refeicoes"])  # exemplo simples
+                else:  # PRO
+                    st.success("Seu cardápio premium baseado no cálculo:")
+                    st.write(f"**{cardapio['titulo']}** — {cardapio['kcal_alvo']} kcal")
+                    for refeicao in cardapio["refeicoes"]:
+                        st.markdown(f"**{refeicao['nome']}**")
+                        for item in refeicao["itens"]:
+                            st.write(f"- {item}")
+            else:
+                st.warning("Nenhum cardápio correspondente cadastrado ainda.")
+
+            # === [Cardápio montado com as receitas do app] ===
+            st.markdown("#### 🧮 Montar cardápio com as receitas do app")
+            is_pro = plan_id == "PRO"
+            col_g1, col_g2 = st.columns([1, 1])
+            with col_g1:
+                dias_gerador = st.selectbox(
+                    "Dias do cardápio", [1, 3, 7] if is_pro else [1], key="gerador_dias",
+                    help=None if is_pro else "Cardápios de vários dias no plano PRO.",
+                )
+            with col_g2:
+                st.write("")
+                if st.button("🎲 Gerar cardápio", key="btn_gerar_cardapio", use_container_width=True):
+                    st.session_state["gerador_seed"] = int(datetime.now().timestamp() * 1000) % 2**31
+
+            seed_gerador = st.session_state.get("gerador_seed")
+            if seed_gerador is not None:
+                from services.recipe_catalog import get_recipe_catalog
+                from services.meal_generator import generate_plan, plan_rows
+
+                catalogo = get_recipe_catalog()
+                metas = (
+                    kcal_sugestao,
+                    st.session_state.get("prot_g") or 0.0,
+                    st.session_state.get("carb_g") or 0.0,
+                    st.session_state.get("gord_g") or 0.0,
+                )
+                with section("gerador_cardapio"):
+                    plano_gerado = generate_plan(catalogo, metas, days=dias_gerador, seed=seed_gerador)
+                if not plano_gerado:
+                    st.warning("Não há receitas suficientes no catálogo para montar um cardápio.")
+                for i, dia in enumerate(plano_gerado, start=1):
+                    kcal_t, p_t, c_t, g_t = dia.totals
+                    st.caption(
+                        (f"Dia {i} • " if len(plano_gerado) > 1 else "")
+                        + f"{kcal_t:,.0f} kcal • P {p_t:.0f} g • C {c_t:.0f} g • G {g_t:.0f} g"
+                        + ("" if dia.within_tolerance else " • ⚠️ fora da tolerância (catálogo limitado)")
+                    )
+                    st.dataframe(
+                        plan_rows(catalogo, dia, locked=None if is_pro else ~catalogo.free),
+                        hide_index=True, use_container_width=True,
+                    )
+                if plano_gerado and not is_pro:
+                    st.info("🔒 Assine o PRO para ver todas as receitas e montar cardápios da semana.")
+        else:
+            st.caption("⚠️ Calcule seus macros primeiro para ver um cardápio sugerido.")
 
 
-    with aba_diario:
+    with aba_diario, section("aba:diario"):
         st.subheader("⏳ Jejum intermitente")
 
         session = st.session_state.get("sb_session")
         if session:
             uid = session.user.id
 
-            fasting_on = st.checkbox("Ativar jejum intermitente")
+            fasting_on = st.checkbox("Ativar jejum intermitente", key="jejum_ativo")
 
             if fasting_on:
                 colj1, colj2 = st.columns(2)
@@ -342,48 +436,53 @@ def render_app_calorias():
                 with colj2:
                     end_time = st.time_input("Fim do jejum (opcional)", value=None)
 
-                if st.button("Salvar jejum", key="btn_salvar_jejum"):
+                if st.button("Salvar jejum", key="btn_salvar_jejum", on_click=_marcar_gravacao):
                     import datetime as dt
 
                     today = dt.date.today()
                     start_dt = dt.datetime.combine(today, start_time)
                     end_dt = dt.datetime.combine(today, end_time) if end_time else None
                     try:
-                        supabase.table("fasting_log").insert(
-                            {
+                        novo_jejum = db_insert_rows(
+                            "fasting_log",
+                            [{
                                 "user_id": uid,
                                 "start_time": start_dt.isoformat(),
                                 "end_time": end_dt.isoformat() if end_dt else None,
-                            }
-                        ).execute()
+                            }],
+                        )
+                        fasting_record_inserted(uid, novo_jejum)
                         st.success("Jejum salvo!")
                     except Exception as e:
                         st.error(f"Erro ao salvar jejum: {e}")
 
                 st.markdown("### Histórico de jejuns")
                 try:
-                    resp = (
-                        supabase.table("fasting_log")
-                        .select("*")
-                        .eq("user_id", uid)
-                        .order("start_time", desc=True)
-                        .limit(10)
-                        .execute()
-                    )
-                    rows = resp.data or []
-                    if rows:
-                        import pandas as pd
-
-                        df = pd.DataFrame(rows)
-                        df["start_time"] = pd.to_datetime(df["start_time"])
-                        df["end_time"] = pd.to_datetime(df["end_time"])
-                        df["duração (h)"] = (
-                            (df["end_time"] - df["start_time"]).dt.total_seconds() / 3600
-                        ).round(1)
-                        st.dataframe(
-                            df[["start_time", "end_time", "duração (h)"]],
-                            use_container_width=True,
+                    hist = leituras.take("jejum", lambda: fasting_refresh_history(uid), ["fasting_log"])
+                    if hist.fasts:
+                        meta_jejum = st.selectbox(
+                            "Meta de protocolo", [p for p, _ in FASTING_PROTOCOLS][::-1], index=1,
+                            key="fasting_target",
+                        )
+                        atual = fasting_current_fast(hist)
+                        cj1, cj2, cj3 = st.columns(3)
+                        if atual:
+                            horas = atual.duration_h(datetime.now())
+                            cj1.metric("Jejum atual", f"{horas:.1f} h", help=f"Desde {atual.start:%d/%m %H:%M}")
+                        else:
+                            cj1.metric("Jejum atual", "—")
+                        cj2.metric("Sequência", f"{fasting_current_streak(hist, meta_jejum)} dia(s)")
+                        semanas = fasting_weekly_compliance(hist, meta_jejum)
+                        da_semana = semanas.loc[semanas["semana"] == fasting_week_start(datetime.now().date()), "adesao_pct"]
+                        cj3.metric(
+                            "Adesão da semana",
+                            f"{da_semana.iloc[0]:.0f}%" if not da_semana.empty else "—",
                         )
+
+                        st.dataframe(fasting_history_table(hist, limit=10), use_container_width=True)
+                        if len(semanas) > 1:
+                            st.caption("Adesão semanal (%)")
+                            st.bar_chart(semanas.set_index("semana")["adesao_pct"], height=180)
                     else:
                         st.caption("Nenhum jejum registrado ainda.")
                 except Exception as e:
@@ -418,7 +517,7 @@ def render_app_calorias():
             # Seleção de data
             col_d1, col_d2 = st.columns([1, 2])
             with col_d1:
-                ref_date = st.date_input("Data", value=datetime.today().date())
+                ref_date = st.date_input("Data", value=datetime.today().date(), key="diario_data")
             with col_d2:
                 st.caption("Atalho por dia da semana")
                 dia_semana = st.radio(
@@ -458,11 +557,14 @@ def render_app_calorias():
 
             # 💧 Controle de Água no Diário
             # ============================
-            # 💧 Água (MVP simples: somente sessão, sem banco/histórico)
+            # 💧 Água: persistida em water_log com gravação agrupada (debounce)
             COPOS_ML = 250
 
-            if "agua_ml" not in st.session_state:
-                st.session_state.agua_ml = 0
+            agua_key = (uid, str(ref_date))
+            if st.session_state.get("agua_key") != agua_key:
+                st.session_state.agua_ml = load_water_ml(uid, ref_date)
+                st.session_state.agua_key = agua_key
+            agua_antes = st.session_state.agua_ml
 
             peso_user = st.session_state.get("ob_w", 70)  # do onboarding, se existir
             meta_ml = int(peso_user * 35) if peso_user else 2000
@@ -488,10 +590,22 @@ def render_app_calorias():
                 if valor != st.session_state.agua_ml:
                     st.session_state.agua_ml = valor
 
+            if st.session_state.agua_ml != agua_antes:
+                set_water_ml(uid, ref_date, st.session_state.agua_ml)
+
             pct = st.session_state.agua_ml / meta_ml if meta_ml else 0
             st.progress(min(1.0, pct))
             st.caption(f"Meta diária: {meta_ml} ml")
 
+            with st.expander("📈 Histórico de água (30 dias)"):
+                try:
+                    serie_agua = water_history(uid, days=30)
+                    if ref_date in serie_agua.index:
+                        serie_agua[ref_date] = st.session_state.agua_ml
+                    st.bar_chart(serie_agua, height=200)
+                except Exception as e:
+                    st.caption(f"Histórico indisponível: {e}")
+
             st.divider()
 
             # ===== Alimento rápido (offline) =====
@@ -518,7 +632,7 @@ def render_app_calorias():
             with colq3:
                 meal_q = st.selectbox("Refeição", ["Café da manhã","Almoço","Jantar","Lanche","Pré-treino","Pós-treino","Outra"], index=1)
 
-            if st.button("➕ Adicionar alimento rápido", key="btn_add_alimento_rapido"):
+            if st.button("➕ Adicionar alimento rápido", key="btn_add_alimento_rapido", on_click=_marcar_gravacao):
                 info = _LOCAL_DB.get(food_q)
                 factor = grams_q / 100.0
                 kcal_q = info["kcal"] * factor
@@ -628,7 +742,7 @@ def render_app_calorias():
                                     }
                                 )
                             if rows_to_insert:
-                                supabase.table("food_diary").insert(rows_to_insert).execute()
+                                db_insert_rows("food_diary", rows_to_insert)
                                 tot_k = float((df_ai["Kcal"].fillna(0)).sum())
                                 tot_p = float((df_ai["Prot (g)"].fillna(0)).sum())
                                 tot_c = float((df_ai["Carb (g)"].fillna(0)).sum())
@@ -669,7 +783,7 @@ def render_app_calorias():
                     c3.metric("Carb (g)", f"{tot_c:,.0f}")
                     c4.metric("Gord (g)", f"{tot_f:,.0f}")
 
-                    if st.button("✅ Adicionar itens ao diário (esta data)", key="btn_add_itens_diario"):
+                    if st.button("✅ Adicionar itens ao diário (esta data)", key="btn_add_itens_diario", on_click=_marcar_gravacao):
                         try:
                             rows_to_insert = []
                             for _, r in edited.iterrows():
@@ -688,7 +802,7 @@ def render_app_calorias():
                                     }
                                 )
                             if rows_to_insert:
-                                supabase.table("food_diary").insert(rows_to_insert).execute()
+                                db_insert_rows("food_diary", rows_to_insert)
                                 st.success("Itens adicionados ao diário! Role a página para ver a listagem do dia.")
                         except Exception as e:
                             st.error(f"Erro ao salvar no diário: {e}")
@@ -790,7 +904,7 @@ def render_app_calorias():
                     key="meal_photo",
                 )
 
-                add_meal = st.form_submit_button("➕ Adicionar refeição")
+                add_meal = st.form_submit_button("➕ Adicionar refeição", on_click=_marcar_gravacao)
 
             # ===== SALVAR =====
             if add_meal:
@@ -820,7 +934,8 @@ def render_app_calorias():
                     st.warning(f"Falha ao subir a foto do prato: {e}")
 
                 try:
-                    supabase.table("food_diary").insert(
+                    db_insert_row(
+                        "food_diary",
                         {
                             "user_id": uid,
                             "ref_date": str(ref_date),
@@ -832,23 +947,15 @@ def render_app_calorias():
                             "carbs_g": float(carbs_g) if carbs_g else None,
                             "fat_g": float(fat_g) if fat_g else None,
                             "photo_path": photo_path,
-                        }
-                    ).execute()
+                        },
+                    )
                     st.success("Refeição adicionada!")
                 except Exception as e:
                     st.error(f"Erro ao salvar refeição: {e}")
 
             # ===== LISTAGEM =====
             try:
-                resp = (
-                    supabase.table("food_diary")
-                    .select("*")
-                    .eq("user_id", uid)
-                    .eq("ref_date", str(ref_date))
-                    .order("created_at", desc=False)
-                    .execute()
-                )
-                rows = resp.data or []
+                rows = leituras.take(f"diario:{ref_date}", lambda: _diario_do_dia(uid, ref_date), ["food_diary"])
             except Exception as e:
                 rows = []
                 st.error(f"Erro ao carregar diário: {e}")
@@ -897,6 +1004,82 @@ def render_app_calorias():
                         text=f"Gordura: {int(total_f)}/{int(f_meta)} g",
                     )
 
+                    # === [O que cabe no que falta hoje] ===
+                    from services.recipe_catalog import get_recipe_catalog
+                    from services.recipe_recommender import (
+                        MIN_KCAL_LEFT, recommend, recommendation_rows, remaining_macros,
+                    )
+
+                    saldo = remaining_macros(
+                        (kcal_meta, p_meta, c_meta, f_meta), (total_kcal, total_p, total_c, total_f)
+                    )
+                    st.markdown("#### 🍽️ O que cabe no que falta hoje")
+                    if saldo[0] < MIN_KCAL_LEFT:
+                        st.caption("Meta de kcal do dia atingida. 🎯")
+                    else:
+                        st.caption(
+                            f"Faltam {saldo[0]:,.0f} kcal • P {saldo[1]:.0f} g • C {saldo[2]:.0f} g • G {saldo[3]:.0f} g"
+                        )
+                        catalogo = get_recipe_catalog()
+                        is_pro_diario = st.session_state.get("plan_id") == "PRO"
+                        with section("recomendador"):
+                            recs = recommend(catalogo, saldo, k=5, pool=None if is_pro_diario else catalogo.free)
+                        if recs:
+                            st.dataframe(
+                                recommendation_rows(catalogo, recs), hide_index=True, use_container_width=True,
+                            )
+                            c_sug1, c_sug2 = st.columns([3, 1])
+                            with c_sug1:
+                                sug = st.selectbox(
+                                    "Registrar uma sugestão", recs, key="sug_diario",
+                                    format_func=lambda r: f"{catalogo.titles[r.index]} — {r.portions:g} porção(ões)",
+                                    label_visibility="collapsed",
+                                )
+                            with c_sug2:
+                                if st.button("➕ Registrar", key="btn_registrar_sugestao", use_container_width=True, on_click=_marcar_gravacao):
+                                    k_s, p_s, c_s, g_s = sug.macros
+                                    try:
+                                        db_insert_row("food_diary", {
+                                            "user_id": uid, "ref_date": str(ref_date), "meal_type": "Outra",
+                                            "description": catalogo.titles[sug.index], "qty_g": None,
+                                            "kcal": round(k_s, 1), "protein_g": round(p_s, 1),
+                                            "carbs_g": round(c_s, 1), "fat_g": round(g_s, 1), "photo_path": None,
+                                        })
+                                    except Exception as e:
+                                        st.error(f"Erro ao registrar: {e}")
+                                    else:
+                                        st.rerun()
+                        if not is_pro_diario:
+                            st.caption("🔒 No plano PRO a sugestão considera todas as receitas do app.")
+
+                # === [Micronutrientes do dia vs RDA] ===
+                # recalcula só quando muda a data, o diário ou sexo/idade da RDA (não a cada rerun)
+                sexo_rda = st.session_state.get("sexo_rda", "M")
+                idade_rda = st.session_state.get("idade_rda", 30)
+                chave_micros = (
+                    uid, str(ref_date), sexo_rda, idade_rda,
+                    tuple((r.get("id"), r.get("kcal")) for r in rows),
+                )
+                cache_micros = st.session_state.get("_micros_dia")
+                if not cache_micros or cache_micros[0] != chave_micros:
+                    from services.micronutrients import daily_micros
+
+                    with section("micros_dia"):
+                        cache_micros = (chave_micros, daily_micros(rows, sexo_rda, idade_rda))
+                    st.session_state["_micros_dia"] = cache_micros
+                micros_dia = cache_micros[1]
+                with st.expander(f"🧪 Micronutrientes do dia ({micros_dia.resolved}/{micros_dia.items} itens com composição)"):
+                    if not micros_dia.resolved:
+                        st.caption("Nenhum item do dia corresponde a uma receita do app (a composição vem das receitas).")
+                    for m in micros_dia.rows:
+                        if m["pct"] is None:
+                            st.write(f"- {m['nutriente']}: {m['total']:.1f} {m['unidade']}")
+                        else:
+                            st.progress(
+                                min(m["pct"] / 100.0, 1.0),
+                                text=f"{m['nutriente']}: {m['total']:.1f}/{m['rda']:g} {m['unidade']} ({m['pct']:.0f}% da RDA)",
+                            )
+
                 st.markdown("### Refeições")
                 show_df = df[
                     [
@@ -961,18 +1144,16 @@ def render_app_calorias():
                         sel = st.selectbox(
                             "Selecione para apagar", ids, format_func=lambda x: x[1]
                         )
-                        if st.button("🗑️ Apagar selecionado", key="btn_apagar_selecionado"):
+                        if st.button("🗑️ Apagar selecionado", key="btn_apagar_selecionado", on_click=_marcar_gravacao):
                             try:
-                                supabase.table("food_diary").delete().eq(
-                                    "id", sel[0]
-                                ).execute()
+                                db_delete_row("food_diary", sel[0])
                                 st.success(
                                     "Apagado. Atualize a página para ver a lista atualizada."
                                 )
                             except Exception as e:
                                 st.error(f"Erro ao apagar: {e}")
 
-    with aba_dash:
+    with aba_dash, section("aba:dashboard"):
         st.subheader("📈 Evolução do peso corporal")
 
         session = st.session_state.get("sb_session")
@@ -987,13 +1168,15 @@ def render_app_calorias():
             with col_p1:
                 new_weight = st.number_input("Peso atual (kg)", min_value=30.0, max_value=300.0, step=0.1)
             with col_p2:
-                if st.button("💾 Salvar peso", key="btn_salvar_peso"):
+                if st.button("💾 Salvar peso", key="btn_salvar_peso", on_click=_marcar_gravacao):
                     try:
-                        supabase.table("weight_logs").insert({
+                        db_insert_row("weight_logs", {
                             "user_id": uid,
                             "ref_date": str(date.today()),
                             "weight_kg": float(new_weight)
-                        }).execute()
+                        })
+                        from services.body_composition import invalidate_body_composition
+                        invalidate_body_composition(uid)
                         st.success("Peso registrado com sucesso!")
                         if add_points(uid, "add_weight", event_key=str(date.today())):
                             award_badge(uid, "Primeiro peso registrado")
@@ -1006,15 +1189,7 @@ def render_app_calorias():
 
             # === Histórico de pesos ===
             try:
-                resp = (
-                    supabase.table("weight_logs")
-                    .select("ref_date, weight_kg")
-                    .eq("user_id", uid)
-                    .order("ref_date", desc=False)
-                    .execute()
-                )
-
-                rows = resp.data or []
+                rows = leituras.take("pesos", lambda: _historico_pesos(uid), ["weight_logs"])
                 if not rows:
                     st.caption("Ainda não há pesos registrados.")
                 else:
@@ -1064,16 +1239,58 @@ def render_app_calorias():
 # (não precisa definir render_receitas/render_perfil se usa multipage com switch_page)
 
 # --- Roteador (ÚNICO) ---
+def _perfil(uid: str) -> dict:
+    resp = supabase.table("profiles").select("*").eq("id", uid).single().execute()
+    return resp.data or {}
+
+def _diario_do_dia(uid: str, ref_date) -> list:
+    return db_user_rows(
+        "food_diary", uid,
+        filters=[("eq", "ref_date", str(ref_date))],
+        order="created_at",
+    )
+
+def _historico_pesos(uid: str) -> list:
+    return db_user_rows("weight_logs", uid, order="ref_date", columns="ref_date, weight_kg")
+
+def _marcar_gravacao():
+    """on_click dos botões que gravam no diário/peso/jejum: o rerun deles
+       não pré-carrega (a gravação invalidaria o que o fan-out leu)."""
+    st.session_state["_rerun_grava"] = True
+
+def _leituras_do_rerun(uid: str, nav: str, pre: Reads) -> Reads:
+    """Leituras independentes do rerun (coaching, pontos e, na tela do
+       app, diário do dia, pesos e jejuns) disparadas juntas; as que o
+       preload (splash/login) já trouxe vêm de `pre`."""
+    if st.session_state.pop("_rerun_grava", False):
+        return Reads()                  # cada take() lê na hora, já depois da gravação
+    tarefas = {
+        "coaching": lambda: is_user_coaching(uid),
+        "pontos": lambda: get_points(uid),
+    }
+    if nav not in ("conquistas", "home", "follow"):
+        dia = st.session_state.get("diario_data") or datetime.today().date()
+        tarefas[f"diario:{dia}"] = lambda: _diario_do_dia(uid, dia)
+        tarefas["pesos"] = lambda: _historico_pesos(uid)
+        if st.session_state.get("jejum_ativo"):
+            tarefas["jejum"] = lambda: fasting_refresh_history(uid)
+    tarefas = {k: (lambda k=k, fn=fn: pre.take(k, fn)) for k, fn in tarefas.items()}
+    return fan_out(tarefas, "router")
+
 def render_logout():
     if st.button("Sair", type="secondary", use_container_width=True):
+        flush_water(st.session_state.get("user_id"))
+        from services.write_queue import get_write_queue
+        get_write_queue().flush(timeout=3.0)   # grava pendências com o JWT antes do sign_out
         try:
             from helpers import supabase
             supabase.auth.sign_out()
         except Exception:
             pass
+        supabase.drop_current()        # libera o cliente desta sessão no pool
 
         # limpa sessão mas mantém email salvo (se existir)
-        for k in ["sb_session", "user_id", "user_email", "plan_id", "plan_name", "plan_inicio", "plan_fim"]:
+        for k in ["sb_session", "user_id", "user_email", "plan_id", "plan_name", "plan_inicio", "plan_fim", "_onboarding_ok", "_plano_pdf"]:
             st.session_state.pop(k, None)
 
         st.success("Sessão encerrada.")
@@ -1085,12 +1302,14 @@ def render_router():
     if not session:
         # 🔒 Se o usuário pediu login, mantenha a tela aberta
         if st.session_state.get("show_login"):
-            render_auth_gate()
+            with section("router:login"):
+                render_auth_gate()
             st.stop()
 
         # Se o onboarding foi iniciado, continue nele
         if st.session_state.get("onboarding_started"):
-            render_onboarding(uid=None, profile={})
+            with section("router:onboarding"):
+                render_onboarding(uid=None, profile={})
             return
 
         # Tela inicial com design melhorado
@@ -1197,34 +1416,43 @@ def render_router():
     except Exception:
         uid = None
 
-    # 🔹 Checa onboarding
-    try:
-        resp = supabase.table("profiles").select("*").eq("id", uid).single().execute()
-        profile = resp.data or {}
-    except Exception:
-        profile = {}
-
-    if not profile.get("onboarding_done"):
-        render_onboarding(uid, profile)
-        st.stop()
-
     # 🔹 define nav
     nav = st.session_state.get("nav", "app")
 
+    # 🔹 leituras já feitas pelo preload (splash/login), se houver
+    pre = st.session_state.pop("_preload", None) or Reads()
+
+    # 🔹 Checa onboarding (antes de disparar as leituras do app; uma vez por usuário)
+    if st.session_state.get("_onboarding_ok") != uid:
+        try:
+            profile = pre.take("perfil", lambda: _perfil(uid), ["profiles"])
+        except Exception:
+            profile = {}
+
+        if not profile.get("onboarding_done"):
+            with section("router:onboarding"):
+                render_onboarding(uid, profile)
+            st.stop()
+        st.session_state["_onboarding_ok"] = uid
+
+    leituras = _leituras_do_rerun(uid, nav, pre)
+
     # 🔹 controla visibilidade das abas
-    coaching = is_user_coaching(uid)
-
-    if nav == "conquistas":
-        render_conquistas()
-    elif nav == "home":
-        st.subheader("Bem-vindo!")
-        st.write("Escolha uma opção no menu lateral para começar.")
-    elif nav == "app":
-        render_app_calorias()
-    elif nav == "follow" and coaching:   # só pacientes ativos veem
-        render_followup()
-    else:
-        render_app_calorias()
+    coaching = leituras.take("coaching", lambda: is_user_coaching(uid), ["profiles"])
+
+    with section(f"router:{nav}"):
+        if nav == "conquistas":
+            render_conquistas()
+        elif nav == "home":
+            st.subheader("Bem-vindo!")
+            st.write("Escolha uma opção no menu lateral para começar.")
+        elif nav == "app":
+            render_app_calorias(leituras)
+        elif nav == "follow" and coaching:   # só pacientes ativos veem
+            render_followup()
+        else:
+            render_app_calorias(leituras)
+    return leituras
 
 def render_conquistas():
     st.header("🏆 Conquistas")
@@ -1266,7 +1494,7 @@ def render_conquistas():
     )
 
 # >>> PONTO DE ENTRADA DA UI <<<
-render_router()
+leituras = render_router() or Reads()
 
 # --- Sidebar enxuta (pode ficar aqui) ---
 st.sidebar.title("📋 Menu")
@@ -1278,12 +1506,14 @@ st.sidebar.page_link("pages/05_Perfil_Conta.py", label="👤 Perfil / Conta")
 uid = st.session_state.get("user_id")
 if uid and is_user_coaching(uid):
     st.sidebar.page_link("pages/07_Follow_Up.py", label="📊 Check-in Semanal")
+if uid and is_user_coach(st.session_state.get("user_email")):
+    st.sidebar.page_link("pages/08_Coach.py", label="🧑‍⚕️ Painel do Coach")
 
 session_cur = st.session_state.get("sb_session")
 if session_cur:
     uid = session_cur.user.id
     try:
-        points_row = get_points(uid)
+        points_row = leituras.take("pontos", lambda: get_points(uid), ["user_points"])
         pts = points_row.get("points", 0)
         st.sidebar.markdown('<div class="sb-title">💰 FC (Fitness Coin)</div>', unsafe_allow_html=True)
         if st.sidebar.button(f"Saldo: {pts} FC", key="sb_points_btn", use_container_width=True):
@@ -1294,8 +1524,10 @@ if session_cur:
     st.sidebar.header("Atalhos")
     st.sidebar.button("🍽️ Ir para App", key="sb_go_app", on_click=lambda: set_nav("app"), use_container_width=True)
     if st.sidebar.button("🧾 Ir para Receitas", key="sb_go_rec", use_container_width=True):
+        flush_water(uid)
         st.switch_page("pages/06_Receitas.py")
     if st.sidebar.button("👤 Ir para Perfil", key="sb_go_prof", use_container_width=True):
+        flush_water(uid)
         st.switch_page("pages/05_Perfil_Conta.py")
 else:
     st.sidebar.empty()
@@ -1308,24 +1540,4 @@ if session_cur:
 else:
     st.sidebar.info("Não há usuário logado.")
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+end_rerun()
@@ -0,0 +1,105 @@
+# bench/bench_import.py
+# -------------------------------------------------------------
+# Benchmark do importador de histórico (services/history_import.py)
+# - Gera um CSV sintético no formato do MyFitnessPal (N linhas) e um de
+#   balança, importa no backend em memória e mede linhas/s e idas ao
+#   backend (InstrumentedClient)
+# - Reimporta o mesmo arquivo: tudo deve cair na deduplicação
+# - Sai com código 1 se passar de --max-sec ou se a reimportação gravar algo:
+#
+#   python bench/bench_import.py --rows 50000 --latency-ms 40
+# -------------------------------------------------------------
+import argparse
+import io
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from bench_reruns import _setup_backend
+from seed_data import BENCH_UID
+
+MEALS = ("Breakfast", "Lunch", "Dinner", "Snacks")
+
+
+class _Upload(io.BytesIO):
+    """Imita o UploadedFile do Streamlit (tem .size)."""
+
+    @property
+    def size(self) -> int:
+        return len(self.getbuffer())
+
+
+def mfp_csv(rows: int, seed: int = 7) -> bytes:
+    rnd = random.Random(seed)
+    out = ["Date,Meal,Calories,Fat (g),Carbohydrates (g),Protein (g),Sodium (mg)"]
+    start = date.today() - timedelta(days=rows // len(MEALS) + 1)
+    for i in range(rows):
+        d = start + timedelta(days=i // len(MEALS))
+        out.append(
+            f"{d},{MEALS[i % len(MEALS)]},{rnd.randint(150, 900)},{rnd.randint(2, 40)},"
+            f"{rnd.randint(10, 120)},{rnd.randint(5, 60)},{rnd.randint(50, 1500)}"
+        )
+    return "\n".join(out).encode("utf-8")
+
+
+def scale_csv(days: int, seed: int = 7) -> bytes:
+    rnd = random.Random(seed)
+    out = ["Time of Measurement;Weight(kg);BMI;Body Fat(%)"]
+    start = date.today() - timedelta(days=days)
+    w = 92.0
+    for i in range(days):
+        w += rnd.uniform(-0.3, 0.25)
+        out.append(f"{(start + timedelta(days=i)):%d/%m/%Y} 07:{rnd.randint(0, 59):02d};{w:.1f}".replace(".", ",") + ";27;25")
+    return "\n".join(out).encode("utf-8")
+
+
+def run(name: str, data: bytes, batch_size: int):
+    from services.db_instrument import count_calls
+    from services.history_import import import_history
+
+    t0 = time.perf_counter()
+    with count_calls() as calls:
+        res = import_history(_Upload(data), BENCH_UID, batch_size=batch_size)
+    sec = time.perf_counter() - t0
+    print(
+        f"{name:<24} lidas={res.read:>7} inseridas={res.total_inserted:>7} dup={res.duplicates:>7} "
+        f"inválidas={res.invalid:>5} falhas={res.failed:>3} chamadas={calls.total:>4} "
+        f"{sec:6.2f}s ({res.read / sec if sec else 0:,.0f} linhas/s)"
+    )
+    return res, sec
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark do importador de histórico.")
+    ap.add_argument("--rows", type=int, default=50000, help="linhas do CSV do MyFitnessPal")
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--latency-ms", type=float, default=40.0, help="latência simulada por requisição")
+    ap.add_argument("--max-sec", type=float, default=30.0, help="limite para a 1ª importação")
+    args = ap.parse_args()
+
+    _setup_backend(args.latency_ms, days=30, recipes=5)
+    mfp = mfp_csv(args.rows)
+    scale = scale_csv(730)
+
+    first, sec = run("MyFitnessPal", mfp, args.batch_size)
+    again, _ = run("MyFitnessPal (de novo)", mfp, args.batch_size)
+    run("Balança", scale, args.batch_size)
+
+    failed = False
+    if sec > args.max_sec:
+        print(f"✗ importação levou {sec:.1f}s (limite {args.max_sec:.0f}s)")
+        failed = True
+    if again.total_inserted:
+        print(f"✗ reimportação gravou {again.total_inserted} linha(s): deduplicação falhou")
+        failed = True
+    if first.failed:
+        print(f"✗ {first.failed} linha(s) não gravadas")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("Importação OK.")
+
+
+if __name__ == "__main__":
+    main()
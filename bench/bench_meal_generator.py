@@ -0,0 +1,64 @@
+# bench/bench_meal_generator.py
+# -------------------------------------------------------------
+# Benchmark do gerador de cardápio (services/meal_generator.py)
+# - Catálogo sintético (seed_data) com N receitas; gera cardápios de 1
+#   dia para metas variadas e uma semana, medindo o tempo por dia
+# - Sai com código 1 se a média por dia passar de --max-ms ou se algum
+#   dia ficar fora da tolerância de macros:
+#
+#   python bench/bench_meal_generator.py --recipes 3000 --max-ms 200
+# -------------------------------------------------------------
+import argparse
+import random
+import sys
+import time
+
+from bench_reruns import _setup_backend
+from seed_data import build_seed
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark do gerador de cardápio.")
+    ap.add_argument("--recipes", type=int, default=3000)
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--max-ms", type=float, default=200.0, help="limite da média por dia")
+    args = ap.parse_args()
+
+    _setup_backend(0.0, days=1, recipes=5)
+    from services.meal_generator import generate_plan
+    from services.recipe_catalog import build_catalog
+
+    catalog = build_catalog(build_seed(days=1, recipes=args.recipes)["recipes"])
+    rnd = random.Random(1)
+    times, off = [], 0
+    for i in range(args.runs):
+        kcal = rnd.uniform(1500, 3000)
+        target = (kcal, kcal * 0.25 / 4, kcal * 0.50 / 4, kcal * 0.25 / 9)
+        t0 = time.perf_counter()
+        day = generate_plan(catalog, target, days=1, seed=i)[0]
+        times.append((time.perf_counter() - t0) * 1000)
+        off += not day.within_tolerance
+    t0 = time.perf_counter()
+    week = generate_plan(catalog, target, days=7, seed=99)
+    week_ms = (time.perf_counter() - t0) * 1000
+    unique = len({m.index for d in week for m in d.meals})
+    meals = sum(len(d.meals) for d in week)
+
+    avg = sum(times) / len(times)
+    print(f"{len(catalog)} receitas • {args.runs} dias: média {avg:.1f} ms, máx {max(times):.1f} ms, fora da tolerância {off}")
+    print(f"semana: {week_ms:.0f} ms, {unique} receitas distintas em {meals} refeições")
+
+    failed = False
+    if avg > args.max_ms:
+        print(f"✗ média de {avg:.0f} ms por dia (limite {args.max_ms:.0f} ms)")
+        failed = True
+    if off:
+        print(f"✗ {off} dia(s) fora da tolerância")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("Gerador OK.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# bench/bench_reruns.py
+# -------------------------------------------------------------
+# Benchmark de reruns por página (Streamlit AppTest, sem navegador)
+# - Backend: cliente Supabase em memória (SUPABASE_BACKEND=memory),
+#   semeado com bench/seed_data.py e latência simulada por chamada
+# - Interações: login, adicionar refeição, trocar data do diário,
+#   receitas com busca/filtro, salvar follow-up
+# - Por rerun: tempo de parede, nº de chamadas ao backend, bytes
+#   enviados/recebidos e quebra por tabela/operação
+# - Gera um JSON estável para comparar entre commits:
+#
+#   python bench/bench_reruns.py --out bench_report.json
+#   python bench/bench_reruns.py --baseline bench_report_main.json
+# -------------------------------------------------------------
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from seed_data import BENCH_EMAIL, BENCH_PASSWORD, build_seed  # noqa: E402
+
+SESSION_KEYS = ("sb_session", "user_id", "user_email", "_splash_done")
+
+
+def _setup_backend(latency_ms: float, days: int, recipes: int):
+    """Configura o backend em memória ANTES de importar helpers."""
+    seed_file = Path(tempfile.gettempdir()) / f"caloria_bench_seed_{days}_{recipes}.json"
+    with open(seed_file, "w", encoding="utf-8") as f:
+        json.dump(build_seed(days=days, recipes=recipes), f, ensure_ascii=False)
+    os.environ["SUPABASE_BACKEND"] = "memory"
+    os.environ["FAKE_SUPABASE_LATENCY_MS"] = str(latency_ms)
+    os.environ["FAKE_SUPABASE_SEED"] = str(seed_file)
+
+    import helpers
+    return helpers.supabase.store
+
+
+def _find(widgets, label):
+    for w in widgets:
+        if w.label == label:
+            return w
+    raise LookupError(f"widget não encontrado: {label!r}")
+
+
+def _new_app(page: str, session: dict):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / page), default_timeout=60)
+    at.secrets["ENABLE_AI"] = "false"
+    at.session_state["_splash_done"] = True
+    for k, v in session.items():
+        at.session_state[k] = v
+    return at
+
+
+class Recorder:
+    def __init__(self, store):
+        self.store = store
+        self.samples = {}   # (page, step) -> lista de medições
+
+    def step(self, page: str, name: str, action):
+        """Executa uma interação (que dispara 1 rerun) e mede."""
+        from services.write_queue import get_write_queue
+
+        self.store.start_recording()
+        t0 = time.perf_counter()
+        at = action()
+        wall_ms = (time.perf_counter() - t0) * 1000.0
+        get_write_queue().flush()   # gravações em segundo plano contam para o passo
+        calls = self.store.stop_recording()
+
+        by_target = Counter(f"{c['kind']}:{c['target']}.{c['op']}" for c in calls)
+        self.samples.setdefault((page, name), []).append({
+            "wall_ms": wall_ms,
+            "calls": len(calls),
+            "bytes_out": sum(c["bytes_out"] for c in calls),
+            "bytes_in": sum(c["bytes_in"] for c in calls),
+            "by_target": dict(sorted(by_target.items())),
+            "exceptions": [str(e.value) for e in at.exception],
+        })
+        return at
+
+    def summary(self):
+        out = []
+        for (page, name), runs in self.samples.items():
+            walls = [r["wall_ms"] for r in runs]
+            last = runs[-1]
+            out.append({
+                "page": page,
+                "step": name,
+                "runs": len(runs),
+                "first_ms": round(walls[0], 1),
+                "median_ms": round(statistics.median(walls), 1),
+                "min_ms": round(min(walls), 1),
+                "max_ms": round(max(walls), 1),
+                "calls": last["calls"],
+                "bytes_out": last["bytes_out"],
+                "bytes_in": last["bytes_in"],
+                "by_target": last["by_target"],
+                "exceptions": sorted({e for r in runs for e in r["exceptions"]}),
+            })
+        return out
+
+
+# ---------- cenários ----------
+def scenario_app(rec: Recorder) -> dict:
+    page = "app_calorias.py"
+    at = _new_app(page, {})
+    at = rec.step(page, "abrir (deslogado)", at.run)
+    at = rec.step(page, "tela de login", at.button(key="btn_login").click().run)
+
+    at.text_input(key="login_email").input(BENCH_EMAIL)
+    at.text_input(key="login_password").input(BENCH_PASSWORD)
+    at = rec.step(page, "login", at.button(key="btn_do_login").click().run)
+    if not at.session_state["sb_session"]:
+        raise RuntimeError("login falhou no benchmark")
+
+    at = rec.step(page, "rerun sem interação", at.run)
+
+    _find(at.text_area, "O que você comeu?").input("150g frango, 120g arroz")
+    _find(at.number_input, "Proteína (g)").set_value(40.0)
+    _find(at.number_input, "Carboidratos (g)").set_value(35.0)
+    _find(at.number_input, "Gorduras (g)").set_value(8.0)
+    at = rec.step(page, "adicionar refeição", _find(at.button, "➕ Adicionar refeição").click().run)
+
+    ontem = date.today() - timedelta(days=1)
+    at = rec.step(page, "trocar data do diário", _find(at.date_input, "Data").set_value(ontem).run)
+    return {k: at.session_state[k] for k in SESSION_KEYS if k in at.session_state}
+
+
+def scenario_receitas(rec: Recorder, session: dict):
+    page = "pages/06_Receitas.py"
+    at = _new_app(page, session)
+    at = rec.step(page, "abrir", at.run)
+    at = rec.step(page, "buscar 'frango'", _find(at.text_input, "Buscar por título").input("frango").run)
+    cat = _find(at.multiselect, "Categoria")
+    at = rec.step(page, "filtrar categoria", cat.select(cat.options[0]).run)
+    rec.step(page, "ordenar por proteína", _find(at.selectbox, "Ordenar por").select("Maior proteína").run)
+
+
+def scenario_follow_up(rec: Recorder, session: dict):
+    page = "pages/07_Follow_Up.py"
+    at = _new_app(page, session)
+    at = rec.step(page, "abrir", at.run)
+    _find(at.number_input, "Peso corporal da semana (kg)").set_value(80.5)
+    rec.step(page, "salvar follow-up", _find(at.button, "Salvar follow up").click().run)
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except Exception:
+        return "?"
+
+
+def _print_table(steps, baseline=None):
+    base = {(s["page"], s["step"]): s for s in (baseline or {}).get("steps", [])}
+    print(f"{'página':<24} {'passo':<26} {'mediana ms':>11} {'chamadas':>9} {'KB in':>9}  Δ")
+    for s in steps:
+        delta = ""
+        b = base.get((s["page"], s["step"]))
+        if b:
+            delta = (f"{s['median_ms'] - b['median_ms']:+.1f} ms, "
+                     f"{s['calls'] - b['calls']:+d} chamadas, "
+                     f"{(s['bytes_in'] - b['bytes_in']) / 1024:+.1f} KB")
+        print(f"{s['page'][:24]:<24} {s['step'][:26]:<26} {s['median_ms']:>11.1f} "
+              f"{s['calls']:>9d} {s['bytes_in'] / 1024:>9.1f}  {delta}")
+        for e in s["exceptions"]:
+            print(f"    ! {e}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark de reruns das páginas (AppTest).")
+    ap.add_argument("--out", default="bench_report.json", help="arquivo JSON do relatório")
+    ap.add_argument("--baseline", help="relatório anterior para comparar")
+    ap.add_argument("--repeat", type=int, default=3, help="repetições de cada cenário")
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="latência simulada por chamada")
+    ap.add_argument("--days", type=int, default=120, help="dias de histórico na semente")
+    ap.add_argument("--recipes", type=int, default=300, help="receitas na semente")
+    args = ap.parse_args()
+
+    os.chdir(ROOT)
+    store = _setup_backend(args.latency_ms, args.days, args.recipes)
+    rec = Recorder(store)
+    for _ in range(max(1, args.repeat)):
+        session = scenario_app(rec)
+        scenario_receitas(rec, session)
+        scenario_follow_up(rec, session)
+
+    import streamlit
+    report = {
+        "meta": {
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "latency_ms": args.latency_ms,
+            "repeat": args.repeat,
+            "seed": {"days": args.days, "recipes": args.recipes},
+        },
+        "steps": rec.summary(),
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_table(report["steps"], baseline)
+    print(f"\nRelatório: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# bench/check_query_budget.py
+# -------------------------------------------------------------
+# Orçamento de idas ao backend por rerun ("N round trips no máximo")
+# - Roda os mesmos cenários do bench_reruns.py (AppTest + backend em
+#   memória) contando chamadas pelo InstrumentedClient
+# - A 1ª passada aquece os caches; o orçamento vale para a 2ª (rerun quente)
+# - Sai com código 1 se algum passo estourar o orçamento declarado:
+#
+#   python bench/check_query_budget.py
+# -------------------------------------------------------------
+import argparse
+import os
+import sys
+
+from bench_reruns import ROOT, _setup_backend, scenario_app, scenario_follow_up, scenario_receitas
+
+# (página, passo) -> limites por categoria ("read", "write", "auth", "total")
+BUDGETS = {
+    ("app_calorias.py", "abrir (deslogado)"):        {"total": 0},
+    ("app_calorias.py", "tela de login"):            {"total": 0},
+    ("app_calorias.py", "login"):                    {"auth": 1, "read": 5, "write": 1},
+    ("app_calorias.py", "rerun sem interação"):      {"read": 3, "write": 0},
+    ("app_calorias.py", "adicionar refeição"):       {"read": 3, "write": 2},
+    ("app_calorias.py", "trocar data do diário"):    {"read": 4, "write": 0},
+    ("pages/06_Receitas.py", "abrir"):               {"read": 2, "write": 0},
+    ("pages/06_Receitas.py", "buscar 'frango'"):     {"read": 2, "write": 0},
+    ("pages/06_Receitas.py", "filtrar categoria"):   {"read": 2, "write": 0},
+    ("pages/06_Receitas.py", "ordenar por proteína"): {"read": 2, "write": 0},
+    ("pages/07_Follow_Up.py", "abrir"):              {"read": 3, "write": 0},
+    ("pages/07_Follow_Up.py", "salvar follow-up"):   {"read": 3, "write": 2},
+}
+
+
+class BudgetRecorder:
+    """Mesma interface do Recorder do bench_reruns, mas conta via InstrumentedClient."""
+
+    def __init__(self):
+        self.results = {}   # (página, passo) -> CallCounts da última passada
+
+    def step(self, page: str, name: str, action):
+        from services.db_instrument import count_calls
+        from services.write_queue import get_write_queue
+
+        with count_calls() as counts:
+            at = action()
+            get_write_queue().flush()   # gravações adiadas também são idas ao backend
+        if at.exception:
+            raise RuntimeError(f"{page} / {name}: {at.exception[0].value}")
+        self.results[(page, name)] = counts
+        return at
+
+
+def check(results) -> list:
+    failures = []
+    for key, limits in BUDGETS.items():
+        counts = results.get(key)
+        if counts is None:
+            failures.append(f"{key[0]} / {key[1]}: passo não executado")
+            continue
+        for category, limit in limits.items():
+            used = counts.total if category == "total" else counts.count(category)
+            if used > limit:
+                detail = ", ".join(f"{k}×{n}" for k, n in sorted(counts.by_key.items()))
+                failures.append(f"{key[0]} / {key[1]}: {category} = {used} > {limit}  [{detail}]")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Checa o orçamento de chamadas ao backend por rerun.")
+    ap.add_argument("--verbose", action="store_true", help="lista as chamadas de cada passo")
+    args = ap.parse_args()
+
+    os.chdir(ROOT)
+    _setup_backend(latency_ms=0.0, days=60, recipes=200)
+    rec = BudgetRecorder()
+    for _ in range(2):
+        session = scenario_app(rec)
+        scenario_receitas(rec, session)
+        scenario_follow_up(rec, session)
+
+    for (page, name), counts in rec.results.items():
+        print(f"{page:<24} {name:<26} read={counts.reads:<3} write={counts.writes:<3} total={counts.total}")
+        if args.verbose:
+            for k, n in sorted(counts.by_key.items()):
+                print(f"    {k} ×{n}")
+
+    failures = check(rec.results)
+    if failures:
+        print("\nOrçamento estourado:")
+        for f in failures:
+            print(f"  ✗ {f}")
+        sys.exit(1)
+    print("\nOrçamento de consultas OK.")
+
+
+if __name__ == "__main__":
+    main()
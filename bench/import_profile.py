@@ -0,0 +1,78 @@
+# bench/import_profile.py
+# -------------------------------------------------------------
+# Perfil de inicialização (python -X importtime) + orçamento
+# - Importa o módulo alvo num processo limpo (backend em memória) e
+#   lista os módulos mais caros (tempo acumulado)
+# - Falha (código 1) se o import a frio passar do orçamento ou se algum
+#   módulo pesado que deveria ser preguiçoso for carregado:
+#
+#   python bench/import_profile.py                 # helpers
+#   python bench/import_profile.py --module services.fasting --top 30
+# -------------------------------------------------------------
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+BUDGET_MS = 400.0            # import a frio de helpers (inclui streamlit; sem o SDK real do Supabase)
+MUST_BE_LAZY = ("pandas", "altair", "reportlab", "requests", "numpy", "PIL")
+RUNS = 3                     # mediana de N processos (ruído de disco/CPU)
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_once(module: str):
+    env = dict(os.environ, SUPABASE_BACKEND="memory", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import de {module} falhou:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            self_us, cum_us, indent, name = m.groups()
+            rows.append((name, int(self_us) / 1000.0, int(cum_us) / 1000.0, len(indent) // 2))
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Perfil de import a frio com orçamento.")
+    ap.add_argument("--module", default="helpers")
+    ap.add_argument("--top", type=int, default=20, help="módulos mais caros a listar")
+    ap.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = ap.parse_args()
+
+    runs = [profile_once(args.module) for _ in range(RUNS)]
+    totals = sorted(next(cum for name, _, cum, _ in reversed(r) if name == args.module) for r in runs)
+    total = totals[len(totals) // 2]
+    rows = runs[0]
+
+    print(f"{'módulo':<48} {'próprio ms':>10} {'acum. ms':>10}")
+    for name, self_ms, cum_ms, depth in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{('  ' * min(depth, 4) + name)[:48]:<48} {self_ms:>10.1f} {cum_ms:>10.1f}")
+
+    loaded = {name.split(".")[0] for name, *_ in rows}
+    eager = [m for m in MUST_BE_LAZY if m in loaded]
+    print(f"\nimport a frio de {args.module}: {total:.0f} ms (mediana de {RUNS}; orçamento {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if total > args.budget_ms:
+        print(f"✗ acima do orçamento em {total - args.budget_ms:.0f} ms")
+        failed = True
+    if eager:
+        print(f"✗ módulos pesados carregados no import: {', '.join(eager)}")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("Orçamento de import OK.")
+
+
+if __name__ == "__main__":
+    main()
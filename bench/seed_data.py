@@ -0,0 +1,157 @@
+# bench/seed_data.py
+# -------------------------------------------------------------
+# Massa de dados determinística para o backend em memória
+# (services.fake_supabase). Usada pelos benchmarks e checagens locais.
+#
+#   python bench/seed_data.py --out bench/seed.json   # gera arquivo p/ FAKE_SUPABASE_SEED
+# -------------------------------------------------------------
+import argparse
+import json
+import random
+import uuid
+from datetime import date, datetime, timedelta
+
+BENCH_EMAIL = "bench@caloria.app"
+BENCH_PASSWORD = "bench-pass"
+BENCH_UID = "00000000-0000-4000-8000-000000000001"
+
+CATEGORIAS = ["Café da manhã", "Almoço", "Jantar", "Lanche", "Sobremesa"]
+REFEICOES = ["Café da manhã", "Almoço", "Jantar", "Lanche"]
+ALIMENTOS = ["frango grelhado", "arroz branco", "feijão cozido", "ovo cozido", "banana prata",
+             "aveia (flocos)", "batata doce coz.", "pão francês", "abacate", "salada"]
+
+# (nutriente, unidade, valor M, valor F)
+RDA = [("Vitamina C", "mg", 90, 75), ("Vitamina D", "µg", 15, 15), ("Cálcio", "mg", 1000, 1000),
+       ("Ferro", "mg", 8, 18), ("Magnésio", "mg", 400, 310)]
+
+
+def _uid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def build_seed(days: int = 120, recipes: int = 300, patients: int = 20, seed: int = 42) -> dict:
+    rng = random.Random(seed)
+    hoje = date.today()
+    users = [{"id": BENCH_UID, "email": BENCH_EMAIL, "password": BENCH_PASSWORD}]
+    users += [
+        {"id": _uid(rng), "email": f"paciente{i}@caloria.app", "password": BENCH_PASSWORD}
+        for i in range(patients)
+    ]
+
+    data = {
+        "_users": users,
+        "profiles": [],
+        "subscriptions": [],
+        "user_points": [],
+        "food_diary": [],
+        "weight_logs": [],
+        "followups": [],
+        "measurements": [],
+        "fasting_log": [],
+        "recipes": [],
+        "meal_plans": [],
+        "rda_nutrients": [],
+    }
+    for nut, unit, m, f in RDA:
+        for sex, val in (("M", m), ("F", f)):
+            for a0, a1 in ((19, 50), (51, 120)):
+                data["rda_nutrients"].append({
+                    "id": _uid(rng), "nutrient": nut, "sex": sex, "age_min": a0, "age_max": a1,
+                    "rda_value": val, "unit": unit,
+                })
+    for i, u in enumerate(users):
+        data["profiles"].append({
+            "id": u["id"], "email": u["email"], "nome": f"Usuário {i}",
+            "full_name": f"Usuário {i}", "onboarding_done": True,
+            "coaching": True, "sex": rng.choice(["Masculino", "Feminino"]),
+            "dob": str(date(1985 + i % 20, 1 + i % 12, 1 + i % 28)),
+            "height_cm": rng.randint(155, 190), "weight_kg": rng.randint(60, 100),
+        })
+        data["subscriptions"].append({
+            "id": _uid(rng), "user_id": u["id"], "plan_id": "PRO" if i % 3 == 0 else "FREE",
+            "inicio": str(hoje - timedelta(days=30)), "fim": str(hoje + timedelta(days=335)),
+            "status": "active",
+        })
+        data["user_points"].append({"user_id": u["id"], "points": rng.randint(0, 300), "badges": []})
+
+        peso = float(rng.randint(65, 105))
+        for d in range(days):
+            dia = hoje - timedelta(days=days - 1 - d)
+            for meal in REFEICOES:
+                if rng.random() < 0.85:
+                    p, c, f = rng.uniform(10, 50), rng.uniform(10, 90), rng.uniform(3, 30)
+                    data["food_diary"].append({
+                        "id": _uid(rng), "user_id": u["id"], "ref_date": str(dia),
+                        "meal_type": meal, "description": rng.choice(ALIMENTOS),
+                        "qty_g": rng.randint(50, 400), "kcal": round(p * 4 + c * 4 + f * 9, 1),
+                        "protein_g": round(p, 1), "carbs_g": round(c, 1), "fat_g": round(f, 1),
+                        "photo_path": None,
+                        "created_at": f"{dia}T{8 + REFEICOES.index(meal) * 4:02d}:00:00+00:00",
+                    })
+            if d % 3 == 0:
+                peso += rng.uniform(-0.6, 0.4)
+                data["weight_logs"].append({
+                    "id": _uid(rng), "user_id": u["id"], "ref_date": str(dia),
+                    "weight_kg": round(peso, 1), "created_at": f"{dia}T07:00:00+00:00",
+                })
+            if d % 7 == 0:
+                data["followups"].append({
+                    "id": _uid(rng), "user_id": u["id"], "ref_date": str(dia), "weight_kg": round(peso, 1),
+                    **{k: rng.randint(3, 10) for k in
+                       ("sleep", "bowel", "hunger", "motivation", "stress", "anxiety", "adherence")},
+                    "created_at": f"{dia}T20:00:00+00:00",
+                })
+            if d % 14 == 0:
+                data["measurements"].append({
+                    "id": _uid(rng), "user_id": u["id"], "ref_date": str(dia),
+                    "chest_cm": rng.uniform(85, 110), "arm_cm": rng.uniform(26, 40),
+                    "waist_cm": rng.uniform(70, 100), "abdomen_cm": rng.uniform(75, 105),
+                    "hip_cm": rng.uniform(90, 115), "thigh_cm": rng.uniform(50, 65),
+                    "calf_cm": rng.uniform(33, 42), "created_at": f"{dia}T08:00:00+00:00",
+                })
+            if rng.random() < 0.6:
+                ini = datetime.combine(dia, datetime.min.time()) + timedelta(hours=20)
+                fim = ini + timedelta(hours=rng.choice([13, 14.5, 16, 16.5, 18, 20]))
+                data["fasting_log"].append({
+                    "id": _uid(rng), "user_id": u["id"],
+                    "start_time": ini.isoformat(), "end_time": fim.isoformat(),
+                    "created_at": ini.isoformat() + "+00:00",
+                })
+
+    for i in range(recipes):
+        p, c, g = rng.randint(5, 60), rng.randint(5, 100), rng.randint(2, 35)
+        data["recipes"].append({
+            "id": _uid(rng), "titulo": f"{rng.choice(ALIMENTOS).title()} receita {i}",
+            "categoria": rng.choice(CATEGORIAS), "tempo_min": rng.choice([5, 10, 15, 20, 30, 45]),
+            "porcoes": rng.randint(1, 4), "kcal": p * 4 + c * 4 + g * 9,
+            "proteina_g": p, "carbo_g": c, "gordura_g": g,
+            "vitamina_c_mg": rng.uniform(0, 60), "calcio_mg": rng.uniform(0, 300),
+            "ferro_mg": rng.uniform(0, 8), "magnesio_mg": rng.uniform(0, 120),
+            "degustacao_gratis": i < 5, "imagem_url": None,
+            "ingredientes": ["ingrediente A", "ingrediente B"], "preparo": ["Misture", "Sirva"],
+            "created_at": (datetime(2025, 1, 1) + timedelta(hours=i)).isoformat() + "+00:00",
+        })
+
+    for kcal in range(1200, 3600, 100):
+        data["meal_plans"].append({
+            "id": _uid(rng), "titulo": f"Cardápio {kcal} kcal", "kcal_alvo": kcal,
+            "refeicoes": [{"nome": m, "itens": rng.sample(ALIMENTOS, 3)} for m in REFEICOES],
+        })
+    return data
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Gera a semente do backend em memória.")
+    ap.add_argument("--out", default="bench/seed.json")
+    ap.add_argument("--days", type=int, default=120)
+    ap.add_argument("--recipes", type=int, default=300)
+    ap.add_argument("--patients", type=int, default=20)
+    args = ap.parse_args()
+    data = build_seed(args.days, args.recipes, args.patients)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    print(f"Semente gravada em {args.out} ({sum(len(v) for v in data.values())} linhas)")
+
+
+if __name__ == "__main__":
+    main()
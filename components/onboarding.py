@@ -156,6 +156,9 @@ def render_onboarding(uid: str, profile: dict):
                     "ref_date": today_str,
                     "weight_kg": float(weight_kg),
                 }).execute()
+            # altura/sexo (e talvez um peso novo) mudam a composição corporal
+            from services.body_composition import invalidate_body_composition
+            invalidate_body_composition(current_uid)
 
             st.success("✅ Onboarding concluído! Bem-vindo ao calorIA!")
             st.session_state.onboarding_done = True
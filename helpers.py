@@ -1,18 +1,49 @@
-import os, io, json, re, requests, logging, math, time
+import os, io, json, re, logging, math, time, importlib
 from datetime import date, datetime
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import TYPE_CHECKING, Optional, Dict, Any, Iterator, List
 
 import streamlit as st
 import streamlit.components.v1 as components
-from supabase import create_client, Client
 from components.onboarding import render_onboarding
+from services.profiling import section
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 # --- Config logger ---
 logger = logging.getLogger("caloria")
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO)
 
+# --- Imports pesados sob demanda ---
+class LazyModule:
+    """Proxy de módulo: o import real só acontece no 1º acesso a atributo.
+       Uso: pd = lazy_import("pandas")  (pandas, altair, reportlab, requests...)"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._mod = None
+
+    def __getattr__(self, attr: str):
+        mod = self._mod
+        if mod is None:
+            mod = self._mod = importlib.import_module(self._name)
+        return getattr(mod, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r} ({'carregado' if self._mod else 'pendente'})>"
+
+def lazy_import(name: str) -> Any:
+    return LazyModule(name)
+
+def module_available(name: str) -> bool:
+    """Checa se o pacote está instalado sem importá-lo."""
+    import importlib.util
+    return importlib.util.find_spec(name) is not None
+
+requests = lazy_import("requests")   # só a IA (OpenRouter) usa
+
 # --- Assets ---
 ASSETS_DIR = Path(__file__).parent / "assets"
 LOGO_PATH = ASSETS_DIR / "logo.png"
@@ -28,135 +59,92 @@ def assert_required_secrets():
     else:
         logger.info("Secrets verificados com sucesso.")
 
-# --- Supabase client (singleton) ---
+# --- Config: secrets com fallback para variáveis de ambiente ---
+def get_config(name: str, default=None):
+    try:
+        value = st.secrets.get(name)
+    except FileNotFoundError:  # sem secrets.toml (ex.: benchmarks locais)
+        value = None
+    if value is None:
+        value = os.environ.get(name, default)
+    return value
+
+# --- Supabase client (um por sessão; ver services/client_pool.py) ---
+def _restore_session_auth(client, saved=None):
+    """Cliente novo para uma sessão já logada (ex.: despejado por
+       ociosidade): reaplica a sessão mais recente guardada pelo pool
+       (refresh tokens giram: os do login já podem ter sido gastos);
+       sem ela, a do sb_session."""
+    sess = saved
+    if sess is None:
+        try:
+            sess = getattr(st.session_state.get("sb_session"), "session", None)
+        except Exception:
+            sess = None
+    if sess is not None and getattr(sess, "access_token", None):
+        client.auth.set_session(sess.access_token, sess.refresh_token)
+
+def _persist_session_auth(session):
+    """Sessão renovada pelo cliente -> sb_session (sobrevive ao despejo do cliente)."""
+    res = st.session_state.get("sb_session")
+    if res is None:
+        return
+    try:
+        res.session = session
+    except Exception:
+        from types import SimpleNamespace
+        st.session_state["sb_session"] = SimpleNamespace(user=getattr(res, "user", None), session=session)
+
 @st.cache_resource
-def get_supabase_client() -> Client:
-    url = st.secrets["SUPABASE_URL"]
-    key = st.secrets["SUPABASE_ANON_KEY"]
-    return create_client(url, key)
+def get_supabase_client() -> "Client":
+    # clientes envolvidos por InstrumentedClient: contagem/tracing de chamadas
+    from services.client_pool import SessionClientPool, SessionClientProxy
+    from services.db_instrument import InstrumentedClient
+
+    # SUPABASE_BACKEND=memory -> cliente falso em memória (testes/benchmarks)
+    if str(get_config("SUPABASE_BACKEND", "")).lower() == "memory":
+        from services.fake_supabase import FakeSupabaseClient, create_fake_client
+        logger.info("Usando backend Supabase em memória.")
+        raw = create_fake_client(
+            latency_ms=float(get_config("FAKE_SUPABASE_LATENCY_MS", 0) or 0),
+            seed_path=get_config("FAKE_SUPABASE_SEED"),
+        )
+        make = lambda: FakeSupabaseClient(raw.store)        # mesmo banco, auth própria
+    else:
+        from services.client_pool import build_shared_transport, create_pooled_client
+        url = st.secrets["SUPABASE_URL"]
+        key = st.secrets["SUPABASE_ANON_KEY"]
+        transport = build_shared_transport(
+            max_connections=int(get_config("SUPABASE_HTTP_MAX_CONNECTIONS", 64)),
+        )
+        make = lambda: create_pooled_client(url, key, transport)
+        raw = make()
+    base = InstrumentedClient(raw)
+    pool = SessionClientPool(
+        lambda: InstrumentedClient(make(), sinks_from=base),
+        max_size=int(get_config("SUPABASE_MAX_SESSION_CLIENTS", 200)),
+        idle_ttl=float(get_config("SUPABASE_CLIENT_IDLE_SEC", 1800)),
+    )
+    return SessionClientProxy(base, pool, restore=_restore_session_auth, persist=_persist_session_auth)
 
 supabase = get_supabase_client()
 
 import time
 
+SPLASH_MAX_SEC = 4.0   # nunca segura o usuário mais que isso
+
 def splash_once():
+    """Splash do 1º carregamento da sessão: fica na tela enquanto o
+       preload (services/preload.py) roda e some assim que ele termina."""
     if st.session_state.get("_splash_done"):
         return
 
+    t0 = time.perf_counter()
     logo_path = LOGO_PATH if LOGO_PATH.exists() else None
     
     ph = st.empty()
     with ph.container():
-        st.markdown(
-            """
-            <style>
-            @keyframes fadeIn {
-              from { opacity: 0; transform: translateY(20px); }
-              to { opacity: 1; transform: translateY(0); }
-            }
-            
-            @keyframes slideDown {
-              from { opacity: 0; transform: translateY(-30px); }
-              to { opacity: 1; transform: translateY(0); }
-            }
-            
-            @keyframes pulse {
-              0%, 100% { transform: scale(1); }
-              50% { transform: scale(1.08); }
-            }
-            
-            @keyframes shimmer {
-              0% { opacity: 0.6; }
-              50% { opacity: 1; }
-              100% { opacity: 0.6; }
-            }
-            
-            .caloria-splash {
-              position: fixed; 
-              inset: 0; 
-              z-index: 9999;
-              background: linear-gradient(135deg, #FFFFFF 0%, #E8F8F8 50%, #F8F9FA 100%);
-              display: flex; 
-              flex-direction: column;
-              align-items: center; 
-              justify-content: center;
-              animation: fadeIn 0.6s ease-out;
-            }
-            
-            .caloria-splash-logo {
-              animation: slideDown 0.8s ease-out, pulse 2s ease-in-out 0.8s infinite;
-              margin-bottom: 2rem;
-              filter: drop-shadow(0 8px 16px rgba(43, 174, 174, 0.2));
-            }
-            
-            .caloria-splash-logo img {
-              max-width: 280px;
-              height: auto;
-            }
-            
-            .caloria-splash-title {
-              font-size: 3rem;
-              font-weight: 800;
-              background: linear-gradient(90deg, #2BAEAE 0%, #FF7A3D 100%);
-              -webkit-background-clip: text;
-              -webkit-text-fill-color: transparent;
-              background-clip: text;
-              margin-bottom: 0.8rem;
-              animation: fadeIn 1s ease-out 0.3s both;
-              text-align: center;
-              letter-spacing: -0.5px;
-            }
-            
-            .caloria-splash-sub {
-              font-size: 1.3rem;
-              color: #6C757D;
-              font-weight: 500;
-              animation: fadeIn 1.2s ease-out 0.5s both;
-              text-align: center;
-              margin-bottom: 0.5rem;
-            }
-            
-            .caloria-splash-tagline {
-              font-size: 1rem;
-              color: #FF7A3D;
-              font-weight: 600;
-              animation: fadeIn 1.4s ease-out 0.7s both;
-              text-align: center;
-            }
-            
-            .caloria-splash-loader {
-              margin-top: 2.5rem;
-              width: 50px;
-              height: 50px;
-              border: 4px solid rgba(43, 174, 174, 0.2);
-              border-top: 4px solid #2BAEAE;
-              border-radius: 50%;
-              animation: spin 1s linear infinite;
-            }
-            
-            @keyframes spin {
-              0% { transform: rotate(0deg); }
-              100% { transform: rotate(360deg); }
-            }
-            
-            @media (max-width: 768px) {
-              .caloria-splash-logo img {
-                max-width: 200px;
-              }
-              .caloria-splash-title {
-                font-size: 2.2rem;
-              }
-              .caloria-splash-sub {
-                font-size: 1.1rem;
-              }
-              .caloria-splash-tagline {
-                font-size: 0.9rem;
-              }
-            }
-            </style>
-            """,
-            unsafe_allow_html=True
-        )
+        inject_css("splash.css")
         
         if logo_path:
             logo_base64 = None
@@ -221,396 +209,93 @@ def splash_once():
                 unsafe_allow_html=True
             )
 
-    time.sleep(2.5)
+    from services.preload import run_preload
+    uid = st.session_state.get("user_id")
+    leituras = run_preload(uid, timeout=SPLASH_MAX_SEC)
+    if uid:
+        st.session_state["_preload"] = leituras     # o roteador consome neste rerun
     ph.empty()
     st.session_state["_splash_done"] = True
+    logger.info("splash: %.0f ms", (time.perf_counter() - t0) * 1000.0)
+
+# --- Tema: CSS/JS em static/ (servidos pelo Streamlit, com hash de conteúdo) ---
+# O Streamlit serve /app/static/* como text/plain + nosniff (exceto imagens),
+# então <link>/<script src> seriam bloqueados: um instalador busca os arquivos
+# via fetch() e cria <style>/<script> no <head> do documento principal, que
+# sobrevive a reruns e troca de página. O instalador (só as URLs, poucos
+# bytes) vai em todo rerun: o servidor não tem como saber se o fetch chegou
+# ao fim (o iframe pode ser desmontado antes); rerun idêntico reaproveita o
+# iframe e, com os elementos já no <head>, ele não faz nada.
+STATIC_DIR = Path(__file__).parent / "static"
+THEME_ASSETS = (
+    ("theme.css", "style", "caloria-theme-css"),
+    ("sidebar.js", "script", "caloria-sidebar-js"),
+)
+
+@st.cache_resource
+def _static_asset(name: str) -> tuple[str, str]:
+    """(conteúdo, hash curto) de um arquivo de static/; lido uma vez por processo."""
+    import hashlib
+    text = (STATIC_DIR / name).read_text(encoding="utf-8")
+    return text, hashlib.md5(text.encode("utf-8")).hexdigest()[:10]
+
+def _static_serving() -> bool:
+    try:
+        return bool(st.get_option("server.enableStaticServing"))
+    except Exception:
+        return False
+
+def static_url(name: str) -> str:
+    """URL relativa do asset com ?v=<hash> (cache do navegador não fica velho)."""
+    return f"./app/static/{name}?v={_static_asset(name)[1]}"
+
+def inject_css(name: str):
+    """CSS inline de static/ (para conteúdo de uma vez só, ex.: splash)."""
+    st.markdown(f"<style>{_static_asset(name)[0]}</style>", unsafe_allow_html=True)
+
+_THEME_INSTALLER = """<script>(function () {
+  var d = window.parent.document;
+  (%s).forEach(function (a) {
+    if (d.getElementById(a.id)) return;
+    function put(text) {
+      if (d.getElementById(a.id)) return;
+      var el = d.createElement(a.tag);
+      el.id = a.id;
+      el.textContent = text;
+      d.head.appendChild(el);
+    }
+    if (a.text !== undefined) { put(a.text); return; }
+    fetch(new URL(a.url, d.baseURI))
+      .then(function (r) { return r.ok ? r.text() : Promise.reject(r.status); })
+      .then(put)
+      .catch(function (e) { console.warn("calorIA: falha ao carregar", a.url, e); });
+  });
+})();</script>"""
+
+def _install_theme_assets() -> bool:
+    """Envia o instalador do tema + JS da sidebar (idempotente no navegador).
+       Retorna True no 1º rerun da sessão."""
+    primeiro = not st.session_state.get("_theme_sent")
+    st.session_state["_theme_sent"] = True
+    static = _static_serving()
+    assets = []
+    for name, tag, el_id in THEME_ASSETS:
+        item = {"id": el_id, "tag": tag}
+        if static:
+            item["url"] = static_url(name)
+        else:
+            item["text"] = _static_asset(name)[0]
+        assets.append(item)
+    # "</" escapado: o JSON vai dentro de um <script>
+    components.html(_THEME_INSTALLER % json.dumps(assets).replace("</", "<\\/"), height=0, width=0)
+    return primeiro
 
+@section("apply_theme")
 def apply_theme():
-    st.markdown("""
-    <style>
-      /* ===== BASE RESPONSIVE ===== */
-      * {
-        box-sizing: border-box;
-      }
-      
-      html, body {
-        overflow-x: hidden;
-        width: 100%;
-      }
-      
-      /* ===== SIDEBAR ===== */
-      [data-testid="stSidebar"] {
-        background-color: #2BAEAE !important;
-      }
-                
-      [data-testid="stSidebar"] .sb-title {
-        color: #FFFFFF !important;
-        font-weight: 700 !important;
-        font-size: 1.1rem;
-      }
-
-      /* ===== TÍTULOS ===== */
-      h1, h2, h3,
-      [data-testid="stMarkdownContainer"] h1,
-      [data-testid="stMarkdownContainer"] h2,
-      [data-testid="stMarkdownContainer"] h3 {
-        color: #2BAEAE !important;
-        font-weight: 700 !important;
-      }
-
-      /* ===== BOTÕES ===== */
-      .stButton > button {
-        border-radius: 10px !important;
-        font-weight: 600 !important;
-        padding: 0.5rem 1rem !important;
-        transition: all 0.3s ease !important;
-        border: none !important;
-      }
-      
-      .stButton > button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.15) !important;
-      }
-      
-      .stButton > button:disabled {
-        background-color: #E0E0E0 !important;
-        color: #6C757D !important;
-        cursor: not-allowed !important;
-        transform: none !important;
-      }
-
-      /* ===== INPUTS E SELECTS ===== */
-      .stTextInput > div > div > input,
-      .stNumberInput > div > div > input,
-      .stDateInput > div > div > input,
-      .stTimeInput > div > div > input {
-        border-radius: 8px !important;
-        border: 2px solid #E0E0E0 !important;
-        padding: 0.5rem !important;
-        transition: border-color 0.3s ease !important;
-      }
-      
-      .stTextInput > div > div > input:focus,
-      .stNumberInput > div > div > input:focus,
-      .stDateInput > div > div > input:focus,
-      .stTimeInput > div > div > input:focus {
-        border-color: #2BAEAE !important;
-        box-shadow: 0 0 0 1px #2BAEAE !important;
-      }
-
-      div[data-baseweb="select"] > div {
-        background-color: #FFFFFF !important;
-        color: #212529 !important;
-        border: 2px solid #E0E0E0 !important;
-        border-radius: 8px !important;
-        transition: border-color 0.3s ease !important;
-      }
-      
-      div[data-baseweb="select"] > div:focus-within {
-        border-color: #2BAEAE !important;
-      }
-
-      /* ===== TOGGLE ===== */
-      div[role="switch"] { 
-        background-color: #E0E0E0 !important; 
-        transition: background-color 0.3s ease !important;
-      }
-      div[role="switch"][aria-checked="true"] { 
-        background-color: #FF7A3D !important; 
-      }
-
-      /* ===== ALERTAS E MENSAGENS ===== */
-      div[role="alert"] * { color: #212529 !important; }
-      
-      div[data-testid="stSuccess"],
-      div[data-testid="stInfo"],
-      div[data-testid="stWarning"],
-      div[data-testid="stError"] {
-        border-radius: 8px !important;
-        padding: 1rem !important;
-      }
-
-      /* ===== CONTAINERS E CARDS ===== */
-      div[data-testid="stVerticalBlock"] > div[style*="border"] {
-        border-radius: 12px !important;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.08) !important;
-      }
-
-      /* ===== ESCONDER ELEMENTOS DESNECESSÁRIOS ===== */
-      header { display: none; }
-      [data-testid="stStatusWidget"] { display: none; }
-      #MainMenu { visibility: hidden; }
-      footer { visibility: hidden; }
-
-      /* ===== MOBILE RESPONSIVENESS ===== */
-      @media (max-width: 768px) {
-        h1 { font-size: 1.8rem !important; }
-        h2 { font-size: 1.5rem !important; }
-        h3 { font-size: 1.2rem !important; }
-        
-        .stButton > button {
-          padding: 0.6rem 1rem !important;
-          font-size: 0.9rem !important;
-        }
-        
-        [data-testid="stSidebar"] {
-          width: 280px !important;
-          min-width: 280px !important;
-          max-width: 85vw !important;
-        }
-        
-        [data-testid="stSidebar"][aria-expanded="true"] {
-          position: fixed !important;
-          z-index: 999 !important;
-          height: 100vh !important;
-          top: 0 !important;
-          left: 0 !important;
-          box-shadow: 2px 0 10px rgba(0,0,0,0.2) !important;
-          overflow-y: auto !important;
-        }
-        
-        [data-testid="stSidebar"] * {
-          font-size: 0.95rem !important;
-        }
-        
-        [data-testid="stSidebar"] .stButton > button {
-          font-size: 0.9rem !important;
-          padding: 0.5rem 0.75rem !important;
-        }
-        
-        [data-testid="stSidebar"][aria-expanded="false"] {
-          transform: translateX(-100%) !important;
-        }
-        
-        [data-testid="stSidebar"] ~ [data-testid="stAppViewContainer"] {
-          margin-left: 0 !important;
-        }
-        
-        button[data-testid="baseButton-header"][aria-label*="sidebar"],
-        button[data-testid="baseButton-header"][aria-label*="menu"] {
-          position: fixed !important;
-          top: 0.75rem !important;
-          left: 0.75rem !important;
-          z-index: 1000 !important;
-          background-color: #2BAEAE !important;
-          color: white !important;
-          border-radius: 8px !important;
-          width: 42px !important;
-          height: 42px !important;
-          min-width: 42px !important;
-          box-shadow: 0 2px 8px rgba(0,0,0,0.25) !important;
-          border: none !important;
-        }
-        
-        button[data-testid="baseButton-header"][aria-label*="sidebar"]:hover,
-        button[data-testid="baseButton-header"][aria-label*="menu"]:hover {
-          background-color: #229999 !important;
-          transform: scale(1.05) !important;
-        }
-        
-        [data-testid="stSidebar"][aria-expanded="true"] ~ * {
-          position: relative;
-        }
-        
-        [data-testid="column"] {
-          flex: 1 1 100% !important;
-          max-width: 100% !important;
-        }
-        
-        [data-testid="stMetric"] {
-          min-width: auto !important;
-        }
-        
-        .stTabs [data-baseweb="tab-list"] {
-          flex-wrap: wrap !important;
-          gap: 0.5rem !important;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-          font-size: 0.85rem !important;
-          padding: 0.4rem 0.8rem !important;
-        }
-        
-        [data-testid="stForm"] {
-          padding: 1rem 0.5rem !important;
-        }
-        
-        [data-testid="stDataFrame"] {
-          overflow-x: auto !important;
-          font-size: 0.85rem !important;
-        }
-        
-        [data-testid="stImage"] {
-          max-width: 100% !important;
-        }
-      }
-      
-      @media (max-width: 480px) {
-        h1 { font-size: 1.5rem !important; }
-        h2 { font-size: 1.3rem !important; }
-        h3 { font-size: 1.1rem !important; }
-        
-        .stButton > button {
-          padding: 0.5rem 0.8rem !important;
-          font-size: 0.85rem !important;
-        }
-        
-        [data-testid="stNumberInput"] label,
-        [data-testid="stTextInput"] label,
-        [data-testid="stSelectbox"] label {
-          font-size: 0.9rem !important;
-        }
-        
-        [data-testid="stNumberInput"] input,
-        [data-testid="stTextInput"] input {
-          font-size: 0.9rem !important;
-        }
-      }
-
-      /* ===== ANIMAÇÕES SUAVES ===== */
-      * {
-        transition: background-color 0.3s ease, color 0.3s ease, border-color 0.3s ease !important;
-      }
-
-      /* ===== SCROLLBAR CUSTOMIZADA ===== */
-      ::-webkit-scrollbar {
-        width: 8px;
-        height: 8px;
-      }
-      
-      ::-webkit-scrollbar-track {
-        background: #F8F9FA;
-        border-radius: 10px;
-      }
-      
-      ::-webkit-scrollbar-thumb {
-        background: #2BAEAE;
-        border-radius: 10px;
-      }
-      
-      ::-webkit-scrollbar-thumb:hover {
-        background: #229999;
-      }
-    </style>
-    """, unsafe_allow_html=True)
-    
-    st.markdown("""
-    <style>
-      .sidebar-overlay {
-        display: none;
-        position: fixed;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background-color: rgba(0, 0, 0, 0.5);
-        z-index: 998;
-        transition: opacity 0.3s ease;
-      }
-      
-      .sidebar-overlay.active {
-        display: block;
-      }
-      
-      @media (max-width: 768px) {
-        [data-testid="stSidebar"][aria-expanded="true"] {
-          box-shadow: 2px 0 15px rgba(0,0,0,0.3) !important;
-        }
-      }
-    </style>
-    <div class="sidebar-overlay" id="sidebarOverlay"></div>
-    """, unsafe_allow_html=True)
-    
-    components.html("""
-    <script>
-    (function() {
-      function isMobile() {
-        return window.innerWidth <= 768;
-      }
-      
-      function collapseSidebar() {
-        var sidebar = document.querySelector('[data-testid="stSidebar"]');
-        var sidebarButton = document.querySelector('button[data-testid="baseButton-header"][aria-label*="sidebar"], button[data-testid="baseButton-header"][aria-label*="menu"]');
-        
-        if (sidebar && sidebar.getAttribute('aria-expanded') === 'true') {
-          if (sidebarButton) {
-            sidebarButton.click();
-          }
-        }
-      }
-      
-      function setupSidebarOverlay() {
-        var overlay = document.getElementById('sidebarOverlay');
-        var sidebar = document.querySelector('[data-testid="stSidebar"]');
-        
-        if (overlay && sidebar) {
-          overlay.addEventListener('click', function() {
-            if (isMobile() && sidebar.getAttribute('aria-expanded') === 'true') {
-              collapseSidebar();
-            }
-          });
-          
-          var observer = new MutationObserver(function(mutations) {
-            mutations.forEach(function(mutation) {
-              if (mutation.type === 'attributes' && mutation.attributeName === 'aria-expanded') {
-                if (isMobile()) {
-                  if (sidebar.getAttribute('aria-expanded') === 'true') {
-                    overlay.classList.add('active');
-                  } else {
-                    overlay.classList.remove('active');
-                  }
-                }
-              }
-            });
-          });
-          
-          observer.observe(sidebar, { attributes: true, attributeFilter: ['aria-expanded'] });
-          
-          var checkSidebarState = function() {
-            if (isMobile()) {
-              if (sidebar.getAttribute('aria-expanded') === 'true') {
-                overlay.classList.add('active');
-              } else {
-                overlay.classList.remove('active');
-              }
-            } else {
-              overlay.classList.remove('active');
-            }
-          };
-          
-          checkSidebarState();
-          setInterval(checkSidebarState, 100);
-        }
-      }
-      
-      function initMobileSidebar() {
-        if (isMobile()) {
-          collapseSidebar();
-          setupSidebarOverlay();
-        }
-      }
-      
-      if (document.readyState === 'loading') {
-        document.addEventListener('DOMContentLoaded', function() {
-          setTimeout(initMobileSidebar, 200);
-        });
-      } else {
-        setTimeout(initMobileSidebar, 200);
-      }
-      
-      window.addEventListener('resize', function() {
-        if (isMobile()) {
-          setupSidebarOverlay();
-        } else {
-          var overlay = document.getElementById('sidebarOverlay');
-          if (overlay) {
-            overlay.classList.remove('active');
-          }
-        }
-      });
-    })();
-    </script>
-    """, height=0, width=0)
+    if _install_theme_assets():
+        # 1º rerun da sessão: CSS inline também, para não renderizar sem tema
+        # enquanto o fetch não volta (some no rerun seguinte; o <head> fica)
+        inject_css("theme.css")
 
 # ======================================================
 # STORAGE HELPERS
@@ -774,23 +459,39 @@ def _ensure_points_row(user_id: str):
     supabase.table("user_points").upsert({"user_id": user_id}).execute()
 
 def get_points(user_id: str) -> dict:
+    # leitura pura; a linha só é criada quando ainda não existe
+    resp = supabase.table("user_points").select("*").eq("user_id", user_id).maybe_single().execute()
+    data = getattr(resp, "data", None) if resp is not None else None
+    if data:
+        return data
     _ensure_points_row(user_id)
-    resp = supabase.table("user_points").select("*").eq("user_id", user_id).single().execute()
-    return resp.data or {"user_id": user_id, "points": 0, "badges": []}
+    return {"user_id": user_id, "points": 0, "badges": []}
+
+# Eventos cuja event_key é o id de uma linha recém-criada (nunca repete):
+# não precisam da resposta do banco para deduplicar -> fila write-behind.
+_UNIQUE_KEY_EVENTS = {"add_meal", "add_measure_photo"}
 
 def _record_event(user_id: str, event_type: str, event_key: str, points: int) -> bool:
-    try:
-        supabase.table("user_points_events").insert({
-            "user_id": user_id,
-            "event_type": event_type,
-            "event_key": event_key,
-            "points": points,
-        }).execute()
+    """Grava o evento e credita os pontos numa só transação (RPC
+       award_points, supabase/migrations): sem evento gravado, sem crédito."""
+    params = {
+        "p_user_id": user_id,
+        "p_event_type": event_type,
+        "p_event_key": event_key,
+        "p_points": points,
+    }
+    if event_type in _UNIQUE_KEY_EVENTS:
+        from services.write_queue import get_write_queue
+        get_write_queue().rpc("award_points", params)
         return True
+    try:
+        res = supabase.rpc("award_points", params).execute()
+        return bool(res.data)
     except Exception:
         return False
 
 def add_points(user_id: str, event_type: str, event_key: str | None = None, value_override: int | None = None) -> bool:
+    """True se os pontos foram creditados (eventos da fila: agendados)."""
     if event_key is None:
         if event_type.endswith("_daily"):
             event_key = date.today().isoformat()
@@ -800,37 +501,20 @@ def add_points(user_id: str, event_type: str, event_key: str | None = None, valu
     pts = value_override if value_override is not None else POINT_VALUES.get(event_type, 0)
     if pts <= 0:
         return False
-
-    inserted = _record_event(user_id, event_type, event_key, pts)
-    if not inserted:
-        return False
-
-    _ensure_points_row(user_id)
-    current = get_points(user_id)
-    new_points = (current.get("points") or 0) + pts
-    supabase.table("user_points").update({
-        "points": new_points,
-        "updated_at": datetime.utcnow().isoformat()
-    }).eq("user_id", user_id).execute()
-    return True
+    return _record_event(user_id, event_type, event_key, pts)
 
 def award_badge(user_id: str, badge_name: str, meta: dict | None = None) -> None:
-    row = get_points(user_id)
-    badges = row.get("badges") or []
-    names = {b.get("name") for b in badges if isinstance(b, dict)}
-    if badge_name in names:
-        return
-    badges.append({
-        "name": badge_name,
-        "date": datetime.utcnow().isoformat(),
-        "meta": meta or {}
+    # append atômico no servidor (RPC award_badge): não relê a lista
+    from services.write_queue import get_write_queue
+    get_write_queue().rpc("award_badge", {
+        "p_user_id": user_id,
+        "p_badge": {"name": badge_name, "date": datetime.utcnow().isoformat(), "meta": meta or {}},
     })
-    supabase.table("user_points").update({"badges": badges, "updated_at": datetime.utcnow().isoformat()}) \
-        .eq("user_id", user_id).execute()
 
 # ======================================================
 # RDA / NUTRIÇÃO
 # ======================================================
+@st.cache_data(ttl=86400, show_spinner=False)
 def get_rda_value(nutrient: str, sex: str, age: int):
     res = (
         supabase.table("rda_nutrients")
@@ -985,10 +669,10 @@ def salvar_medidas(
             "thigh_cm": thigh_cm,
             "calf_cm": calf_cm,
         }
-        res = supabase.table("measurements").insert(payload).execute()
-        if res.data and isinstance(res.data, list):
-            return res.data[0].get("id")
-        return None
+        row = db_insert_row("measurements", payload)
+        from services.body_composition import invalidate_body_composition
+        invalidate_body_composition(user_id)
+        return row.get("id") if row else None
     except Exception as e:
         st.warning(f"Erro ao salvar medidas: {e}")
         return None
@@ -1010,7 +694,7 @@ def salvar_refeicao_no_supabase(
 ):
     """Insere uma refeição no diário alimentar e retorna o id."""
     try:
-        res = supabase.table("food_diary").insert({
+        row = db_insert_row("food_diary", {
             "user_id": user_id,
             "ref_date": ref_date,
             "meal_type": meal_type,
@@ -1021,9 +705,9 @@ def salvar_refeicao_no_supabase(
             "carbs_g": carbs_g,
             "fat_g": fat_g,
             "photo_path": photo_path,
-        }).execute()
-        if res.data:
-            return res.data[0].get("id")
+        })
+        if row:
+            return row.get("id")
     except Exception as e:
         st.error(f"Erro ao salvar refeição: {e}")
     return None
@@ -1121,37 +805,199 @@ def save_user_macros(uid: str, resumo: dict):
 # --- Cardápios (meal_plans) ---
 def get_meal_plan_for_target(kcal_alvo: int):
     """Busca cardápio mais próximo do alvo calórico."""
-    res = supabase.table("meal_plans") \
-        .select("*") \
-        .order(f"abs(kcal_alvo - {kcal_alvo})") \
-        .limit(1) \
+    plans = get_meal_plans_near(kcal_alvo, k=1)
+    return plans[0] if plans else None
+
+def get_meal_plans_near(kcal_alvo: int, k: int = 3) -> List[Dict[str, Any]]:
+    """Os k cardápios mais próximos do alvo (índice em memória + bisect);
+       o registro completo (refeições) é buscado só para esses."""
+    from services.meal_plans import get_meal_plan_index
+    try:
+        near = get_meal_plan_index().nearest(float(kcal_alvo), k)
+        return [p for p in (_meal_plan_full(n["id"]) for n in near) if p]
+    except Exception as e:
+        logger.warning("meal_plans: cardápios indisponíveis: %s", e)
+        return []
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _meal_plan_full(plan_id) -> Dict[str, Any] | None:
+    res = supabase.table("meal_plans").select("*").eq("id", plan_id).maybe_single().execute()
+    return res.data if res else None
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _coaching_flag(uid: str) -> bool:
+    # Aqui assumimos que na tabela profiles existe um campo "coaching"
+    resp = (
+        supabase.table("profiles")
+        .select("coaching")
+        .eq("id", uid)
+        .single()
         .execute()
-    if res.data:
-        return res.data[0]
-    return None
+    )
+    data = resp.data or {}
+    return bool(data.get("coaching"))
 
 def is_user_coaching(uid: str) -> bool:
-    """Retorna True se o usuário for de coaching (plano especial)."""
+    """Retorna True se o usuário for de coaching (plano especial).
+       Cacheado por 5 min: é consultado várias vezes por rerun."""
     try:
-        # Aqui assumimos que na tabela profiles existe um campo "coaching"
-        resp = (
-            supabase.table("profiles")
-            .select("coaching")
-            .eq("id", uid)
-            .single()
-            .execute()
-        )
-        data = resp.data or {}
-        return bool(data.get("coaching"))
+        return _coaching_flag(uid)
     except Exception:
         return False
 
+def is_user_coach(email: str | None) -> bool:
+    """Retorna True se o e-mail estiver na lista COACH_EMAILS (secrets)."""
+    if not email:
+        return False
+    coaches = st.secrets.get("COACH_EMAILS", "")
+    if isinstance(coaches, str):
+        coaches = coaches.split(",")
+    return email.strip().lower() in {c.strip().lower() for c in coaches if c}
+
+def db_iter_pages(build_query, page_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """Gera as páginas de uma consulta (.range()) até esgotar as linhas.
+       `build_query` deve devolver um builder NOVO a cada chamada
+       (os builders do postgrest acumulam parâmetros)."""
+    start = 0
+    while True:
+        res = build_query().range(start, start + page_size - 1).execute()
+        page = res.data or []
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        start += page_size
+
+def db_iter_keyset(build_query, key: str = "id", page_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """Paginação por chave: cada página pede `key > último visto`, então o
+       custo não cresce com o deslocamento e inserções no meio não
+       duplicam/pulam linhas. `build_query` como em db_iter_pages."""
+    last = None
+    while True:
+        q = build_query()
+        if last is not None:
+            q = q.gt(key, last)
+        page = q.order(key).limit(page_size).execute().data or []
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last = page[-1][key]
+
+def db_fetch_all(build_query, page_size: int = 1000) -> List[Dict[str, Any]]:
+    """Todas as linhas de uma consulta paginada (ver db_iter_pages)."""
+    out: List[Dict[str, Any]] = []
+    for page in db_iter_pages(build_query, page_size):
+        out.extend(page)
+    return out
+
+# --- Espelho local opcional (SQLite) + fachada de leitura/escrita por usuário ---
+@st.cache_resource
+def get_local_mirror():
+    """LocalMirror se LOCAL_MIRROR_PATH estiver nos secrets; senão None."""
+    path = get_config("LOCAL_MIRROR_PATH")
+    if not path:
+        return None
+    from services.local_mirror import LocalMirror
+    logger.info("Espelho local ativo em %s", path)
+    return LocalMirror(path)
+
+def _mirror_for(table: str):
+    mirror = get_local_mirror()
+    if mirror is None:
+        return None
+    from services.local_mirror import MIRROR_TABLES
+    return mirror if table in MIRROR_TABLES else None
+
+def db_user_rows(
+    table: str,
+    user_id: str,
+    filters: list | tuple = (),
+    order: str | None = None,
+    desc: bool = False,
+    limit: int | None = None,
+    columns: str = "*",
+) -> List[Dict[str, Any]]:
+    """Linhas de um usuário. filters = [(op, coluna, valor)], op em
+       eq/gte/lte/gt/lt/in. Usa o espelho local quando ativo."""
+    mirror = _mirror_for(table)
+    if mirror is not None:
+        return mirror.select(table, user_id, filters, order=order, desc=desc, limit=limit)
+
+    def _q():
+        q = supabase.table(table).select(columns).eq("user_id", user_id)
+        for op, col, val in filters:
+            q = getattr(q, "in_" if op == "in" else op)(col, val)
+        if order:
+            q = q.order(order, desc=desc)
+        return q
+
+    if limit:
+        return _q().limit(limit).execute().data or []
+    return db_fetch_all(_q)
+
+def db_user_pages(
+    table: str,
+    user_id: str,
+    order: str = "ref_date",
+    columns: str = "*",
+    page_size: int = 500,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Como db_user_rows, mas em páginas (para históricos longos sem
+       carregar tudo de uma vez). Ordena por `order` e depois por id;
+       com order="id" usa paginação por chave (db_iter_keyset)."""
+    mirror = _mirror_for(table)
+    if mirror is not None and order == "id":
+        last = None
+        while True:
+            page = mirror.select(table, user_id, [("gt", "id", last)] if last else (), order="id", limit=page_size)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            last = page[-1]["id"]
+    if mirror is not None:
+        rows = mirror.select(table, user_id, (), order=order)
+        for i in range(0, len(rows), page_size):
+            yield rows[i:i + page_size]
+        return
+    if order == "id":
+        yield from db_iter_keyset(
+            lambda: supabase.table(table).select(columns).eq("user_id", user_id), "id", page_size,
+        )
+        return
+    yield from db_iter_pages(
+        lambda: supabase.table(table).select(columns).eq("user_id", user_id).order(order).order("id"),
+        page_size,
+    )
+
+def db_insert_rows(table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Insere linhas (local primeiro se o espelho estiver ativo) e devolve-as."""
+    mirror = _mirror_for(table)
+    if mirror is not None:
+        return [mirror.insert(table, r) for r in rows]
+    res = supabase.table(table).insert(rows).execute()
+    return res.data or []
+
+def db_insert_row(table: str, row: Dict[str, Any]) -> Dict[str, Any] | None:
+    out = db_insert_rows(table, [row])
+    return out[0] if out else None
+
+def db_delete_row(table: str, row_id) -> None:
+    mirror = _mirror_for(table)
+    if mirror is not None:
+        mirror.delete(table, row_id)
+        return
+    supabase.table(table).delete().eq("id", row_id).execute()
+
 
 # ======================================================
 # NAVIGATION HELPERS
 # ======================================================
 def set_nav(dest: str):
     """Atalho para trocar a aba/nav atual e rerun."""
+    from services.water import flush_water  # grava água pendente ao navegar
+    flush_water(st.session_state.get("user_id"))
     st.session_state["nav"] = dest
     st.rerun()
 
@@ -1199,10 +1045,17 @@ def render_auth_gate():
                         st.session_state["user_id"] = user.id
                         st.session_state["user_email"] = user.email
 
-                        try:
-                            db_upsert_profile(user.id, user.email)
-                        except Exception:
-                            pass
+                        # upsert de perfil fora do caminho crítico do login
+                        from services.write_queue import get_write_queue
+                        get_write_queue().upsert(
+                            "profiles", {"id": user.id, "email": user.email}, on_conflict="id"
+                        )
+
+                        # perfil/pontos/coaching/jejum em paralelo; o roteador usa no próximo rerun
+                        from services.preload import LOGIN_PRELOAD_SEC, run_preload
+                        st.session_state["_preload"] = run_preload(
+                            user.id, timeout=LOGIN_PRELOAD_SEC
+                        ).keep_for_next_rerun()
 
                         if remember:
                             st.session_state["saved_email"] = email
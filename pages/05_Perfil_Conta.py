@@ -6,6 +6,9 @@
 # - Salva altura/peso em public.user_nutrition (se existir)
 # -------------------------------------------------------------
 import datetime as dt
+import os
+import shutil
+import tempfile
 import streamlit as st
 from datetime import date
 
@@ -22,8 +25,12 @@ from helpers import (
     add_points, award_badge,
     apply_theme, get_or_create_subscription,
 )
+from services.account_export import EXPORT_TABLES, FORMATS as EXPORT_FORMATS, export_account_zip
+from services.history_import import FORMAT_LABELS as IMPORT_FORMATS, import_history
+from services.tracing import begin_rerun, end_rerun
 
 apply_theme()
+begin_rerun("perfil")
 
 # -------- Sessão --------
 uid   = st.session_state.get("user_id")
@@ -109,3 +116,107 @@ if plan_id == "PRO":
     st.success("🔓 Receitas Premium: **Liberado**")
 else:
     st.warning("🔒 Receitas Premium: **Bloqueado** no seu plano atual.")
+
+st.divider()
+
+# ==========================
+# Exportar meus dados
+# ==========================
+st.subheader("Exportar meus dados")
+st.caption("Diário, pesos, medidas, follow ups, jejuns e eventos de pontos — um arquivo por tabela.")
+colE1, colE2 = st.columns([2, 1])
+with colE1:
+    formato = st.selectbox("Formato", list(EXPORT_FORMATS), key="export_format")
+with colE2:
+    st.write("")
+    gerar_export = st.button("📦 Gerar exportação", key="btn_export", use_container_width=True)
+
+def _descartar_export():
+    """Após o download (ou nova exportação): apaga o zip temporário."""
+    export = st.session_state.pop("_export_zip", None)
+    if export:
+        try:
+            os.remove(export[1])
+        except OSError:
+            pass
+
+if gerar_export:
+    _descartar_export()
+    barra = st.progress(0.0, text="Preparando…")
+
+    def _progresso(tabela: str, linhas: int):
+        i = EXPORT_TABLES.index(tabela)
+        barra.progress(i / len(EXPORT_TABLES), text=f"{tabela}: {linhas} linha(s)")
+
+    try:
+        arquivo, manifest = export_account_zip(uid, EXPORT_FORMATS[formato], on_progress=_progresso)
+        # no session_state fica só o caminho do zip (não os bytes)
+        with arquivo, tempfile.NamedTemporaryFile(prefix="calorIA_export_", suffix=".zip", delete=False) as tmp:
+            shutil.copyfileobj(arquivo, tmp)
+        st.session_state["_export_zip"] = (
+            f"calorIA_export_{dt.date.today():%Y%m%d}.zip", tmp.name, manifest,
+        )
+        barra.empty()
+    except Exception as e:
+        barra.empty()
+        st.error(f"Não foi possível exportar: {e}")
+
+export = st.session_state.get("_export_zip")
+if export and not os.path.exists(export[1]):
+    st.session_state.pop("_export_zip", None)
+    export = None
+if export:
+    nome_zip, caminho_zip, manifest = export
+    total = sum(t["rows"] for t in manifest["tables"].values())
+    falhas = [k for k, t in manifest["tables"].items() if t.get("error")]
+    with open(caminho_zip, "rb") as fh:
+        # servido uma vez: o clique baixa e descarta (o Streamlit mantém o
+        # arquivo baixável por mais um rerun)
+        st.download_button(
+            f"⬇️ Baixar ({total} linhas, {os.path.getsize(caminho_zip) / 1024:,.0f} KB)", data=fh,
+            file_name=nome_zip, mime="application/zip", key="btn_export_dl",
+            on_click=_descartar_export,
+        )
+    if falhas:
+        st.warning(f"Algumas tabelas não foram exportadas: {', '.join(falhas)}")
+
+st.divider()
+
+# ==========================
+# Importar histórico
+# ==========================
+st.subheader("Importar histórico de outros apps")
+st.caption(
+    "CSV exportado do MyFitnessPal (resumo nutricional), Cronometer (servings ou biometrics) "
+    "ou de balanças inteligentes (colunas de data e peso). Registros repetidos são ignorados."
+)
+arquivos_import = st.file_uploader(
+    "Arquivos CSV", type=["csv"], accept_multiple_files=True, key="import_files",
+)
+if arquivos_import and st.button("📥 Importar", key="btn_import"):
+    for arq in arquivos_import:
+        barra = st.progress(0.0, text=f"{arq.name}: lendo…")
+
+        def _progresso_import(frac: float, parcial, _barra=barra, _nome=arq.name):
+            _barra.progress(frac, text=f"{_nome}: {parcial.total_inserted} registro(s) gravado(s)")
+
+        try:
+            res = import_history(arq, uid, on_progress=_progresso_import)
+        except Exception as e:
+            barra.empty()
+            st.error(f"{arq.name}: falha na importação: {e}")
+            continue
+        barra.empty()
+        if res.fmt is None:
+            st.error(f"{arq.name}: formato não reconhecido.")
+            continue
+        msg = (
+            f"{arq.name} ({IMPORT_FORMATS[res.fmt]}): {res.total_inserted} importado(s), "
+            f"{res.duplicates} repetido(s), {res.invalid} linha(s) ignorada(s)."
+        )
+        if res.failed:
+            st.warning(msg + f" {res.failed} não puderam ser gravados; tente de novo.")
+        else:
+            st.success(msg)
+
+end_rerun()
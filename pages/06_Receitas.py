@@ -2,7 +2,8 @@
 # -------------------------------------------------------------
 # Receitas (via Supabase) com gating por plano (Free x PRO)
 # - Lê plano do st.session_state (setado no pós-login)
-# - Busca receitas em public.recipes
+# - Busca receitas em public.recipes (categorias do filtro vêm do
+#   catálogo em cache, services/recipe_catalog.py)
 # - Imagens do bucket 'recipes' no Storage
 # -------------------------------------------------------------
 import streamlit as st
@@ -18,10 +19,12 @@ st.set_page_config(
 from helpers import (
     get_or_create_subscription, get_rda_value,
     _show_image, storage_public_url, apply_theme,
-    db_list_recipes, recipe_image_public_url
+    db_list_recipes, recipe_image_public_url, db_user_rows
 )
+from services.tracing import begin_rerun, end_rerun
 
 apply_theme()
+begin_rerun("receitas")
 
 # -------------------------------------------------------------
 # Se NÃO estiver logado, volta pra Home
@@ -41,19 +44,27 @@ st.caption(
     + ("Acesso completo liberado." if is_pro else "Acesso parcial: 5 receitas grátis desbloqueadas.")
 )
 
+# Metas do dia (salvas no "Calcular" da aba Plano) -> ordenação por saldo de macros
+METAS = tuple(st.session_state.get(k) for k in ("kcal_alvo", "prot_g", "carb_g", "gord_g"))
+ORDEM_SALDO = "Cabe no que falta hoje"
+
 # -------- Filtros --------
 with st.container(border=True):
     cols = st.columns([2, 1, 1, 1])
     with cols[0]:
         q = st.text_input("Buscar por título", placeholder="Ex.: frango, aveia, salada…")
     with cols[1]:
-        all_rows = db_list_recipes()
-        cats = sorted({r["categoria"] for r in all_rows}) if all_rows else []
+        # categorias do catálogo em cache (não relê a tabela inteira a cada rerun)
+        from services.recipe_catalog import get_recipe_catalog
+        cats = sorted({c for c in get_recipe_catalog().categories if c})
         cat_sel = st.multiselect("Categoria", options=cats, default=[])
     with cols[2]:
         only_quick = st.toggle("Até 15 min", value=False)
     with cols[3]:
-        sort_opt = st.selectbox("Ordenar por", ["Relevância", "Menor kcal", "Maior proteína"])
+        sort_opts = ["Relevância", "Menor kcal", "Maior proteína"]
+        if all(v is not None for v in METAS):
+            sort_opts.append(ORDEM_SALDO)
+        sort_opt = st.selectbox("Ordenar por", sort_opts)
 
 # -------- Consulta --------
 rows = db_list_recipes(search=q, categorias=cat_sel if cat_sel else None)
@@ -66,12 +77,29 @@ if sort_opt == "Menor kcal":
 elif sort_opt == "Maior proteína":
     rows = sorted(rows, key=lambda r: float(r.get("proteina_g") or 0), reverse=True)
 
+encaixe: Dict[Any, tuple] = {}
+if sort_opt == ORDEM_SALDO:
+    from datetime import date
+    from services.recipe_recommender import fit_by_id, remaining_macros
+
+    hoje = db_user_rows(
+        "food_diary", uid, filters=[("eq", "ref_date", str(date.today()))],
+        columns="kcal, protein_g, carbs_g, fat_g",
+    )
+    consumido = [sum(float(r.get(c) or 0) for r in hoje) for c in ("kcal", "protein_g", "carbs_g", "fat_g")]
+    saldo = remaining_macros(METAS, consumido)
+    st.caption(
+        f"Saldo de hoje: {saldo[0]:,.0f} kcal • P {saldo[1]:.0f} g • C {saldo[2]:.0f} g • G {saldo[3]:.0f} g"
+    )
+    encaixe = fit_by_id(get_recipe_catalog(), saldo)
+    rows = sorted(rows, key=lambda r: encaixe.get(r.get("id"), (float("inf"), 1.0))[0])
+
 # -------- Gating por plano --------
 if is_pro:
     visiveis = rows
     bloqueadas = []
 else:
-    visiveis = [r for r in rows if r.get("degusta   cao_gratis")]
+    visiveis = [r for r in rows if r.get("degustacao_gratis")]
     bloqueadas = [r for r in rows if not r.get("degustacao_gratis")]
 
 # --- Micronutrientes ---
@@ -119,6 +147,8 @@ def card_receita(r: Dict[str, Any], locked: bool = False):
 
             show_micros(r, sex="M", age=30)  # depois puxa sexo/idade real
             st.write(f"**Kcal:** {kcal}  |  **P:** {P} g  •  **C:** {C} g  •  **G:** {G} g")
+            if r.get("id") in encaixe:
+                st.caption(f"Para o saldo de hoje: {encaixe[r['id']][1]:g} porção(ões)")
 
             if locked:
                 st.info("Receita Premium. Faça o upgrade do seu plano.")
@@ -149,3 +179,5 @@ else:
 
 st.divider()
 st.caption("Banco real • As imagens vêm do Storage. Use paginação se crescer muito.")
+
+end_rerun()
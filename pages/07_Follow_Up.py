@@ -1,6 +1,5 @@
 # pages/07_Follow_Up.py
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
 from pathlib import Path
 
@@ -14,10 +13,18 @@ st.set_page_config(
 from helpers import (
     apply_theme, supabase,
     storage_public_url, local_img_path,
-    add_points, award_badge, salvar_medidas, _show_image
+    add_points, award_badge, salvar_medidas, _show_image,
+    db_user_rows, db_insert_row,
+    lazy_import,
 )
 
+pd = lazy_import("pandas")
+from services.tracing import begin_rerun, end_rerun
+from services.progress_report import render_report_controls
+from services.body_composition import body_composition, chart_frame
+
 apply_theme()
+begin_rerun("follow_up")
 
 uid = st.session_state.get("user_id")
 if not uid:
@@ -89,7 +96,7 @@ else:
                     "notes_adherence": notes_adherence.strip() or None,
                 }
 
-                supabase.table("followups").insert(payload).execute()
+                db_insert_row("followups", payload)
                 st.success("Follow up salvo com sucesso!")
 
                 # Pontos + badge
@@ -104,16 +111,7 @@ else:
     st.divider()
     st.subheader("Seus últimos follow ups")
     try:
-        resp = (
-            supabase.table("followups")
-            .select("*")
-            .eq("user_id", uid)
-            .order("ref_date", desc=True)
-            .limit(20)
-            .execute()
-        )
-
-        rows = resp.data or []
+        rows = db_user_rows("followups", uid, order="ref_date", desc=True, limit=20)
         if not rows:
             st.caption("Ainda não há registros.")
         else:
@@ -174,15 +172,7 @@ else:
     # === Listagem medidas ===
     st.markdown("### Suas últimas medidas")
     try:
-        resp = (
-            supabase.table("measurements")
-            .select("*")
-            .eq("user_id", uid)
-            .order("ref_date", desc=True)
-            .limit(12)
-            .execute()
-        )
-        ms = resp.data or []
+        ms = db_user_rows("measurements", uid, order="ref_date", desc=True, limit=12)
         if not ms:
             st.caption("Ainda não há medições registradas.")
         else:
@@ -201,6 +191,47 @@ else:
     except Exception as e:
         st.warning(f"Não foi possível listar medidas: {e}")
 
+    # === Composição corporal ===
+    st.markdown("### 🧬 Composição corporal")
+    try:
+        bc = body_composition(uid)
+        if not len(bc):
+            st.caption("Registre medidas (cintura e quadril) para ver a análise.")
+        else:
+            def _metric(col, label, key, fmt, delta_inverse=True):
+                atual, anterior = bc.latest(key), bc.latest(key, back=1)
+                col.metric(
+                    label,
+                    "—" if atual is None else fmt.format(atual),
+                    None if atual is None or anterior is None else fmt.format(atual - anterior),
+                    delta_color="inverse" if delta_inverse else "normal",
+                )
+
+            k1, k2, k3, k4 = st.columns(4)
+            _metric(k1, "Cintura/quadril (RCQ)", "whr", "{:.2f}")
+            _metric(k2, "Cintura/altura (RCEst)", "whtr", "{:.2f}")
+            _metric(k3, "Gordura corporal", "bf_pct", "{:.1f}%")
+            _metric(k4, "Massa magra", "lean_kg", "{:.1f} kg", delta_inverse=False)
+
+            if bc.method is None:
+                st.info("Informe sua altura no perfil para estimar % de gordura e RCEst.")
+            else:
+                st.caption(
+                    ("% de gordura pelo método da Marinha dos EUA (pescoço, cintura, altura)"
+                     if bc.method == "navy" else
+                     "% de gordura estimado pela RFM (cintura e altura) — sem medida de pescoço")
+                    + " • massa magra usa o último peso registrado até a data da medida. "
+                    + "RCEst acima de 0,5 indica risco cardiometabólico aumentado."
+                )
+            if len(bc) > 1:
+                t1, t2 = st.tabs(["Gordura e massa magra", "Razões"])
+                with t1:
+                    st.line_chart(chart_frame(bc, ["bf_pct", "lean_kg"]))
+                with t2:
+                    st.line_chart(chart_frame(bc, ["whr", "whtr"]))
+    except Exception as e:
+        st.warning(f"Não foi possível calcular a composição corporal: {e}")
+
     # === Fotos de progresso ===
     st.divider()
     st.subheader("📸 Fotos de progresso (1x/mês)")
@@ -254,3 +285,10 @@ else:
                             st.caption(item["name"])
     except Exception as e:
         st.warning(f"Não foi possível listar as fotos: {e}")
+
+    # === Relatório de progresso ===
+    st.divider()
+    st.subheader("📑 Relatório de progresso")
+    render_report_controls(uid)
+
+end_rerun()
@@ -0,0 +1,151 @@
+# pages/08_Coach.py
+# -------------------------------------------------------------
+# Painel do coach (coorte)
+# - Acesso restrito a e-mails em COACH_EMAILS (secrets)
+# - Adesão ao diário, variação semanal de peso e frescor do check-in
+#   de todos os pacientes em coaching (consultas em lote + cache)
+# - Correlações das notas do check-in com peso e adesão ao diário
+# -------------------------------------------------------------
+import streamlit as st
+
+st.set_page_config(
+    page_title="Painel do Coach",
+    page_icon="🧑‍⚕️",
+    layout="wide",
+    initial_sidebar_state="collapsed"
+)
+
+from helpers import apply_theme, is_user_coach
+from services.coach_cohort import get_cohort_summary
+from services.followup_analytics import MIN_WEEKS, OUTCOMES, SCORES, cohort_analysis, user_analysis
+from services.progress_report import render_report_controls
+from services.tracing import begin_rerun, end_rerun
+
+apply_theme()
+begin_rerun("coach")
+
+uid = st.session_state.get("user_id")
+if not uid:
+    st.warning("Faça login para acessar o painel.")
+    st.stop()
+
+if not is_user_coach(st.session_state.get("user_email")):
+    st.warning("Painel disponível apenas para coaches.")
+    st.stop()
+
+st.title("🧑‍⚕️ Painel do Coach")
+
+colf1, colf2 = st.columns([1, 3])
+with colf1:
+    janela = st.selectbox("Janela (dias)", [7, 14, 28, 56], index=2)
+with colf2:
+    busca = st.text_input("Filtrar paciente", placeholder="Nome ou e-mail")
+
+if st.button("🔄 Atualizar dados", key="btn_coorte_refresh"):
+    get_cohort_summary.clear()
+
+try:
+    with st.spinner("Carregando coorte..."):
+        df = get_cohort_summary(janela)
+except Exception as e:
+    st.error(f"Não foi possível carregar a coorte: {e}")
+    st.stop()
+
+if df.empty:
+    st.info("Nenhum paciente em coaching encontrado.")
+    st.stop()
+
+if busca:
+    termo = busca.strip().lower()
+    df = df[
+        df["paciente"].fillna("").str.lower().str.contains(termo, regex=False)
+        | df["email"].fillna("").str.lower().str.contains(termo, regex=False)
+    ]
+
+# -------- Resumo --------
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Pacientes", len(df))
+m2.metric("Adesão média ao diário", f"{df['adesao_diario_pct'].mean():.0f}%")
+atrasados = int((df["dias_sem_checkin"].isna() | (df["dias_sem_checkin"] > 7)).sum())
+m3.metric("Check-in atrasado (>7d)", atrasados)
+m4.metric("Δ peso médio", f"{df['kg_semana'].mean():+.2f} kg/sem" if df["kg_semana"].notna().any() else "—")
+
+st.divider()
+
+show = df.rename(columns={
+    "paciente": "Paciente",
+    "email": "E-mail",
+    "dias_registrados": "Dias no diário",
+    "adesao_diario_pct": "Adesão diário (%)",
+    "kcal_media": "Kcal média/dia",
+    "adesao_checkin": "Adesão declarada (0–10)",
+    "ultimo_checkin": "Último check-in",
+    "dias_sem_checkin": "Dias sem check-in",
+    "kg_semana": "Δ peso (kg/sem)",
+})
+st.dataframe(
+    show.drop(columns=["user_id"]),
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        "Adesão diário (%)": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%d%%"),
+        "Último check-in": st.column_config.DateColumn(format="DD/MM/YYYY"),
+    },
+)
+st.caption(f"Dados cacheados por alguns minutos • janela de {janela} dias.")
+
+st.divider()
+st.subheader("📑 Relatório de progresso do paciente")
+pacientes = dict(zip(df["user_id"], df["paciente"].fillna(df["email"])))
+if pacientes:
+    alvo = st.selectbox(
+        "Paciente", list(pacientes), format_func=lambda u: pacientes.get(u) or u, key="coach_report_user",
+    )
+    render_report_controls(alvo, key="coach")
+
+st.divider()
+st.subheader("📈 Check-ins × resultados")
+colc1, colc2, colc3 = st.columns([1, 2, 2])
+with colc1:
+    escopo = st.radio("Escopo", ["Paciente", "Coorte"], horizontal=True, key="corr_escopo")
+with colc2:
+    desfecho = st.selectbox("Resultado", list(OUTCOMES), format_func=OUTCOMES.get, key="corr_desfecho")
+with colc3:
+    if escopo == "Paciente" and pacientes:
+        alvo_corr = st.selectbox(
+            "Paciente", list(pacientes), format_func=lambda u: pacientes.get(u) or u, key="corr_user",
+        )
+
+try:
+    with st.spinner("Calculando correlações..."):
+        if escopo == "Paciente":
+            analise = user_analysis(alvo_corr) if pacientes else None
+        else:
+            analise = cohort_analysis(list(pacientes))
+except Exception as e:
+    st.error(f"Não foi possível calcular as correlações: {e}")
+    analise = None
+
+if analise is not None:
+    if analise["weeks"] < MIN_WEEKS:
+        st.info(f"São necessárias ao menos {MIN_WEEKS} semanas com check-in (há {analise['weeks']}).")
+    else:
+        corr = analise["corr"][desfecho]
+        st.dataframe(
+            corr["r"], use_container_width=True,
+            column_config={c: st.column_config.NumberColumn(format="%.2f") for c in corr["r"].columns},
+        )
+        st.caption(
+            f"Correlação de Pearson entre a nota do check-in e “{OUTCOMES[desfecho]}” "
+            "na mesma semana e 1–2 semanas depois • "
+            f"{analise['weeks']} semana(s) com check-in, mínimo de {int(corr['n'].min().min())} pares por célula"
+            + (f" • {analise['patients']} paciente(s), cada um comparado à própria média" if escopo == "Coorte" else "")
+            + ". Correlação não implica causa."
+        )
+        if escopo == "Paciente":
+            movel = analise["rolling"][desfecho]
+            if not movel.empty:
+                nota = st.selectbox("Correlação móvel (8 semanas) da nota", list(SCORES.values()), key="corr_nota")
+                st.line_chart(movel[[nota]])
+
+end_rerun()
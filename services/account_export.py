@@ -0,0 +1,143 @@
+# services/account_export.py
+# -------------------------------------------------------------
+# Exportação completa dos dados da conta (página Perfil / Conta)
+# - Cada tabela por usuário é lida com paginação por chave (id) via
+#   db_user_pages(order="id") e escrita página a página num .zip
+# - Formatos: CSV, JSON Lines e Parquet (se pyarrow estiver instalado);
+#   um arquivo por tabela + manifest.json com contagens
+# - O zip vai para um SpooledTemporaryFile: pequeno fica na memória,
+#   grande transborda para disco; nenhuma tabela é carregada inteira
+# -------------------------------------------------------------
+import csv
+import io
+import json
+import tempfile
+import zipfile
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from helpers import db_user_pages, logger, module_available
+
+EXPORT_TABLES = (
+    "food_diary", "weight_logs", "measurements", "followups", "fasting_log", "user_points_events",
+)
+PAGE_SIZE = 1000
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+FORMATS = {"CSV": "csv", "JSON Lines": "jsonl"}
+if module_available("pyarrow"):
+    FORMATS["Parquet"] = "parquet"
+
+Progress = Callable[[str, int], None]          # (tabela, linhas até agora)
+
+
+def _cell(v: Any) -> Any:
+    """Listas/dicts (jsonb) viram texto JSON numa célula."""
+    if isinstance(v, (dict, list)):
+        return json.dumps(v, ensure_ascii=False)
+    return v
+
+
+class _CsvWriter:
+    def __init__(self, fh):
+        self._text = io.TextIOWrapper(fh, encoding="utf-8", newline="")
+        self._w: Optional[csv.DictWriter] = None
+
+    def write(self, rows: List[Dict[str, Any]]):
+        if self._w is None:
+            self._w = csv.DictWriter(self._text, fieldnames=list(rows[0]), extrasaction="ignore")
+            self._w.writeheader()
+        self._w.writerows({k: _cell(v) for k, v in r.items()} for r in rows)
+
+    def close(self):
+        self._text.flush()
+        self._text.detach()
+
+
+class _JsonlWriter:
+    def __init__(self, fh):
+        self._fh = fh
+
+    def write(self, rows: List[Dict[str, Any]]):
+        self._fh.write("".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in rows).encode("utf-8"))
+
+    def close(self):
+        pass
+
+
+class _ParquetWriter:
+    """Um row group por página. O schema sai da 1ª página; colunas só com
+       nulos ou com tipos mistos viram texto para as páginas seguintes."""
+
+    def __init__(self, fh):
+        self._fh = fh
+        self._w = None
+        self._schema = None
+
+    def _table(self, rows: List[Dict[str, Any]]):
+        import pyarrow as pa
+
+        if self._schema is None:
+            cols = list(rows[0])
+            inferred = pa.Table.from_pylist([{c: _cell(r.get(c)) for c in cols} for r in rows]).schema
+            self._schema = pa.schema([
+                pa.field(f.name, pa.string() if pa.types.is_null(f.type) else f.type) for f in inferred
+            ])
+        texto = {f.name for f in self._schema if pa.types.is_string(f.type)}
+        norm = [{
+            c: (None if r.get(c) is None else str(_cell(r[c])) if c in texto else _cell(r[c]))
+            for c in self._schema.names
+        } for r in rows]
+        return pa.Table.from_pylist(norm, schema=self._schema)
+
+    def write(self, rows: List[Dict[str, Any]]):
+        import pyarrow.parquet as pq
+
+        table = self._table(rows)
+        if self._w is None:
+            self._w = pq.ParquetWriter(self._fh, self._schema, compression="zstd")
+        self._w.write_table(table)
+
+    def close(self):
+        if self._w is not None:
+            self._w.close()
+
+
+_WRITERS = {"csv": _CsvWriter, "jsonl": _JsonlWriter, "parquet": _ParquetWriter}
+
+
+def _pages(table: str, user_id: str) -> Iterator[List[Dict[str, Any]]]:
+    return db_user_pages(table, user_id, order="id", page_size=PAGE_SIZE)
+
+
+def export_account_zip(user_id: str, fmt: str = "csv", on_progress: Optional[Progress] = None):
+    """Escreve o zip e devolve (arquivo temporário posicionado no início,
+       manifest). O chamador fecha o arquivo."""
+    out = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    manifest = {
+        "user_id": user_id,
+        "exported_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "format": fmt,
+        "tables": {},
+    }
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for table in EXPORT_TABLES:
+            n = 0
+            try:
+                with zf.open(f"{table}.{fmt}", "w", force_zip64=True) as fh:
+                    writer = _WRITERS[fmt](fh)
+                    for page in _pages(table, user_id):
+                        writer.write(page)
+                        n += len(page)
+                        if on_progress:
+                            on_progress(table, n)
+                    writer.close()
+                manifest["tables"][table] = {"rows": n}
+            except Exception as e:
+                logger.warning("export: %s falhou para user=%s: %s", table, user_id, e)
+                manifest["tables"][table] = {"rows": n, "error": str(e)}
+            if on_progress:
+                on_progress(table, n)
+        zf.writestr("manifest.json", json.dumps(manifest, ensure_ascii=False, indent=2))
+    out.seek(0)
+    return out, manifest
@@ -0,0 +1,194 @@
+# services/body_composition.py
+# -------------------------------------------------------------
+# Composição corporal a partir do histórico (página Follow-up)
+# - Séries alinhadas (NumPy) por data de medição: cintura, quadril,
+#   peso (as-of: último weight_logs até a data, no máx. ASOF_MAX_DAYS
+#   antes), RCQ (cintura/quadril), RCEst (cintura/altura), % de gordura
+#   e massa magra
+# - % de gordura: US Navy quando houver pescoço (neck_cm); sem ele,
+#   RFM (relative fat mass: só cintura e altura)
+# - Cache por usuário (st.cache_data) com versão invalidada quando mudam
+#   as entradas: medidas (helpers.salvar_medidas), pesos (app e
+#   importação de histórico) e altura/sexo do perfil (onboarding)
+# - Versões são únicas no processo e esquecidas BC_TTL_SEC depois da
+#   invalidação (o cache da versão anterior já expirou): o mapa só
+#   guarda usuários invalidados recentemente
+# - Gráficos passam por progress_report.downsample
+# -------------------------------------------------------------
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import streamlit as st
+
+from helpers import db_get_profile, db_user_pages
+
+BC_TTL_SEC = 600
+ASOF_MAX_DAYS = 30
+
+SERIES_LABELS = {
+    "waist": "Cintura (cm)", "hip": "Quadril (cm)", "weight": "Peso (kg)",
+    "whr": "RCQ", "whtr": "RCEst", "bf_pct": "Gordura (%)", "lean_kg": "Massa magra (kg)",
+}
+
+
+@dataclass
+class BodyComposition:
+    dates: np.ndarray               # (n,) datetime64[D], crescente
+    series: Dict[str, np.ndarray]   # chave de SERIES_LABELS -> (n,) float (nan = sem dado)
+    method: Optional[str]           # "navy", "rfm" ou None (sem altura)
+    height_cm: Optional[float]
+    sex: str
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def latest(self, key: str, back: int = 0) -> Optional[float]:
+        """Último valor válido (back=1: o anterior a ele)."""
+        vals = self.series[key]
+        ok = np.flatnonzero(~np.isnan(vals))
+        return float(vals[ok[-1 - back]]) if ok.size > back else None
+
+
+# ---------- cálculo (vetorizado) ----------
+def asof_join(left: np.ndarray, right: np.ndarray, values: np.ndarray, max_gap_days: int = ASOF_MAX_DAYS) -> np.ndarray:
+    """Para cada data em `left`, o valor de `right` (ordenado) mais recente até ela."""
+    out = np.full(left.shape, np.nan)
+    if right.size == 0:
+        return out
+    idx = np.searchsorted(right, left, side="right") - 1
+    ok = idx >= 0
+    ok[ok] &= (left[ok] - right[idx[ok]]).astype(int) <= max_gap_days
+    out[ok] = values[idx[ok]]
+    return out
+
+
+def navy_bf(sex: str, waist, neck, height, hip=None) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if sex == "F":
+            dens = 1.29579 - 0.35004 * np.log10(waist + hip - neck) + 0.22100 * np.log10(height)
+        else:
+            dens = 1.0324 - 0.19077 * np.log10(waist - neck) + 0.15456 * np.log10(height)
+        return 495.0 / dens - 450.0
+
+
+def rfm_bf(sex: str, waist, height) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 64.0 - 20.0 * (height / waist) + (12.0 if sex == "F" else 0.0)
+
+
+def _col(rows: List[dict], key: str) -> np.ndarray:
+    return np.array([float(r[key]) if r.get(key) not in (None, "", 0) else np.nan for r in rows], dtype=float)
+
+
+def _dates(rows: List[dict]) -> np.ndarray:
+    return np.array([str(r.get("ref_date"))[:10] for r in rows], dtype="datetime64[D]")
+
+
+def compute(measures: List[dict], weights: List[dict], height_cm: Optional[float], sex: str) -> BodyComposition:
+    measures = sorted((m for m in measures if m.get("ref_date")), key=lambda r: str(r["ref_date"])[:10])
+    weights = sorted((w for w in weights if w.get("ref_date") and w.get("weight_kg")), key=lambda r: str(r["ref_date"])[:10])
+
+    d = _dates(measures)
+    waist, hip, neck = _col(measures, "waist_cm"), _col(measures, "hip_cm"), _col(measures, "neck_cm")
+    weight = asof_join(d, _dates(weights), _col(weights, "weight_kg"))
+    h = float(height_cm) if height_cm else np.nan
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        whr = waist / hip
+        whtr = waist / h
+    method = None
+    bf = np.full(d.shape, np.nan)
+    if not np.isnan(h):
+        if np.any(~np.isnan(neck)):
+            method = "navy"
+            bf = navy_bf(sex, waist, neck, h, hip)
+        else:
+            method = "rfm"
+            bf = rfm_bf(sex, waist, h)
+        bf = np.where((bf > 2) & (bf < 70), bf, np.nan)          # fora disso: medida inconsistente
+    return BodyComposition(
+        dates=d,
+        series={
+            "waist": waist, "hip": hip, "weight": weight, "whr": whr, "whtr": whtr,
+            "bf_pct": bf, "lean_kg": weight * (1.0 - bf / 100.0),
+        },
+        method=method, height_cm=None if np.isnan(h) else h, sex=sex,
+    )
+
+
+# ---------- cache por usuário ----------
+class _Versions:
+    """user_id -> (versão, monotonic da invalidação), só dos últimos BC_TTL_SEC."""
+
+    def __init__(self, ttl: float = BC_TTL_SEC):
+        self.ttl = ttl
+        self._items: Dict[str, Tuple[int, float]] = {}
+        self._next = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        for uid in [u for u, (_, ts) in self._items.items() if now - ts > self.ttl]:
+            del self._items[uid]
+
+    def bump(self, user_id: str):
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            self._items[user_id] = (next(self._next), now)
+
+    def get(self, user_id: str) -> int:
+        with self._lock:
+            v = self._items.get(user_id)
+        return v[0] if v else 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+@st.cache_resource
+def _versions() -> _Versions:
+    return _Versions()
+
+
+def invalidate_body_composition(user_id: str):
+    _versions().bump(user_id)
+
+
+@st.cache_data(ttl=BC_TTL_SEC, show_spinner=False, max_entries=256)
+def _body_composition(user_id: str, version: int) -> BodyComposition:
+    measures = [r for page in db_user_pages("measurements", user_id) for r in page]
+    weights = [r for page in db_user_pages("weight_logs", user_id, columns="ref_date, weight_kg") for r in page]
+    prof = db_get_profile(user_id) or {}
+    sex = "F" if str(prof.get("sex") or "").lower().startswith("f") else "M"
+    return compute(measures, weights, prof.get("height_cm"), sex)
+
+
+def body_composition(user_id: str) -> BodyComposition:
+    return _body_composition(user_id, _versions().get(user_id))
+
+
+# ---------- gráficos ----------
+def chart_frame(bc: BodyComposition, keys: Sequence[str]):
+    """DataFrame (índice = data) com as séries pedidas, cada uma reduzida
+       por progress_report.downsample."""
+    import pandas as pd
+    from services.progress_report import downsample
+
+    cols = {}
+    for k in keys:
+        vals = bc.series[k]
+        ok = ~np.isnan(vals)
+        if not ok.any():
+            continue
+        x = bc.dates[ok].astype(int).astype(float)            # dias desde a época
+        pts = downsample(list(zip(x.tolist(), vals[ok].tolist())))
+        cols[SERIES_LABELS[k]] = pd.Series(
+            [p[1] for p in pts],
+            index=[date.fromordinal(int(round(p[0])) + date(1970, 1, 1).toordinal()) for p in pts],
+        )
+    return pd.DataFrame(cols).sort_index()
@@ -0,0 +1,397 @@
+# services/client_pool.py
+# -------------------------------------------------------------
+# Um cliente Supabase por sessão do Streamlit, sobre um transporte
+# HTTP compartilhado
+# - helpers.supabase é um SessionClientProxy: cada acesso resolve o
+#   cliente da sessão atual (login/JWT isolados por usuário); fora de
+#   uma sessão (threads de fundo, benchmarks) usa o cliente base
+# - Os clientes reais montam postgrest/storage/auth sobre UM
+#   httpx.HTTPTransport (pool de conexões keep-alive, HTTP/2): criar um
+#   cliente novo — ou recriá-lo a cada login/refresh de token, como o
+#   supabase-py faz — não abre conexão nem refaz TLS
+# - Pool limitado (LRU) com despejo por ociosidade. A sessão de auth
+#   mais recente de cada chave (a cada refresh — o Supabase gira o
+#   refresh token — e no despejo) fica guardada fora do cliente: o
+#   cliente recriado é restaurado com ela, nunca com tokens já gastos,
+#   e ela é devolvida ao sb_session no próximo acesso da sessão
+# - use_client(): fixa o cliente num bloco/thread (trabalho em segundo
+#   plano disparado por uma sessão continua com o JWT dela)
+# - capture_client(): referência fraca para filas/buffers; cliente já
+#   despejado é recriado a partir da sessão guardada (logout: None)
+# -------------------------------------------------------------
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+MAX_SESSION_CLIENTS = 200
+IDLE_TTL_SEC = 1800
+SAVED_AUTH_FACTOR = 4          # sessões de auth guardadas = MAX_SESSION_CLIENTS x isto
+HTTP_MAX_CONNECTIONS = 64
+HTTP_MAX_KEEPALIVE = 32
+HTTP_KEEPALIVE_SEC = 60.0
+
+_bound: ContextVar[Optional[Any]] = ContextVar("caloria_supabase_client", default=None)
+_bound_key: ContextVar[Optional[str]] = ContextVar("caloria_supabase_session", default=None)
+
+
+@contextmanager
+def use_client(client: Any, key: Optional[str] = None) -> Iterator[Any]:
+    """Dentro do bloco, helpers.supabase resolve para `client`.
+       key: sessão dona do cliente (capture_client() dentro do bloco a herda)."""
+    token = _bound.set(client)
+    key_token = _bound_key.set(key)
+    try:
+        yield client
+    finally:
+        _bound_key.reset(key_token)
+        _bound.reset(token)
+
+
+def current_client() -> Any:
+    """O cliente que helpers.supabase usaria agora (para levar a outra thread)."""
+    from helpers import supabase
+    return supabase.current() if isinstance(supabase, SessionClientProxy) else supabase
+
+
+class ClientRef:
+    """Referência fraca ao cliente de uma sessão (trabalho em segundo plano)."""
+
+    __slots__ = ("_ref", "session")
+
+    def __init__(self, client: Any, session: Optional[str]):
+        self._ref = weakref.ref(client)
+        self.session = session
+
+    def key(self) -> Any:
+        """Chave da sessão (ou identidade do cliente fixado/base)."""
+        if self.session is not None:
+            return self.session
+        client = self._ref()
+        return id(client) if client is not None else None
+
+    def get(self) -> Optional[Any]:
+        client = self._ref()
+        if client is None and self.session is not None:
+            from helpers import supabase
+            client = supabase.revive(self.session) if isinstance(supabase, SessionClientProxy) else None
+        return client
+
+
+def capture_client() -> ClientRef:
+    """Como current_client(), sem impedir que o pool libere o cliente."""
+    key = _bound_key.get() if _bound.get() is not None else session_key()
+    return ClientRef(current_client(), key)
+
+
+def session_key() -> Optional[str]:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+    return getattr(ctx, "session_id", None) if ctx else None
+
+
+# ---------- transporte HTTP compartilhado ----------
+def build_shared_transport(
+    max_connections: int = HTTP_MAX_CONNECTIONS,
+    max_keepalive: int = HTTP_MAX_KEEPALIVE,
+    keepalive_sec: float = HTTP_KEEPALIVE_SEC,
+):
+    """HTTPTransport com pool de conexões; close() dos clientes não o fecha."""
+    import httpx
+
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+    inner = httpx.HTTPTransport(
+        http2=http2, retries=1,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_sec,
+        ),
+    )
+
+    class _SharedTransport(httpx.BaseTransport):
+        def handle_request(self, request):
+            return inner.handle_request(request)
+
+        def close(self):                 # fechado só no fim do processo
+            pass
+
+    return _SharedTransport()
+
+
+def create_pooled_client(url: str, key: str, transport) -> Any:
+    """supabase.Client cujos clientes httpx usam `transport`."""
+    from gotrue.http_clients import SyncClient as AuthHttp
+    from postgrest import SyncPostgrestClient
+    from postgrest.utils import SyncClient as RestHttp
+    from storage3 import SyncStorageClient
+    from storage3.utils import SyncClient as StorageHttp
+    from supabase import Client, ClientOptions
+    from supabase._sync.auth_client import SyncSupabaseAuthClient
+
+    class _Rest(SyncPostgrestClient):
+        def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+            return RestHttp(base_url=base_url, headers=headers, timeout=timeout,
+                            follow_redirects=True, transport=transport)
+
+    class _Storage(SyncStorageClient):
+        def _create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+            return StorageHttp(base_url=base_url, headers=headers, timeout=timeout,
+                               follow_redirects=True, transport=transport)
+
+    class _PooledClient(Client):
+        @staticmethod
+        def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True):
+            kw = {} if timeout is None else {"timeout": timeout}
+            return _Rest(rest_url, headers=headers, schema=schema, **kw)
+
+        @staticmethod
+        def _init_storage_client(storage_url, headers, storage_client_timeout=None, verify=True):
+            if storage_client_timeout is None:
+                return _Storage(storage_url, headers)
+            return _Storage(storage_url, headers, storage_client_timeout)
+
+        @staticmethod
+        def _init_supabase_auth_client(auth_url, client_options, verify=True):
+            return SyncSupabaseAuthClient(
+                url=auth_url,
+                auto_refresh_token=client_options.auto_refresh_token,
+                persist_session=client_options.persist_session,
+                storage=client_options.storage,
+                headers=client_options.headers,
+                flow_type=client_options.flow_type,
+                http_client=AuthHttp(follow_redirects=True, transport=transport),
+            )
+
+    return _PooledClient.create(url, key, ClientOptions())
+
+
+def auth_session(client: Any) -> Optional[Any]:
+    """Sessão de auth atual do cliente, sem ida à rede."""
+    auth = getattr(getattr(client, "wrapped", client), "auth", None)
+    try:
+        if getattr(auth, "_persist_session", False):
+            return auth._get_valid_session(auth._storage.get_item(auth._storage_key))
+        if hasattr(auth, "_in_memory_session"):
+            return auth._in_memory_session
+        return auth.get_session()                # backend em memória
+    except Exception:
+        return None
+
+
+def close_client(client: Any):
+    """Para o timer de refresh do gotrue (sem sign_out: o token segue válido)."""
+    auth = getattr(getattr(client, "wrapped", client), "auth", None)
+    timer = getattr(auth, "_refresh_token_timer", None)
+    if timer is not None:
+        try:
+            timer.cancel()
+        except Exception:
+            pass
+
+
+# ---------- pool por sessão ----------
+class SessionClientPool:
+    """LRU de clientes por chave (id da sessão), com limite e ociosidade."""
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = MAX_SESSION_CLIENTS,
+        idle_ttl: float = IDLE_TTL_SEC,
+        on_evict: Callable[[Any], None] = close_client,
+    ):
+        self._factory = factory
+        self.max_size = max(1, int(max_size))
+        self.idle_ttl = float(idle_ttl)
+        self._on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._auth: "OrderedDict[str, Any]" = OrderedDict()    # chave -> sessão de auth mais recente
+        self._auth_dirty: set = set()                          # ainda não devolvidas ao sb_session
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "evicted_idle": 0, "evicted_lru": 0}
+
+    def get(self, key: str) -> Tuple[Any, bool]:
+        """(cliente, criado_agora)."""
+        now = time.monotonic()
+        with self._lock:
+            hit = self._entries.pop(key, None)
+            if hit is not None:
+                self._entries[key] = (hit[0], now)
+                return hit[0], False
+        client = self._factory()                # fora do lock: pode ser lento
+        with self._lock:
+            hit = self._entries.pop(key, None)
+            if hit is not None:                 # outra thread da sessão chegou antes
+                self._entries[key] = (hit[0], now)
+                evicted: List[Tuple[Optional[str], Any]] = [(None, client)]
+                client, created = hit[0], False
+            else:
+                self._entries[key] = (client, now)
+                self._stats["created"] += 1
+                evicted, created = self._evict_locked(now), True
+        if created:
+            self._watch(key, client)
+        self._release(evicted)
+        return client, created
+
+    def drop(self, key: str):
+        """Logout: libera o cliente e esquece a sessão de auth da chave."""
+        with self._lock:
+            hit = self._entries.pop(key, None)
+            self._auth.pop(key, None)
+            self._auth_dirty.discard(key)
+        if hit is not None:
+            self._on_evict(hit[0])
+
+    # ---------- sessão de auth por chave ----------
+    def _watch(self, key: str, client: Any):
+        auth = getattr(getattr(client, "wrapped", client), "auth", None)
+        subscribe = getattr(auth, "on_auth_state_change", None)
+        if subscribe is None:
+            return
+
+        def _on_auth(event, session):
+            if event == "SIGNED_OUT":
+                with self._lock:
+                    self._auth.pop(key, None)
+                    self._auth_dirty.discard(key)
+            elif session is not None:
+                self.save_auth(key, session)
+
+        try:
+            subscribe(_on_auth)
+        except Exception:
+            pass
+
+    def save_auth(self, key: str, session: Any):
+        with self._lock:
+            self._auth.pop(key, None)
+            self._auth[key] = session
+            self._auth_dirty.add(key)
+            while len(self._auth) > self.max_size * SAVED_AUTH_FACTOR:
+                old, _ = self._auth.popitem(last=False)
+                self._auth_dirty.discard(old)
+
+    def saved_auth(self, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._auth.get(key)
+
+    def pop_unpersisted_auth(self, key: str) -> Optional[Any]:
+        """Sessão nova (refresh/despejo) ainda não devolvida ao session_state."""
+        with self._lock:
+            if key not in self._auth_dirty:
+                return None
+            self._auth_dirty.discard(key)
+            return self._auth.get(key)
+
+    def _release(self, evicted: List[Tuple[Optional[str], Any]]):
+        for key, c in evicted:
+            if key is not None:
+                sess = auth_session(c)
+                if sess is not None:
+                    self.save_auth(key, sess)
+            self._on_evict(c)
+
+    def _evict_locked(self, now: float) -> List[Tuple[Optional[str], Any]]:
+        out = []
+        for k, (c, last) in list(self._entries.items()):
+            if now - last <= self.idle_ttl:
+                break                            # ordem de uso: o resto é mais recente
+            del self._entries[k]
+            out.append((k, c))
+            self._stats["evicted_idle"] += 1
+        while len(self._entries) > self.max_size:
+            k, (c, _) = self._entries.popitem(last=False)
+            out.append((k, c))
+            self._stats["evicted_lru"] += 1
+        return out
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {"size": len(self._entries), "saved_auth": len(self._auth), **self._stats}
+
+
+class SessionClientProxy:
+    """O objeto `helpers.supabase`: mesma API do cliente, resolvida por sessão."""
+
+    def __init__(
+        self,
+        base: Any,
+        pool: SessionClientPool,
+        restore: Optional[Callable[[Any, Optional[Any]], None]] = None,
+        persist: Optional[Callable[[Any], None]] = None,
+    ):
+        self._base = base
+        self._pool = pool
+        self._restore = restore          # (cliente novo, sessão guardada ou None)
+        self._persist = persist          # sessão nova -> session_state
+
+    @property
+    def base(self) -> Any:
+        return self._base
+
+    @property
+    def pool(self) -> SessionClientPool:
+        return self._pool
+
+    def current(self) -> Any:
+        bound = _bound.get()
+        if bound is not None:
+            return bound
+        key = session_key()
+        if key is None:
+            return self._base
+        client = self._client_for(key)
+        fresh = self._pool.pop_unpersisted_auth(key)
+        if fresh is not None and self._persist is not None:
+            try:
+                self._persist(fresh)
+            except Exception:
+                pass
+        return client
+
+    def _client_for(self, key: str) -> Any:
+        client, created = self._pool.get(key)
+        if created and self._restore is not None:
+            try:
+                self._restore(client, self._pool.saved_auth(key))
+            except Exception:
+                pass
+        return client
+
+    def revive(self, key: str) -> Optional[Any]:
+        """Cliente da chave para trabalho em segundo plano; None se a sessão
+           não tem auth guardada (logout ou nunca logou)."""
+        if self._pool.saved_auth(key) is None:
+            return None
+        return self._client_for(key)
+
+    def drop_current(self):
+        key = session_key()
+        if key is not None:
+            self._pool.drop(key)
+
+    # sinks de instrumentação ficam no cliente base (compartilhados)
+    def add_sink(self, sink):
+        self._base.add_sink(sink)
+
+    def remove_sink(self, sink):
+        self._base.remove_sink(sink)
+
+    def __getattr__(self, name: str):
+        return getattr(self.current(), name)
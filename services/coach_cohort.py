@@ -0,0 +1,144 @@
+# services/coach_cohort.py
+# -------------------------------------------------------------
+# Visão de coorte para coaches
+# - Carrega perfis em coaching, follow ups e pesos em poucas consultas
+#   em lote (in_ por blocos + paginação); o diário já vem somado por
+#   dia e o último check-in por paciente, calculados no banco
+#   (supabase/migrations/20261019000300_coach_cohort.sql)
+# - Agrega adesão, variação semanal de peso e frescor do check-in
+#   com groupby do pandas; a janela tem exatamente window_days dias
+#   (hoje incluso)
+# - Resultado cacheado com TTL curto (st.cache_data)
+# -------------------------------------------------------------
+from datetime import date, timedelta
+from typing import List, Dict, Any
+
+import pandas as pd
+import streamlit as st
+
+from helpers import supabase, db_fetch_all, logger
+
+# Blocos de ids por requisição: mantém a URL do in_() em poucos KB
+ID_CHUNK = 200
+COHORT_TTL_SEC = 120
+
+
+def _chunks(seq: List[str], size: int):
+    for i in range(0, len(seq), size):
+        yield seq[i:i + size]
+
+
+def _bulk_select(table: str, columns: str, user_ids: List[str], since: date) -> List[Dict[str, Any]]:
+    """Busca linhas de `table` de todos os usuários a partir de `since`,
+       em blocos de ids (não faz loop por usuário)."""
+    rows: List[Dict[str, Any]] = []
+    for chunk in _chunks(user_ids, ID_CHUNK):
+        rows.extend(db_fetch_all(
+            lambda chunk=chunk: supabase.table(table)
+            .select(columns)
+            .in_("user_id", chunk)
+            .gte("ref_date", str(since))
+            .order("ref_date", desc=False)
+        ))
+    return rows
+
+
+def _bulk_rpc(fn: str, user_ids: List[str], **params) -> List[Dict[str, Any]]:
+    """Chama a função `fn` do banco por blocos de ids (com paginação)."""
+    rows: List[Dict[str, Any]] = []
+    for chunk in _chunks(user_ids, ID_CHUNK):
+        rows.extend(db_fetch_all(
+            lambda chunk=chunk: supabase.rpc(fn, {"p_user_ids": chunk, **params})
+        ))
+    return rows
+
+
+def load_coached_profiles() -> pd.DataFrame:
+    rows = db_fetch_all(
+        lambda: supabase.table("profiles")
+        .select("id, full_name, nome, email")
+        .eq("coaching", True)
+        .order("id")
+    )
+    df = pd.DataFrame(rows, columns=["id", "full_name", "nome", "email"])
+    df["paciente"] = df["full_name"].fillna(df["nome"]).fillna(df["email"])
+    return df.rename(columns={"id": "user_id"})[["user_id", "paciente", "email"]]
+
+
+def _weekly_weight_change(weights: pd.DataFrame) -> pd.Series:
+    """kg/semana por usuário: (último - primeiro) / dias * 7."""
+    if weights.empty:
+        return pd.Series(dtype=float, name="kg_semana")
+    w = weights.dropna(subset=["weight_kg"]).sort_values(["user_id", "ref_date"])
+    g = w.groupby("user_id")
+    first = g.first()
+    last = g.last()
+    days = (last["ref_date"] - first["ref_date"]).dt.days
+    delta = last["weight_kg"] - first["weight_kg"]
+    return (delta / days.where(days > 0) * 7).round(2).rename("kg_semana")
+
+
+def build_cohort_summary(window_days: int = 28) -> pd.DataFrame:
+    """Monta a tabela da coorte. Uma linha por paciente em coaching."""
+    hoje = date.today()
+    since = hoje - timedelta(days=window_days - 1)   # gte: window_days dias, hoje incluso
+
+    profiles = load_coached_profiles()
+    if profiles.empty:
+        return profiles
+    user_ids = profiles["user_id"].astype(str).tolist()
+
+    fu = pd.DataFrame(
+        _bulk_select("followups", "user_id, ref_date, adherence", user_ids, since),
+        columns=["user_id", "ref_date", "adherence"],
+    )
+    wl = pd.DataFrame(
+        _bulk_select("weight_logs", "user_id, ref_date, weight_kg", user_ids, since),
+        columns=["user_id", "ref_date", "weight_kg"],
+    )
+    # Diário: totais diários (somados no banco) -> dias com registro na janela
+    daily = pd.DataFrame(
+        _bulk_rpc("coach_diary_daily", user_ids, p_since=str(since)),
+        columns=["user_id", "ref_date", "kcal"],
+    )
+    last = pd.DataFrame(
+        _bulk_rpc("coach_last_checkins", user_ids),
+        columns=["user_id", "ultimo_checkin"],
+    )
+    for df in (fu, wl, daily):
+        df["ref_date"] = pd.to_datetime(df["ref_date"])
+    daily["kcal"] = pd.to_numeric(daily["kcal"])
+    last["ultimo_checkin"] = pd.to_datetime(last["ultimo_checkin"])
+
+    diary = daily.groupby("user_id").agg(
+        dias_registrados=("ref_date", "nunique"),
+        kcal_media=("kcal", "mean"),
+    )
+    diary["adesao_diario_pct"] = (diary["dias_registrados"] / window_days * 100).round(0)
+
+    # Follow ups: último check-in (de todo o histórico) e adesão média declarada na janela
+    checkins = last.set_index("user_id").join(fu.groupby("user_id").agg(adesao_checkin=("adherence", "mean")), how="outer")
+    checkins["dias_sem_checkin"] = (pd.Timestamp(hoje) - checkins["ultimo_checkin"]).dt.days
+
+    summary = (
+        profiles.set_index("user_id")
+        .join(diary, how="left")
+        .join(checkins, how="left")
+        .join(_weekly_weight_change(wl), how="left")
+        .reset_index()
+    )
+    summary["dias_registrados"] = summary["dias_registrados"].fillna(0).astype(int)
+    summary["adesao_diario_pct"] = summary["adesao_diario_pct"].fillna(0)
+    summary["kcal_media"] = summary["kcal_media"].round(0)
+    summary["adesao_checkin"] = summary["adesao_checkin"].round(1)
+    logger.info(
+        "Coorte: %d pacientes, %d follow ups, %d pesos, %d dias de diário",
+        len(profiles), len(fu), len(wl), len(daily),
+    )
+    return summary.sort_values("dias_sem_checkin", ascending=False, na_position="first")
+
+
+@st.cache_data(ttl=COHORT_TTL_SEC, show_spinner=False)
+def get_cohort_summary(window_days: int = 28) -> pd.DataFrame:
+    """Versão cacheada (compartilhada entre sessões) do resumo da coorte."""
+    return build_cohort_summary(window_days)
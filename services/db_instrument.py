@@ -0,0 +1,267 @@
+# services/db_instrument.py
+# -------------------------------------------------------------
+# Instrumentação do cliente Supabase (real ou em memória)
+# - InstrumentedClient envolve o cliente e avisa os "sinks" registrados
+#   a cada ida à rede: REST (execute), RPC, Storage e Auth
+# - A API do cliente não muda: table()/from_()/rpc()/storage/auth
+# - count_calls(): conta chamadas por tabela/operação dentro de um bloco
+#   (base do orçamento de consultas por página)
+# - Cada Call leva filtros, nº de linhas, tamanho do payload e latência
+#   (usados pelo tracing por rerun em services/tracing.py)
+# - Clientes por sessão (services/client_pool.py) usam sinks_from= para
+#   reportar aos sinks do cliente base
+# -------------------------------------------------------------
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+_QUERY_OPS = {"select", "insert", "upsert", "update", "delete"}
+_WRITE_OPS = {"insert", "upsert", "update", "delete", "upload", "remove", "move", "copy", "update_file"}
+# RPCs que gravam -> tabelas que alteram (supabase/migrations)
+WRITE_RPCS = {
+    "award_points": ("user_points_events", "user_points"),
+    "award_badge": ("user_points",),
+}
+# métodos que não saem para a rede (montam URL / leem estado local)
+_LOCAL_OPS = {"get_public_url", "get_session", "on_auth_state_change"}
+_NOT_FILTERS = {"single", "maybe_single", "execute"}
+_ARG_MAX = 40
+
+
+@dataclass
+class Call:
+    kind: str          # "rest" | "rpc" | "storage" | "auth"
+    target: str        # tabela, função, bucket ou "auth"
+    op: str
+    ms: float
+    ok: bool
+    filters: Tuple[str, ...] = ()
+    rows: Optional[int] = None
+    payload_bytes: int = 0
+    started: float = 0.0           # time.perf_counter() no início da chamada
+
+    @property
+    def category(self) -> str:
+        if self.kind == "auth":
+            return "auth"
+        if self.kind == "rpc":
+            return "write" if self.target in WRITE_RPCS else "read"
+        return "write" if self.op in _WRITE_OPS else "read"
+
+    @property
+    def tables(self) -> Tuple[str, ...]:
+        """Tabelas (ou bucket) alteradas por uma gravação."""
+        return WRITE_RPCS.get(self.target, ()) if self.kind == "rpc" else (self.target,)
+
+    @property
+    def key(self) -> str:
+        return f"{self.target}.{self.op}"
+
+
+Sink = Callable[[Call], None]
+
+
+class InstrumentedClient:
+    """Proxy do cliente Supabase que reporta cada chamada aos sinks."""
+
+    def __init__(self, client: Any, sinks_from: Optional["InstrumentedClient"] = None):
+        self._client = client
+        self._sinks: List[Sink] = []
+        self._sinks_from = sinks_from
+        self._lock = threading.Lock()
+
+    # ---------- sinks ----------
+    def add_sink(self, sink: Sink):
+        with self._lock:
+            self._sinks = self._sinks + [sink]
+
+    def remove_sink(self, sink: Sink):
+        with self._lock:
+            self._sinks = [s for s in self._sinks if s is not sink]
+
+    def _emit(self, call: Call):
+        for sink in (self._sinks_from or self)._sinks:
+            try:
+                sink(call)
+            except Exception:
+                pass
+
+    # ---------- API do cliente ----------
+    def table(self, name: str) -> "_Query":
+        return _Query(self, self._client.table(name), "rest", name)
+
+    def from_(self, name: str) -> "_Query":
+        return self.table(name)
+
+    def rpc(self, fn: str, params: Any = None, *args, **kwargs) -> "_Query":
+        return _Query(self, self._client.rpc(fn, params or {}, *args, **kwargs), "rpc", fn, "rpc")
+
+    @property
+    def storage(self) -> "_Storage":
+        return _Storage(self, self._client.storage, "storage", "storage")
+
+    @property
+    def auth(self) -> "_Direct":
+        return _Direct(self, self._client.auth, "auth", "auth")
+
+    @property
+    def wrapped(self) -> Any:
+        return self._client
+
+    def __getattr__(self, name: str):
+        return getattr(self._client, name)
+
+
+def _short(v: Any) -> str:
+    r = repr(v)
+    return r if len(r) <= _ARG_MAX else r[:_ARG_MAX - 1] + "…"
+
+
+def _payload_size(v: Any) -> int:
+    if v is None:
+        return 0
+    if isinstance(v, (bytes, bytearray)):
+        return len(v)
+    try:
+        return len(json.dumps(v, default=str).encode("utf-8"))
+    except Exception:
+        return 0
+
+
+def _row_count(res: Any) -> Optional[int]:
+    data = getattr(res, "data", None)
+    if isinstance(data, list):
+        return len(data)
+    return 1 if data else 0 if res is not None else None
+
+
+class _Query:
+    """Builder do PostgREST: encadeia normalmente e mede no execute()."""
+
+    __slots__ = ("_owner", "_q", "_kind", "_target", "_op", "_filters", "_payload")
+
+    def __init__(self, owner: InstrumentedClient, q: Any, kind: str, target: str, op: str = "",
+                 filters: Tuple[str, ...] = (), payload: int = 0):
+        self._owner, self._q, self._kind, self._target, self._op = owner, q, kind, target, op
+        self._filters, self._payload = filters, payload
+
+    def execute(self):
+        t0 = time.perf_counter()
+        res, ok = None, False
+        try:
+            res = self._q.execute()
+            ok = True
+            return res
+        finally:
+            self._owner._emit(Call(
+                self._kind, self._target, self._op or "select",
+                (time.perf_counter() - t0) * 1000.0, ok,
+                filters=self._filters, rows=_row_count(res) if ok else None,
+                payload_bytes=self._payload, started=t0,
+            ))
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._q, name)
+        if not callable(attr):
+            return attr
+
+        def _chain(*args, **kwargs):
+            res = attr(*args, **kwargs)
+            if res is None or not hasattr(res, "execute"):
+                return res
+            op, filters, payload = self._op, self._filters, self._payload
+            if name in _QUERY_OPS and not op:
+                op = name
+                if name != "select" and args:
+                    payload = _payload_size(args[0])
+            elif name not in _NOT_FILTERS:
+                filters = filters + (f"{name}({', '.join(_short(a) for a in args)})",)
+            return _Query(self._owner, res, self._kind, self._target, op, filters, payload)
+
+        return _chain
+
+
+class _Direct:
+    """Objetos cujos métodos já vão à rede (bucket do Storage, Auth)."""
+
+    __slots__ = ("_owner", "_obj", "_kind", "_target")
+
+    def __init__(self, owner: InstrumentedClient, obj: Any, kind: str, target: str):
+        self._owner, self._obj, self._kind, self._target = owner, obj, kind, target
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._obj, name)
+        if not callable(attr) or name.startswith("_") or name in _LOCAL_OPS:
+            return attr
+
+        def _call(*args, **kwargs):
+            t0 = time.perf_counter()
+            res, ok = None, False
+            try:
+                res = attr(*args, **kwargs)
+                ok = True
+                return res
+            finally:
+                rows = len(res) if ok and isinstance(res, list) else None
+                self._owner._emit(Call(
+                    self._kind, self._target, name, (time.perf_counter() - t0) * 1000.0, ok,
+                    filters=tuple(_short(a) for a in args[:1] if isinstance(a, str)), rows=rows,
+                    payload_bytes=_payload_size(args[1]) if name == "upload" and len(args) > 1 else 0,
+                    started=t0,
+                ))
+
+        return _call
+
+
+class _Storage(_Direct):
+    __slots__ = ()
+
+    def from_(self, bucket: str) -> _Direct:
+        return _Direct(self._owner, self._obj.from_(bucket), "storage", bucket)
+
+
+# ---------- contagem ----------
+class CallCounts:
+    def __init__(self):
+        self.calls: List[Call] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, call: Call):
+        with self._lock:
+            self.calls.append(call)
+
+    @property
+    def by_key(self) -> Counter:
+        return Counter(c.key for c in self.calls)
+
+    def count(self, category: str) -> int:
+        return sum(1 for c in self.calls if c.category == category)
+
+    @property
+    def reads(self) -> int:
+        return self.count("read")
+
+    @property
+    def writes(self) -> int:
+        return self.count("write")
+
+    @property
+    def total(self) -> int:
+        return len(self.calls)
+
+
+@contextmanager
+def count_calls(client: Any = None) -> Iterator[CallCounts]:
+    """Conta as chamadas ao backend feitas dentro do bloco (todas as threads)."""
+    if client is None:
+        from helpers import supabase as client
+    counts = CallCounts()
+    client.add_sink(counts)
+    try:
+        yield counts
+    finally:
+        client.remove_sink(counts)
@@ -0,0 +1,714 @@
+# services/fake_supabase.py
+# -------------------------------------------------------------
+# Substituto em memória do cliente Supabase (PostgREST/Storage/Auth)
+# - Implementa o subconjunto do query builder usado no app:
+#   table().select/insert/upsert/update/delete + eq/neq/gt/gte/lt/lte/
+#   ilike/in_/order/limit/range/single/execute, rpc(),
+#   storage.from_().upload/list/remove/download (com transform)/
+#   create_signed_url(s)/get_public_url
+#   e auth.sign_in_with_password/sign_up/sign_in_with_oauth/get_session/sign_out
+# - Tabelas em memória (dict de listas), semente opcional via JSON
+# - Latência artificial configurável por chamada de rede simulada
+# - Selecionado por SUPABASE_BACKEND=memory (secret ou variável de ambiente)
+# -------------------------------------------------------------
+import copy
+import fnmatch
+import json
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+FAKE_URL = "http://localhost:54321"
+
+# Tabelas cuja chave primária não é "id" (usadas no upsert sem on_conflict)
+PRIMARY_KEYS = {
+    "user_points": "user_id",
+    "user_nutrition": "user_id",
+}
+
+# Restrições UNIQUE além da PK (o app depende delas, ex.: pontos diários)
+UNIQUE_KEYS: Dict[str, List[tuple]] = {
+    "user_points_events": [("user_id", "event_type", "event_key")],
+    "water_log": [("user_id", "ref_date")],
+}
+
+# Triggers de supabase/migrations/*_mirror_sync.sql: updated_at a cada
+# gravação e tombstone em deleted_rows a cada exclusão
+SYNC_TABLES = ("food_diary", "weight_logs", "measurements", "followups", "fasting_log")
+
+# Valores padrão de colunas (equivalente aos DEFAULTs do banco)
+COLUMN_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "user_points": {"points": 0, "badges": []},
+}
+
+
+class FakeAPIError(Exception):
+    """Mesmo papel do postgrest.APIError: erro devolvido pela API."""
+
+    def __init__(self, message: str, code: str = "PGRST000"):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+@dataclass
+class FakeResponse:
+    data: Any
+    count: Optional[int] = None
+
+
+def _now_iso() -> str:
+    return datetime.utcnow().isoformat() + "+00:00"
+
+
+def _cmp_key(v):
+    # None por último, como o ORDER BY padrão do Postgres (ASC NULLS LAST)
+    return (v is None, v if not isinstance(v, (dict, list)) else str(v))
+
+
+class FakeStore:
+    """Estado compartilhado: tabelas, arquivos, usuários e latência."""
+
+    def __init__(self, latency_ms: float = 0.0, seed: Optional[Dict[str, List[dict]]] = None):
+        self.latency_ms = float(latency_ms)
+        self.tables: Dict[str, List[dict]] = {}
+        self.buckets: Dict[str, Dict[str, bytes]] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}     # email -> {id, email, password}
+        self.rpcs: Dict[str, Callable[..., Any]] = dict(SERVER_RPCS)
+        self.calls: Optional[List[dict]] = None
+        self.lock = threading.RLock()
+        for table, rows in (seed or {}).items():
+            if table == "_users":
+                for u in rows:
+                    self.add_user(u["email"], u.get("password", ""), u.get("id"))
+            else:
+                self.tables[table] = [copy.deepcopy(r) for r in rows]
+
+    def wait(self):
+        if self.latency_ms > 0:
+            time.sleep(self.latency_ms / 1000.0)
+
+    # ---------- registro de chamadas (benchmarks) ----------
+    def start_recording(self):
+        self.calls = []
+
+    def stop_recording(self) -> List[dict]:
+        calls, self.calls = self.calls or [], None
+        return calls
+
+    def record(self, kind: str, target: str, op: str, sent: Any = None, received: Any = None):
+        """Anota uma "ida à rede" com bytes aproximados (JSON) enviados/recebidos."""
+        if self.calls is None:
+            return
+        self.calls.append({
+            "kind": kind, "target": target, "op": op,
+            "bytes_out": _size(sent), "bytes_in": _size(received),
+        })
+
+    def rows(self, table: str) -> List[dict]:
+        return self.tables.setdefault(table, [])
+
+    def add_user(self, email: str, password: str, uid: Optional[str] = None) -> Dict[str, Any]:
+        with self.lock:
+            user = {"id": uid or str(uuid.uuid4()), "email": email, "password": password}
+            self.users[email.lower()] = user
+            return user
+
+
+class FakeQuery:
+    def __init__(self, store: FakeStore, table: str):
+        self._store = store
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._payload: Any = None
+        self._on_conflict: Optional[str] = None
+        self._ignore_duplicates = False
+        self._filters: List[Callable[[dict], bool]] = []
+        self._order: List[tuple] = []
+        self._limit: Optional[int] = None
+        self._offset = 0
+        self._single = False
+        self._maybe_single = False
+        self._count: Optional[str] = None
+
+    # ---------- operações ----------
+    def select(self, columns: str = "*", count: Optional[str] = None, **_):
+        self._op, self._columns, self._count = "select", columns, count
+        return self
+
+    def insert(self, json, *, upsert: bool = False, returning: str = "representation", **_):
+        self._op = "upsert" if upsert else "insert"
+        self._payload = json
+        return self
+
+    def upsert(self, json, *, on_conflict: str = "", ignore_duplicates: bool = False,
+               returning: str = "representation", **_):
+        self._op, self._payload = "upsert", json
+        self._on_conflict = on_conflict or None
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json, **_):
+        self._op, self._payload = "update", json
+        return self
+
+    def delete(self, **_):
+        self._op = "delete"
+        return self
+
+    # ---------- filtros ----------
+    def _add(self, fn):
+        self._filters.append(fn)
+        return self
+
+    def eq(self, col, val):
+        return self._add(lambda r: _norm(r.get(col)) == _norm(val))
+
+    def neq(self, col, val):
+        return self._add(lambda r: _norm(r.get(col)) != _norm(val))
+
+    def gt(self, col, val):
+        return self._add(lambda r: r.get(col) is not None and _norm(r.get(col)) > _norm(val))
+
+    def gte(self, col, val):
+        return self._add(lambda r: r.get(col) is not None and _norm(r.get(col)) >= _norm(val))
+
+    def lt(self, col, val):
+        return self._add(lambda r: r.get(col) is not None and _norm(r.get(col)) < _norm(val))
+
+    def lte(self, col, val):
+        return self._add(lambda r: r.get(col) is not None and _norm(r.get(col)) <= _norm(val))
+
+    def ilike(self, col, pattern):
+        pat = str(pattern).lower().replace("%", "*").replace("_", "?")
+        return self._add(lambda r: r.get(col) is not None and fnmatch.fnmatchcase(str(r.get(col)).lower(), pat))
+
+    def in_(self, col, values):
+        vals = {_norm(v) for v in values}
+        return self._add(lambda r: _norm(r.get(col)) in vals)
+
+    def is_(self, col, val):
+        target = None if val in (None, "null") else val
+        return self._add(lambda r: r.get(col) is target)
+
+    # ---------- modificadores ----------
+    def order(self, column: str, *, desc: bool = False, **_):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **_):
+        self._limit = int(size)
+        return self
+
+    def offset(self, size: int):
+        self._offset = int(size)
+        return self
+
+    def range(self, start: int, end: int, **_):
+        self._offset, self._limit = int(start), int(end) - int(start) + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def maybe_single(self):
+        self._maybe_single = True
+        return self
+
+    # ---------- execução ----------
+    def execute(self) -> FakeResponse:
+        self._store.wait()
+        res = None
+        try:
+            res = self._execute()
+            return res
+        finally:
+            self._store.record("rest", self._table, self._op, self._payload, res.data if res else None)
+
+    def _execute(self) -> FakeResponse:
+        with self._store.lock:
+            rows = self._store.rows(self._table)
+            if self._op == "select":
+                return self._finish(self._select(rows))
+            if self._op == "insert":
+                return self._finish(self._insert(rows, self._as_list()))
+            if self._op == "upsert":
+                return self._finish(self._upsert(rows, self._as_list()))
+            if self._op == "update":
+                out = []
+                for r in rows:
+                    if self._match(r):
+                        r.update(copy.deepcopy(self._payload))
+                        self._touch(r)
+                        out.append(copy.deepcopy(r))
+                return self._finish(out)
+            if self._op == "delete":
+                keep, out = [], []
+                for r in rows:
+                    (out if self._match(r) else keep).append(r)
+                rows[:] = keep
+                self._tombstone(out)
+                return self._finish(out)
+        raise FakeAPIError(f"Operação não suportada: {self._op}")
+
+    def _as_list(self) -> List[dict]:
+        payload = self._payload if isinstance(self._payload, list) else [self._payload]
+        return [copy.deepcopy(p) for p in payload]
+
+    def _match(self, r: dict) -> bool:
+        return all(f(r) for f in self._filters)
+
+    def _select(self, rows: List[dict]) -> List[dict]:
+        out = [r for r in rows if self._match(r)]
+        for col, desc in reversed(self._order):
+            out.sort(key=lambda r: _cmp_key(r.get(col)), reverse=desc)
+        self._total = len(out)
+        out = out[self._offset:]
+        if self._limit is not None:
+            out = out[: self._limit]
+        return [_project(r, self._columns) for r in out]
+
+    def _with_defaults(self, row: dict) -> dict:
+        full = copy.deepcopy(COLUMN_DEFAULTS.get(self._table, {}))
+        full.update(row)
+        if PRIMARY_KEYS.get(self._table, "id") == "id":
+            full.setdefault("id", str(uuid.uuid4()))
+        full.setdefault("created_at", _now_iso())
+        if self._table in SYNC_TABLES:
+            full.setdefault("updated_at", _now_iso())
+        return full
+
+    def _touch(self, row: dict):
+        if self._table in SYNC_TABLES:
+            row["updated_at"] = _now_iso()
+
+    def _tombstone(self, deleted: List[dict]):
+        if self._table not in SYNC_TABLES or not deleted:
+            return
+        tomb = self._store.rows("deleted_rows")
+        ids = {str(r.get("id")) for r in deleted}
+        tomb[:] = [t for t in tomb if not (t["tbl"] == self._table and t["row_id"] in ids)]
+        now = _now_iso()
+        tomb.extend(
+            {"tbl": self._table, "row_id": str(r.get("id")), "user_id": r.get("user_id"), "deleted_at": now}
+            for r in deleted
+        )
+
+    def _insert(self, rows: List[dict], new: List[dict]) -> List[dict]:
+        n0 = len(rows)
+        try:
+            return self._insert_rows(rows, new)
+        except FakeAPIError:
+            del rows[n0:]                # um comando só: tudo ou nada, como no Postgres
+            raise
+
+    def _insert_rows(self, rows: List[dict], new: List[dict]) -> List[dict]:
+        out = []
+        for row in new:
+            full = self._with_defaults(row)
+            pk = PRIMARY_KEYS.get(self._table, "id")
+            # id gerado aqui (uuid4) não colide: pula a varredura O(n) da PK
+            checks = ([(pk,)] if pk in row else []) + UNIQUE_KEYS.get(self._table, [])
+            for cols in checks:
+                if all(c in full for c in cols) and any(
+                    all(_norm(r.get(c)) == _norm(full[c]) for c in cols) for r in rows
+                ):
+                    raise FakeAPIError(
+                        f'duplicate key value violates unique constraint "{self._table}_{"_".join(cols)}_key"',
+                        "23505",
+                    )
+            rows.append(full)
+            out.append(copy.deepcopy(full))
+        return out
+
+    def _upsert(self, rows: List[dict], new: List[dict]) -> List[dict]:
+        keys = [c.strip() for c in (self._on_conflict or PRIMARY_KEYS.get(self._table, "id")).split(",")]
+        out = []
+        for row in new:
+            existing = None
+            if all(k in row for k in keys):
+                existing = next(
+                    (r for r in rows if all(_norm(r.get(k)) == _norm(row[k]) for k in keys)), None
+                )
+            if existing is not None:
+                if not self._ignore_duplicates:
+                    existing.update(row)
+                    self._touch(existing)
+                out.append(copy.deepcopy(existing))
+            else:
+                full = self._with_defaults(row)
+                rows.append(full)
+                out.append(copy.deepcopy(full))
+        return out
+
+    def _finish(self, data: List[dict]) -> FakeResponse:
+        count = getattr(self, "_total", len(data)) if self._count else None
+        if self._single:
+            if len(data) != 1:
+                raise FakeAPIError(
+                    "JSON object requested, multiple (or no) rows returned", "PGRST116"
+                )
+            return FakeResponse(data[0], count)
+        if self._maybe_single:
+            return FakeResponse(data[0] if data else None, count)
+        return FakeResponse(data, count)
+
+
+def _size(obj: Any) -> int:
+    if obj is None:
+        return 0
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    return len(json.dumps(obj, default=str))
+
+
+def _norm(v):
+    """Compara valores como o PostgREST (tudo vira texto na URL):
+       números (mesmo em texto) comparam como número, o resto como texto."""
+    if v is None:
+        return None
+    if isinstance(v, bool):
+        return (1, str(v).lower())
+    if isinstance(v, (int, float)):
+        return (0, float(v))
+    s = str(v)
+    try:
+        return (0, float(s))
+    except ValueError:
+        return (1, s)
+
+
+def _project(row: dict, columns: str) -> dict:
+    cols = [c.strip() for c in (columns or "*").split(",") if c.strip()]
+    if not cols or "*" in cols:
+        return copy.deepcopy(row)
+    return {c: copy.deepcopy(row.get(c)) for c in cols}
+
+
+# ------------------------------------------------------------------
+# Storage
+# ------------------------------------------------------------------
+class FakeBucket:
+    def __init__(self, store: FakeStore, bucket: str):
+        self._store = store
+        self._bucket = bucket
+
+    def _files(self) -> Dict[str, bytes]:
+        return self._store.buckets.setdefault(self._bucket, {})
+
+    def upload(self, path: str, file, file_options: Optional[dict] = None):
+        self._store.wait()
+        if hasattr(file, "getvalue"):
+            data = file.getvalue()
+        elif hasattr(file, "read"):
+            data = file.read()
+        else:
+            data = bytes(file or b"")
+        self._store.record("storage", self._bucket, "upload", data)
+        with self._store.lock:
+            files = self._files()
+            if path in files and not (file_options or {}).get("upsert"):
+                raise FakeAPIError("The resource already exists", "409")
+            files[path] = data
+        return SimpleNamespace(path=path, full_path=f"{self._bucket}/{path}")
+
+    def remove(self, paths: List[str]):
+        self._store.wait()
+        self._store.record("storage", self._bucket, "remove", paths)
+        with self._store.lock:
+            files = self._files()
+            return [{"name": p} for p in paths if files.pop(p, None) is not None]
+
+    def list(self, path: Optional[str] = None, options: Optional[dict] = None):
+        """Filhos imediatos de `path` (arquivos e "pastas")."""
+        self._store.wait()
+        prefix = (path or "").strip("/")
+        prefix = prefix + "/" if prefix else ""
+        names: Dict[str, dict] = {}
+        with self._store.lock:
+            for p, data in self._files().items():
+                if not p.startswith(prefix):
+                    continue
+                head = p[len(prefix):].split("/", 1)[0]
+                if head not in names:
+                    names[head] = {"name": head, "id": None, "metadata": None}
+                    if "/" not in p[len(prefix):]:
+                        names[head].update(id=p, metadata={"size": len(data)})
+        out = sorted(names.values(), key=lambda x: x["name"])
+        self._store.record("storage", self._bucket, "list", {"prefix": prefix}, out)
+        return out
+
+    def _url(self, kind: str, path: str) -> str:
+        return f"{FAKE_URL}/storage/v1/object/{kind}/{self._bucket}/{path}"
+
+    def get_public_url(self, path: str, options: Optional[dict] = None) -> str:
+        return self._url("public", path)
+
+    def create_signed_url(self, path: str, expires_in: int, options: Optional[dict] = None) -> dict:
+        self._store.wait()
+        url = self._url("sign", path) + f"?token=fake&expires={int(expires_in)}"
+        self._store.record("storage", self._bucket, "create_signed_url", path, url)
+        return {"signedURL": url, "signedUrl": url}
+
+    def create_signed_urls(self, paths: List[str], expires_in: int, options: Optional[dict] = None) -> List[dict]:
+        self._store.wait()
+        out = []
+        for p in paths:
+            url = self._url("sign", p) + f"?token=fake&expires={int(expires_in)}"
+            out.append({"path": p, "signedURL": url, "signedUrl": url, "error": None})
+        self._store.record("storage", self._bucket, "create_signed_urls", paths, out)
+        return out
+
+    def download(self, path: str, options: Optional[dict] = None) -> bytes:
+        self._store.wait()
+        with self._store.lock:
+            try:
+                data = self._files()[path]
+            except KeyError:
+                raise FakeAPIError("Object not found", "404")
+        transform = (options or {}).get("transform")
+        if transform:
+            data = _render_image(data, transform)
+        self._store.record("storage", self._bucket, "download", path, data)
+        return data
+
+
+def _render_image(data: bytes, transform: dict) -> bytes:
+    """Imita /render/image: redimensiona (resize=contain) no "servidor"."""
+    import io
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as im:
+        fmt = im.format or "JPEG"
+        im.thumbnail((int(transform.get("width") or im.width), int(transform.get("height") or im.height)))
+        out = io.BytesIO()
+        if fmt == "JPEG":
+            im.convert("RGB").save(out, format=fmt, quality=int(transform.get("quality") or 80))
+        else:
+            im.save(out, format=fmt)
+    return out.getvalue()
+
+
+class FakeStorage:
+    def __init__(self, store: FakeStore):
+        self._store = store
+
+    def from_(self, bucket: str) -> FakeBucket:
+        return FakeBucket(self._store, bucket)
+
+
+# ------------------------------------------------------------------
+# Auth
+# ------------------------------------------------------------------
+def _user_obj(u: Dict[str, Any]):
+    return SimpleNamespace(id=u["id"], email=u["email"], user_metadata={}, app_metadata={})
+
+
+class FakeAuth:
+    def __init__(self, store: FakeStore):
+        self._store = store
+        self._session = None
+        self._subscribers: Dict[str, Callable[[str, Any], None]] = {}
+
+    def _auth_response(self, u, event: str = "SIGNED_IN"):
+        user = _user_obj(u)
+        self._session = SimpleNamespace(
+            user=user, access_token=f"fake-jwt-{u['id']}", refresh_token=f"fake-refresh-{uuid.uuid4().hex[:8]}",
+            expires_in=3600, token_type="bearer",
+        )
+        self._notify(event, self._session)
+        return SimpleNamespace(user=user, session=self._session)
+
+    def _notify(self, event: str, session):
+        for cb in list(self._subscribers.values()):
+            cb(event, session)
+
+    def on_auth_state_change(self, callback: Callable[[str, Any], None]):
+        sid = uuid.uuid4().hex
+        self._subscribers[sid] = callback
+        return SimpleNamespace(id=sid, callback=callback, unsubscribe=lambda: self._subscribers.pop(sid, None))
+
+    def refresh_session(self, refresh_token: Optional[str] = None):
+        """Como no GoTrue: gira o refresh token (o anterior deixa de valer)."""
+        if self._session is None:
+            raise FakeAPIError("Auth session missing!", "400")
+        uid = self._session.access_token.replace("fake-jwt-", "")
+        u = next(x for x in self._store.users.values() if x["id"] == uid)
+        return self._auth_response(u, "TOKEN_REFRESHED")
+
+    def sign_in_with_password(self, credentials: dict):
+        self._store.wait()
+        self._store.record("auth", "token", "sign_in_with_password", {"email": credentials.get("email")})
+        email = str(credentials.get("email", "")).lower()
+        u = self._store.users.get(email)
+        if not u or u["password"] != credentials.get("password"):
+            raise FakeAPIError("Invalid login credentials", "400")
+        return self._auth_response(u)
+
+    def sign_up(self, credentials: dict):
+        self._store.wait()
+        self._store.record("auth", "signup", "sign_up", {"email": credentials.get("email")})
+        email = str(credentials.get("email", "")).lower()
+        if email in self._store.users:
+            raise FakeAPIError("User already registered", "422")
+        u = self._store.add_user(email, credentials.get("password", ""))
+        return self._auth_response(u)
+
+    def sign_in_with_oauth(self, credentials: dict):
+        return SimpleNamespace(provider=credentials.get("provider"), url=f"{FAKE_URL}/auth/v1/authorize")
+
+    def get_session(self):
+        return self._session
+
+    def get_user(self, jwt: Optional[str] = None):
+        return SimpleNamespace(user=self._session.user) if self._session else None
+
+    def set_session(self, access_token: str, refresh_token: str):
+        uid = access_token.replace("fake-jwt-", "")
+        u = next((x for x in self._store.users.values() if x["id"] == uid), None)
+        if not u:
+            raise FakeAPIError("Invalid JWT", "401")
+        return self._auth_response(u, "TOKEN_REFRESHED")
+
+    def sign_out(self, options: Optional[dict] = None):
+        self._session = None
+        self._notify("SIGNED_OUT", None)
+
+
+# ------------------------------------------------------------------
+# Cliente
+# ------------------------------------------------------------------
+# ------------------------------------------------------------------
+# Funções do banco (supabase/migrations) usadas pelo app
+# ------------------------------------------------------------------
+def _rpc_award_points(store: "FakeStore", p_user_id, p_event_type, p_event_key, p_points) -> bool:
+    with store.lock:
+        events = store.rows("user_points_events")
+        if any(e["user_id"] == p_user_id and e["event_type"] == p_event_type
+               and e["event_key"] == p_event_key for e in events):
+            return False
+        events.append({"id": str(uuid.uuid4()), "user_id": p_user_id, "event_type": p_event_type,
+                       "event_key": p_event_key, "points": p_points, "created_at": _now_iso()})
+        row = _points_row(store, p_user_id)
+        row["points"] = (row.get("points") or 0) + int(p_points)
+        row["updated_at"] = _now_iso()
+        return True
+
+
+def _rpc_award_badge(store: "FakeStore", p_user_id, p_badge) -> bool:
+    with store.lock:
+        row = _points_row(store, p_user_id)
+        badges = row.get("badges") or []
+        if any(isinstance(b, dict) and b.get("name") == p_badge.get("name") for b in badges):
+            return False
+        row["badges"] = badges + [copy.deepcopy(p_badge)]
+        row["updated_at"] = _now_iso()
+        return True
+
+
+def _points_row(store: "FakeStore", user_id) -> dict:
+    rows = store.rows("user_points")
+    row = next((r for r in rows if r.get("user_id") == user_id), None)
+    if row is None:
+        row = dict(copy.deepcopy(COLUMN_DEFAULTS["user_points"]), user_id=user_id, created_at=_now_iso())
+        rows.append(row)
+    return row
+
+
+def _rpc_coach_diary_daily(store: "FakeStore", p_user_ids, p_since) -> List[dict]:
+    ids, since = {str(u) for u in p_user_ids}, str(p_since)
+    totals: Dict[Tuple[str, str], Any] = {}
+    with store.lock:
+        for r in store.rows("food_diary"):
+            if str(r.get("user_id")) in ids and str(r.get("ref_date")) >= since:
+                k = (str(r["user_id"]), str(r["ref_date"]))
+                kcal = r.get("kcal")
+                totals[k] = totals.get(k) if kcal is None else (totals.get(k) or 0) + kcal
+    return [{"user_id": u, "ref_date": d, "kcal": v} for (u, d), v in sorted(totals.items())]
+
+
+def _rpc_coach_last_checkins(store: "FakeStore", p_user_ids) -> List[dict]:
+    ids = {str(u) for u in p_user_ids}
+    last: Dict[str, str] = {}
+    with store.lock:
+        for r in store.rows("followups"):
+            u, d = str(r.get("user_id")), r.get("ref_date")
+            if u in ids and d is not None and str(d) > last.get(u, ""):
+                last[u] = str(d)
+    return [{"user_id": u, "ultimo_checkin": d} for u, d in sorted(last.items())]
+
+
+def _rpc_diary_days_per_week(store: "FakeStore", p_user_ids) -> List[dict]:
+    ids = {str(u) for u in p_user_ids}
+    days: Dict[Tuple[str, str], set] = {}
+    with store.lock:
+        for r in store.rows("food_diary"):
+            if str(r.get("user_id")) not in ids or not r.get("ref_date"):
+                continue
+            d = date.fromisoformat(str(r["ref_date"])[:10])
+            semana = str(d - timedelta(days=d.weekday()))            # date_trunc('week'): segunda
+            days.setdefault((str(r["user_id"]), semana), set()).add(d)
+    return [{"user_id": u, "semana": w, "dias": len(ds)} for (u, w), ds in sorted(days.items())]
+
+
+SERVER_RPCS: Dict[str, Callable[..., Any]] = {
+    "award_points": _rpc_award_points,
+    "award_badge": _rpc_award_badge,
+    "coach_diary_daily": _rpc_coach_diary_daily,
+    "coach_last_checkins": _rpc_coach_last_checkins,
+    "diary_days_per_week": _rpc_diary_days_per_week,
+}
+
+
+class FakeRPC:
+    def __init__(self, store: FakeStore, fn: str, params: dict):
+        self._store, self._fn, self._params = store, fn, params or {}
+        self._range: Optional[Tuple[int, int]] = None
+
+    def range(self, start: int, end: int) -> "FakeRPC":
+        self._range = (start, end)
+        return self
+
+    def execute(self) -> FakeResponse:
+        self._store.wait()
+        impl = self._store.rpcs.get(self._fn)
+        data = impl(self._store, **self._params) if impl else []
+        if self._range is not None and isinstance(data, list):
+            data = data[self._range[0]:self._range[1] + 1]
+        self._store.record("rpc", self._fn, "rpc", self._params, data)
+        return FakeResponse(data)
+
+
+class FakeSupabaseClient:
+    """Drop-in do supabase.Client para testes e benchmarks offline."""
+
+    def __init__(self, store: Optional[FakeStore] = None):
+        self.store = store or FakeStore()
+        self.supabase_url = FAKE_URL
+        self.auth = FakeAuth(self.store)
+        self.storage = FakeStorage(self.store)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self.store, name)
+
+    from_ = table
+
+    def rpc(self, fn: str, params: Optional[dict] = None) -> FakeRPC:
+        return FakeRPC(self.store, fn, params or {})
+
+    def register_rpc(self, name: str, fn: Callable[..., Any]):
+        self.store.rpcs[name] = fn
+
+
+def create_fake_client(latency_ms: float = 0.0, seed_path: Optional[str] = None) -> FakeSupabaseClient:
+    seed = None
+    if seed_path:
+        with open(seed_path, "r", encoding="utf-8") as f:
+            seed = json.load(f)
+    return FakeSupabaseClient(FakeStore(latency_ms=latency_ms, seed=seed))
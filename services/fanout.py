@@ -0,0 +1,122 @@
+# services/fanout.py
+# -------------------------------------------------------------
+# Leituras independentes em paralelo dentro de um rerun
+# - fan_out({nome: fn}, rótulo) roda as funções num pool limitado
+#   (MAX_WORKERS) com a ScriptRunContext e o cliente Supabase da
+#   sessão, e espera todas antes de renderizar: o rerun paga a maior
+#   latência em vez da soma
+# - Loga o caminho crítico (soma das tarefas vs maior tarefa vs tempo
+#   de parede) e alimenta services.profiling com "fanout:<rótulo>"
+# - Reads.take(nome, fn, tabelas): usa o resultado pré-carregado; se a
+#   tarefa falhou, estourou o timeout, não foi pedida ou se a sessão
+#   gravou em uma das `tabelas` depois do fan-out (sem `tabelas`: em
+#   qualquer uma; ver tracing.session_writes), chama fn() na hora
+# - Reads.keep_for_next_rerun(): leituras feitas no fim de um rerun que
+#   encerra com st.rerun() (login, splash) valem no início do próximo
+# - Cada tarefa devolve o próprio resultado (future): tarefa atrasada
+#   além do timeout não escreve em nada que o rerun já leu; a
+#   ScriptRunContext é retirada da thread do pool ao fim de cada tarefa
+# - Chamado de dentro de uma tarefa, roda em sequência (sem deadlock)
+# -------------------------------------------------------------
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_run_context import SCRIPT_RUN_CONTEXT_ATTR_NAME
+
+from helpers import logger
+from services.profiling import record
+from services.tracing import session_writes
+
+MAX_WORKERS = 8
+TIMEOUT_SEC = 15.0
+_THREAD_PREFIX = "caloria-fanout"
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix=_THREAD_PREFIX)
+
+
+class Reads:
+    """Resultados de um fan_out (por nome da tarefa)."""
+
+    def __init__(self, values: Optional[Dict[str, Any]] = None, writes: Optional[Dict[str, int]] = None):
+        self._values = values or {}
+        self._writes = writes
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._values
+
+    def _stale(self, tables: Sequence[str]) -> bool:
+        now = session_writes()
+        if now is None or self._writes is None:
+            return True
+        changed = {t for t, n in now.items() if n != self._writes.get(t, 0)}
+        return bool(changed & set(tables)) if tables else bool(changed)
+
+    def take(self, name: str, fn: Callable[[], Any], tables: Sequence[str] = ()) -> Any:
+        if name in self._values and not self._stale(tables):
+            return self._values[name]
+        return fn()
+
+    def keep_for_next_rerun(self) -> "Reads":
+        """Cópia para guardar em session_state: valem como lidas no início
+           do próximo rerun (o trace dele começa sem gravações)."""
+        return Reads(dict(self._values), {})
+
+
+def fan_out(tasks: Dict[str, Callable[[], Any]], label: str, timeout: float = TIMEOUT_SEC) -> Reads:
+    """Executa `tasks` em paralelo e espera até `timeout` s."""
+    from services.client_pool import current_client, use_client
+
+    t0 = time.perf_counter()
+    writes = session_writes()
+    values: Dict[str, Any] = {}
+    ms: Dict[str, float] = {}
+
+    def _run(name: str, fn: Callable[[], Any]) -> Tuple[bool, Any, float]:
+        t = time.perf_counter()
+        try:
+            return True, fn(), (time.perf_counter() - t) * 1000.0
+        except Exception as e:
+            logger.warning("fanout %s: %s falhou: %s", label, name, e)
+            return False, None, (time.perf_counter() - t) * 1000.0
+
+    def _collect(name: str, result: Tuple[bool, Any, float]):
+        ok, value, elapsed = result
+        ms[name] = elapsed
+        if ok:
+            values[name] = value
+
+    if len(tasks) < 2 or threading.current_thread().name.startswith(_THREAD_PREFIX):
+        for name, fn in tasks.items():
+            _collect(name, _run(name, fn))
+    else:
+        ctx = get_script_run_ctx(suppress_warning=True)
+        client = current_client()
+
+        def _task(name: str, fn: Callable[[], Any]) -> Tuple[bool, Any, float]:
+            thread = threading.current_thread()
+            if ctx is not None:
+                add_script_run_ctx(thread, ctx)
+            try:
+                with use_client(client):
+                    return _run(name, fn)
+            finally:
+                setattr(thread, SCRIPT_RUN_CONTEXT_ATTR_NAME, None)
+
+        futures = {name: _pool.submit(_task, name, fn) for name, fn in tasks.items()}
+        finished, _ = wait(futures.values(), timeout=timeout)
+        for name, fut in futures.items():
+            if fut in finished:
+                _collect(name, fut.result())
+
+    wall = (time.perf_counter() - t0) * 1000.0
+    record(f"fanout:{label}", wall)
+    logger.info(
+        "fanout %s: %d tarefa(s) soma=%.0f ms maior=%.0f ms parede=%.0f ms [%s]%s",
+        label, len(tasks), sum(ms.values()), max(ms.values(), default=0.0), wall,
+        " ".join(f"{n}={v:.0f}" for n, v in ms.items()),
+        "" if len(ms) == len(tasks) else f" pendentes={','.join(n for n in tasks if n not in ms)}",
+    )
+    return Reads(values, writes)
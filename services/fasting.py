@@ -0,0 +1,262 @@
+# services/fasting.py
+# -------------------------------------------------------------
+# Análise de jejum intermitente
+# - Duração por jejum (jejuns que cruzam a meia-noite e jejum em andamento)
+# - Protocolo atingido (14/10, 16/8, 20/4, 24h)
+# - Sequência atual (dias seguidos cumprindo a meta) e adesão semanal
+# - Histórico completo processado de forma incremental: só linhas novas
+#   (e jejuns abertos que ainda podem estar em andamento) são buscadas;
+#   o estado fica em cache por usuário (LRU limitado) e é refeito do
+#   zero a cada FULL_RELOAD_SEC, para refletir exclusões e edições
+# -------------------------------------------------------------
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any
+
+import streamlit as st
+
+# (nome, horas mínimas de jejum) — do mais exigente para o mais leve
+PROTOCOLS = [
+    ("24h", 24.0),
+    ("20/4", 20.0),
+    ("16/8", 16.0),
+    ("14/10", 14.0),
+]
+PROTOCOL_HOURS = dict(PROTOCOLS)
+
+# Jejum sem fim há mais que isso é tratado como "sem fim registrado"
+OPEN_FAST_MAX_H = 48.0
+
+MAX_CACHED_USERS = 500          # históricos em memória (LRU)
+FULL_RELOAD_SEC = 600           # recarga completa: linhas apagadas somem do cache
+
+
+def _parse_ts(value) -> Optional[datetime]:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def match_protocol(hours: Optional[float]) -> Optional[str]:
+    """Retorna o protocolo mais exigente atingido pela duração (ou None)."""
+    if hours is None:
+        return None
+    for name, min_h in PROTOCOLS:
+        if hours >= min_h:
+            return name
+    return None
+
+
+@dataclass
+class Fast:
+    id: Any
+    start: datetime
+    end: Optional[datetime]
+
+    def duration_h(self, now: datetime) -> Optional[float]:
+        if self.end is not None:
+            return (self.end - self.start).total_seconds() / 3600
+        if self.is_ongoing(now):
+            return (now - self.start).total_seconds() / 3600
+        return None
+
+    def is_ongoing(self, now: datetime) -> bool:
+        return self.end is None and 0 <= (now - self.start).total_seconds() / 3600 <= OPEN_FAST_MAX_H
+
+
+@dataclass
+class FastingHistory:
+    """Estado incremental do histórico de jejum de um usuário."""
+    fasts: Dict[Any, Fast] = field(default_factory=dict)
+    cursor: Optional[str] = None  # maior start_time já processado
+    loaded_at: float = 0.0        # monotonic da última carga completa
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def ingest(self, rows: List[Dict[str, Any]]) -> int:
+        novos = 0
+        for r in rows:
+            start = _parse_ts(r.get("start_time"))
+            if start is None:
+                continue
+            key = r.get("id") or r.get("start_time")
+            if key not in self.fasts:
+                novos += 1
+            end = _parse_ts(r.get("end_time"))
+            # O formulário combina as horas com a data de hoje: fim <= início
+            # significa que o jejum atravessou a meia-noite.
+            if end is not None and end <= start:
+                end += timedelta(days=1)
+            self.fasts[key] = Fast(key, start, end)
+            if self.cursor is None or str(r["start_time"]) > self.cursor:
+                self.cursor = str(r["start_time"])
+        return novos
+
+    def open_ids(self, now: datetime) -> List[Any]:
+        """Jejuns sem fim que ainda podem estar em andamento; os mais antigos
+           que OPEN_FAST_MAX_H já são definitivos ("sem fim registrado")."""
+        return [f.id for f in self.fasts.values() if f.is_ongoing(now) and f.id is not None]
+
+    def reset(self):
+        self.fasts.clear()
+        self.cursor = None
+
+    def sorted_fasts(self) -> List[Fast]:
+        return sorted(self.fasts.values(), key=lambda f: f.start, reverse=True)
+
+
+class _Histories:
+    """Históricos por usuário, do menos para o mais recentemente usado."""
+
+    def __init__(self, max_size: int = MAX_CACHED_USERS):
+        self.max_size = max_size
+        self._items: "OrderedDict[str, FastingHistory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, uid: str) -> FastingHistory:
+        with self._lock:
+            hist = self._items.pop(uid, None) or FastingHistory()
+            self._items[uid] = hist
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+            return hist
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+@st.cache_resource
+def _histories() -> _Histories:
+    return _Histories()
+
+
+def _history_for(uid: str) -> FastingHistory:
+    return _histories().get(uid)
+
+
+def refresh_history(uid: str) -> FastingHistory:
+    """Busca apenas o que mudou desde a última chamada: linhas com
+       start_time >= cursor e jejuns abertos que ainda podem estar em
+       andamento. A cada FULL_RELOAD_SEC refaz tudo (exclusões)."""
+    from helpers import db_user_rows
+
+    cols = "id, start_time, end_time"
+    hist = _history_for(uid)
+    with hist.lock:
+        if time.monotonic() - hist.loaded_at >= FULL_RELOAD_SEC:
+            hist.reset()
+            hist.loaded_at = time.monotonic()
+        cursor = hist.cursor
+        filters = [("gte", "start_time", cursor)] if cursor else []
+        hist.ingest(db_user_rows("fasting_log", uid, filters, order="start_time", columns=cols))
+
+        open_ids = hist.open_ids(datetime.now())
+        if open_ids:
+            hist.ingest(db_user_rows("fasting_log", uid, [("in", "id", open_ids)], columns=cols))
+    return hist
+
+
+def record_inserted(uid: str, rows: List[Dict[str, Any]]):
+    """Incorpora linhas recém-inseridas sem nova ida ao banco."""
+    hist = _history_for(uid)
+    with hist.lock:
+        hist.ingest(rows)
+
+
+def current_fast(hist: FastingHistory, now: Optional[datetime] = None) -> Optional[Fast]:
+    now = now or datetime.now()
+    for f in hist.sorted_fasts():
+        if f.is_ongoing(now):
+            return f
+    return None
+
+
+def compliant_days(hist: FastingHistory, target: str = "16/8", now: Optional[datetime] = None) -> set:
+    """Dias (data de início) com ao menos um jejum que atingiu a meta."""
+    now = now or datetime.now()
+    min_h = PROTOCOL_HOURS[target]
+    return {
+        f.start.date()
+        for f in hist.fasts.values()
+        if (f.duration_h(now) or 0) >= min_h
+    }
+
+
+def current_streak(hist: FastingHistory, target: str = "16/8", now: Optional[datetime] = None) -> int:
+    """Dias consecutivos cumprindo a meta, terminando hoje (ou ontem,
+       se o jejum de hoje ainda não começou/terminou)."""
+    now = now or datetime.now()
+    days = compliant_days(hist, target, now)
+    d = now.date()
+    if d not in days:
+        d -= timedelta(days=1)
+    streak = 0
+    while d in days:
+        streak += 1
+        d -= timedelta(days=1)
+    return streak
+
+
+def week_start(d) -> Any:
+    """Segunda-feira da semana de `d`."""
+    return d - timedelta(days=d.weekday())
+
+
+def weekly_compliance(hist: FastingHistory, target: str = "16/8", now: Optional[datetime] = None):
+    """DataFrame por semana (segunda-feira) com jejuns, dias na meta e % de
+       adesão — da semana do primeiro jejum até a atual, sem lacunas
+       (semana sem jejum = 0%)."""
+    import pandas as pd
+
+    now = now or datetime.now()
+    min_h = PROTOCOL_HOURS[target]
+    recs = [
+        {"dia": f.start.date(), "ok": (f.duration_h(now) or 0) >= min_h}
+        for f in hist.fasts.values()
+    ]
+    if not recs:
+        return pd.DataFrame(columns=["semana", "jejuns", "dias_na_meta", "adesao_pct"])
+    df = pd.DataFrame(recs)
+    df["semana"] = pd.to_datetime(df["dia"]).dt.to_period("W-SUN").dt.start_time.dt.date
+    per_day = df.groupby(["semana", "dia"], as_index=False)["ok"].any()
+    out = per_day.groupby("semana").agg(dias_na_meta=("ok", "sum"))
+    out["jejuns"] = df.groupby("semana").size()
+    hoje = now.date()
+    semana_atual = week_start(hoje)
+    semanas = pd.date_range(min(out.index.min(), semana_atual), max(out.index.max(), semana_atual), freq="7D").date
+    out = out.reindex(semanas, fill_value=0)
+    out.index.name = "semana"
+    # Semana corrente: adesão sobre os dias já decorridos
+    dias = pd.Series(7, index=out.index)
+    if semana_atual in dias.index:
+        dias[semana_atual] = hoje.weekday() + 1
+    out["adesao_pct"] = (out["dias_na_meta"] / dias * 100).round(0)
+    return out.reset_index().sort_values("semana")
+
+
+def history_table(hist: FastingHistory, limit: Optional[int] = None, now: Optional[datetime] = None):
+    """DataFrame pronto para exibição (mais recentes primeiro)."""
+    import pandas as pd
+
+    now = now or datetime.now()
+    linhas = []
+    for f in hist.sorted_fasts()[:limit]:
+        dur = f.duration_h(now)
+        if f.is_ongoing(now):
+            status = "⏳ em andamento"
+        elif f.end is None:
+            status = "sem fim registrado"
+        else:
+            status = "concluído"
+        linhas.append({
+            "Início": f.start,
+            "Fim": f.end,
+            "Duração (h)": round(dur, 1) if dur is not None else None,
+            "Protocolo": match_protocol(dur) or "—",
+            "Status": status,
+        })
+    return pd.DataFrame(linhas, columns=["Início", "Fim", "Duração (h)", "Protocolo", "Status"])
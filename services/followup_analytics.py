@@ -0,0 +1,183 @@
+# services/followup_analytics.py
+# -------------------------------------------------------------
+# Notas do check-in x resultados (painel do coach)
+# - Painel semanal por (paciente, semana): média das notas do follow up,
+#   variação de peso vs semana anterior (kg) e adesão ao diário
+#   (% de dias com registro; dias por semana contados no banco,
+#   supabase/migrations/20261019000400_followup_diary_weeks.sql) —
+#   semanas do paciente sem registro no diário contam 0%
+# - Defasagens: nota da semana t-k contra o resultado da semana t,
+#   alinhadas pelo número da semana (semanas sem dado ficam de fora)
+# - Correlação do paciente em todo o histórico, correlação móvel
+#   (ROLL_WEEKS) e da coorte (within-person: cada paciente centrado
+#   na própria média antes de empilhar)
+# - Cache por (paciente, data do último follow up) / (coorte, idem)
+# -------------------------------------------------------------
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+import streamlit as st
+
+from helpers import logger, supabase
+from services.coach_cohort import ID_CHUNK, _bulk_rpc, _bulk_select, _chunks
+
+SCORES = {
+    "sleep": "Sono", "bowel": "Intestino", "hunger": "Fome", "motivation": "Motivação",
+    "stress": "Estresse", "anxiety": "Ansiedade", "adherence": "Adesão",
+}
+OUTCOMES = {"dw": "Δ peso (kg/sem)", "diario": "Adesão ao diário (%)"}
+LAGS = (0, 1, 2)
+ROLL_WEEKS = 8
+MIN_WEEKS = 6
+ANALYTICS_TTL_SEC = 3600
+_EPOCH = date(1970, 1, 1)
+_MONDAY0 = 4                                   # 1970-01-05 foi segunda-feira
+
+
+def _week(s: pd.Series) -> pd.Series:
+    days = (pd.to_datetime(s).dt.normalize() - pd.Timestamp(_EPOCH)).dt.days
+    return (days - _MONDAY0) // 7
+
+
+def _week_start(weeks) -> List[date]:
+    return [date.fromordinal(_EPOCH.toordinal() + _MONDAY0 + int(w) * 7) for w in weeks]
+
+
+def _shift_weeks(df, k: int):
+    """Mesmos dados com a semana deslocada em +k (valor de t-k aparece em t)."""
+    out = df.copy()
+    out.index = pd.MultiIndex.from_arrays(
+        [df.index.get_level_values(0), df.index.get_level_values(1) + k], names=df.index.names
+    )
+    return out
+
+
+def weekly_panel(fu: pd.DataFrame, wl: pd.DataFrame, fd: pd.DataFrame) -> pd.DataFrame:
+    """Índice (user_id, semana); colunas SCORES + dw + diario.
+       fd: dias com registro por semana (user_id, semana, dias)."""
+    keys = ["user_id", "semana"]
+    fu, wl = (df.assign(semana=_week(df["ref_date"])) for df in (fu, wl))
+    fd = fd.assign(semana=_week(fd["semana"]))
+    notas = fu.groupby(keys)[list(SCORES)].mean()
+    peso = wl.dropna(subset=["weight_kg"]).groupby(keys)["weight_kg"].mean()
+    dw = (peso - _shift_weeks(peso, 1).reindex(peso.index)).rename("dw")
+    diario = (fd.groupby(keys)["dias"].sum() / 7 * 100).clip(upper=100).rename("diario")
+    panel = notas.join(dw, how="outer").join(diario, how="outer")
+    panel.index = panel.index.set_names(keys)
+    if panel.empty:
+        return panel
+    # todas as semanas entre a primeira e a última de cada paciente: sem diário = 0%
+    bounds = panel.index.to_frame(index=False).groupby("user_id")["semana"].agg(["min", "max"])
+    full = pd.MultiIndex.from_tuples(
+        [(u, w) for u, lo, hi in bounds.itertuples() for w in range(int(lo), int(hi) + 1)], names=keys
+    )
+    panel = panel.reindex(full)
+    panel["diario"] = panel["diario"].fillna(0)
+    return panel.sort_index()
+
+
+def lagged_correlations(panel: pd.DataFrame, within: bool = False) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """{desfecho: {"r": notas x defasagens, "n": pares usados}}."""
+    if panel.empty:                            # sem dados: r vazio, 0 pares
+        cols = [f"{k} sem" if k else "mesma semana" for k in LAGS]
+        r = pd.DataFrame(index=list(SCORES.values()), columns=cols, dtype=float)
+        return {y: {"r": r.copy(), "n": r.fillna(0).astype(int)} for y in OUTCOMES}
+    if within:                                 # centra cada paciente na própria média
+        panel = panel - panel.groupby(level=0).transform("mean")
+    out = {}
+    for y in OUTCOMES:
+        r, n = {}, {}
+        for k in LAGS:
+            x = _shift_weeks(panel[list(SCORES)], k).reindex(panel.index)
+            col = f"{k} sem" if k else "mesma semana"
+            r[col] = x.corrwith(panel[y])
+            n[col] = x.notna().mul(panel[y].notna(), axis=0).sum()
+        out[y] = {
+            "r": pd.DataFrame(r).rename(index=SCORES).round(2),
+            "n": pd.DataFrame(n).rename(index=SCORES),
+        }
+    return out
+
+
+def rolling_correlations(panel: pd.DataFrame, window: int = ROLL_WEEKS) -> Dict[str, pd.DataFrame]:
+    """Um paciente: correlação móvel (janela em semanas) de cada nota com cada desfecho."""
+    p = panel.droplevel(0)
+    if p.empty:
+        return {y: pd.DataFrame() for y in OUTCOMES}
+    p = p.reindex(range(int(p.index.min()), int(p.index.max()) + 1))     # semanas vazias = NaN
+    idx = _week_start(p.index)
+    out = {}
+    for y in OUTCOMES:
+        roll = p[list(SCORES)].rolling(window, min_periods=max(4, window // 2)).corr(p[y])
+        roll.index = idx
+        out[y] = roll.rename(columns=SCORES).dropna(how="all")
+    return out
+
+
+def _load(user_ids: List[str]):
+    since = _EPOCH                             # histórico completo
+    fu = pd.DataFrame(
+        _bulk_select("followups", "user_id, ref_date, " + ", ".join(SCORES), user_ids, since),
+        columns=["user_id", "ref_date", *SCORES],
+    )
+    wl = pd.DataFrame(
+        _bulk_select("weight_logs", "user_id, ref_date, weight_kg", user_ids, since),
+        columns=["user_id", "ref_date", "weight_kg"],
+    )
+    fd = pd.DataFrame(
+        _bulk_rpc("diary_days_per_week", user_ids),
+        columns=["user_id", "semana", "dias"],
+    )
+    for df in (fu, wl):
+        df["ref_date"] = pd.to_datetime(df["ref_date"].astype(str).str[:10])
+    fd["semana"] = pd.to_datetime(fd["semana"].astype(str).str[:10])
+    fd["dias"] = pd.to_numeric(fd["dias"])
+    for c in SCORES:
+        fu[c] = pd.to_numeric(fu[c], errors="coerce")
+    wl["weight_kg"] = pd.to_numeric(wl["weight_kg"], errors="coerce")
+    return fu, wl, fd
+
+
+def last_followup_date(user_ids: Sequence[str]) -> Optional[str]:
+    """Chave do cache: data do follow up mais recente entre `user_ids`."""
+    last = None
+    for chunk in _chunks(list(user_ids), ID_CHUNK):
+        res = (
+            supabase.table("followups").select("ref_date")
+            .in_("user_id", chunk).order("ref_date", desc=True).limit(1).execute()
+        )
+        d = str((res.data or [{}])[0].get("ref_date") or "")[:10] or None
+        if d and (last is None or d > last):
+            last = d
+    return last
+
+
+@st.cache_data(ttl=ANALYTICS_TTL_SEC, show_spinner=False, max_entries=256)
+def _user_analysis(user_id: str, last_followup: Optional[str]) -> dict:
+    panel = weekly_panel(*_load([user_id]))
+    return {
+        "weeks": int(panel[list(SCORES)].notna().any(axis=1).sum()),
+        "corr": lagged_correlations(panel),
+        "rolling": rolling_correlations(panel),
+    }
+
+
+@st.cache_data(ttl=ANALYTICS_TTL_SEC, show_spinner=False, max_entries=16)
+def _cohort_analysis(user_ids: tuple, last_followup: Optional[str]) -> dict:
+    panel = weekly_panel(*_load(list(user_ids)))
+    logger.info("followup_analytics: coorte de %d paciente(s), %d semana(s)", len(user_ids), len(panel))
+    return {
+        "weeks": int(panel[list(SCORES)].notna().any(axis=1).sum()),
+        "patients": int(panel.index.get_level_values(0).nunique()) if len(panel) else 0,
+        "corr": lagged_correlations(panel, within=True),
+    }
+
+
+def user_analysis(user_id: str) -> dict:
+    return _user_analysis(user_id, last_followup_date([user_id]))
+
+
+def cohort_analysis(user_ids: Sequence[str]) -> dict:
+    ids = tuple(sorted(str(u) for u in user_ids))
+    return _cohort_analysis(ids, last_followup_date(ids))
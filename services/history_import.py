@@ -0,0 +1,256 @@
+# services/history_import.py
+# -------------------------------------------------------------
+# Importação de histórico de outros apps (página Perfil / Conta)
+# - Formatos (detectados pelo cabeçalho do CSV):
+#   MyFitnessPal (resumo nutricional por refeição), Cronometer
+#   (servings e biometrics) e balanças inteligentes / planilhas com
+#   colunas de data + peso (kg ou lb)
+# - Leitura em streaming (csv linha a linha); vírgula ou ponto e
+#   vírgula, decimal com vírgula, datas ISO ou dd/mm/aaaa
+# - Deduplica contra o que já existe e dentro do próprio arquivo:
+#   food_diary por (data, descrição), weight_logs por (data, peso)
+# - Grava em lotes (db_insert_rows) de IMPORT_BATCH_SIZE linhas
+# -------------------------------------------------------------
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from helpers import db_insert_rows, db_user_pages, get_config, logger
+
+BATCH_SIZE = 500
+LB_TO_KG = 0.45359237
+
+FORMAT_LABELS = {
+    "mfp_nutrition": "MyFitnessPal (nutrição)",
+    "cronometer_servings": "Cronometer (servings)",
+    "cronometer_biometrics": "Cronometer (biometrics)",
+    "weight_csv": "Balança / planilha de peso",
+}
+
+MEAL_TYPES = {
+    "breakfast": "Café da manhã", "lunch": "Almoço", "dinner": "Jantar",
+    "snacks": "Lanche", "snack": "Lanche", "café da manhã": "Café da manhã",
+    "almoço": "Almoço", "jantar": "Jantar", "lanche": "Lanche", "lanches": "Lanche",
+}
+
+_DATE_COLS = ("date", "day", "data", "time of measurement", "time", "datetime", "timestamp")
+_WEIGHT_COL = re.compile(r"^(weight|peso)\b")
+
+Progress = Callable[[float, "ImportResult"], None]     # (fração do arquivo lida, parcial)
+
+
+@dataclass
+class ImportResult:
+    fmt: Optional[str] = None
+    read: int = 0
+    inserted: Dict[str, int] = field(default_factory=dict)
+    duplicates: int = 0
+    invalid: int = 0
+    failed: int = 0
+
+    @property
+    def total_inserted(self) -> int:
+        return sum(self.inserted.values())
+
+
+# ---------- parsing ----------
+def _float(v) -> Optional[float]:
+    s = str(v or "").strip().replace("\u00a0", "").replace(" ", "")
+    if not s:
+        return None
+    if "," in s and "." in s:                 # 1,234.5 ou 1.234,5
+        s = s.replace(",", "") if s.rfind(".") > s.rfind(",") else s.replace(".", "").replace(",", ".")
+    elif "," in s:
+        s = s.replace(",", ".")
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def _date(v) -> Optional[date]:
+    s = str(v or "").strip()
+    if not s:
+        return None
+    head = s.split()[0].split("T")[0]
+    if re.match(r"^\d{4}[-/]\d{1,2}[-/]\d{1,2}$", head):
+        y, m, d = (int(x) for x in re.split(r"[-/]", head))
+    elif re.match(r"^\d{1,2}[/.-]\d{1,2}[/.-]\d{4}$", head):
+        a, b, y = (int(x) for x in re.split(r"[/.-]", head))
+        d, m = (b, a) if b > 12 >= a else (a, b)   # dd/mm por padrão; mm/dd só se inequívoco
+    else:
+        return None
+    try:
+        return date(y, m, d)
+    except ValueError:
+        return None
+
+
+def _norm_header(h: str) -> str:
+    return re.sub(r"\s+", " ", (h or "").strip().strip('"').lower())
+
+
+def detect_format(header: List[str]) -> Optional[str]:
+    cols = set(header)
+    if {"day", "food name"} <= cols:
+        return "cronometer_servings"
+    if {"day", "metric", "amount"} <= cols:
+        return "cronometer_biometrics"
+    if {"date", "meal", "calories"} <= cols:
+        return "mfp_nutrition"
+    if any(c in cols for c in _DATE_COLS) and any(_WEIGHT_COL.match(c) for c in cols):
+        return "weight_csv"
+    return None
+
+
+def _first(row: Dict[str, str], *names: str) -> Optional[str]:
+    for n in names:
+        if row.get(n) not in (None, ""):
+            return row[n]
+    return None
+
+
+def _meal(v: Optional[str]) -> str:
+    return MEAL_TYPES.get((v or "").strip().lower(), "Outra")
+
+
+def _food_row(uid: str, d: date, meal: str, desc: str, qty, kcal, prot, carb, fat) -> dict:
+    return {
+        "user_id": uid, "ref_date": str(d), "meal_type": meal, "description": desc[:500],
+        "qty_g": qty or 0.0, "kcal": kcal or 0.0, "protein_g": prot or 0.0,
+        "carbs_g": carb or 0.0, "fat_g": fat or 0.0, "photo_path": None,
+    }
+
+
+def _map_row(fmt: str, uid: str, r: Dict[str, str], weight_col: Optional[str]) -> Optional[Tuple[str, dict]]:
+    """Linha do CSV -> (tabela, linha do banco) ou None se inválida."""
+    if fmt == "mfp_nutrition":
+        d = _date(r.get("date"))
+        if d is None:
+            return None
+        meal = _meal(r.get("meal"))
+        return "food_diary", _food_row(
+            uid, d, meal, f"MyFitnessPal — {r.get('meal') or meal}", None,
+            _float(r.get("calories")), _float(_first(r, "protein (g)", "protein")),
+            _float(_first(r, "carbohydrates (g)", "carbs (g)")), _float(_first(r, "fat (g)", "fat")),
+        )
+    if fmt == "cronometer_servings":
+        d = _date(r.get("day"))
+        desc = (r.get("food name") or "").strip()
+        if d is None or not desc:
+            return None
+        amount = r.get("amount") or ""
+        qty = _float(amount.split()[0]) if amount.strip().endswith(" g") else None
+        return "food_diary", _food_row(
+            uid, d, _meal(r.get("group")), f"{desc} ({amount})" if amount and qty is None else desc, qty,
+            _float(_first(r, "energy (kcal)", "calories")), _float(r.get("protein (g)")),
+            _float(_first(r, "carbs (g)", "net carbs (g)")), _float(r.get("fat (g)")),
+        )
+    if fmt == "cronometer_biometrics":
+        if (r.get("metric") or "").strip().lower() not in ("weight", "peso"):
+            return None
+        d, w = _date(r.get("day")), _float(r.get("amount"))
+        unit = (r.get("unit") or "kg").strip().lower()
+    else:                                                    # weight_csv
+        d = _date(_first(r, *_DATE_COLS))
+        w = _float(r.get(weight_col))
+        unit = "lb" if re.search(r"\blbs?\b", weight_col or "") else "kg"
+    if d is None or w is None:
+        return None
+    if unit.startswith("lb"):
+        w *= LB_TO_KG
+    if not 20.0 <= w <= 400.0:
+        return None
+    return "weight_logs", {"user_id": uid, "ref_date": str(d), "weight_kg": round(w, 2)}
+
+
+def _key(table: str, row: dict) -> tuple:
+    if table == "food_diary":
+        return (str(row.get("ref_date"))[:10], (row.get("description") or "").strip().lower())
+    return (str(row.get("ref_date"))[:10], round(float(row.get("weight_kg") or 0), 1))
+
+
+def _existing_keys(table: str, uid: str) -> Set[tuple]:
+    cols = "id, ref_date, description" if table == "food_diary" else "id, ref_date, weight_kg"
+    keys: Set[tuple] = set()
+    for page in db_user_pages(table, uid, order="id", columns=cols, page_size=1000):
+        keys.update(_key(table, r) for r in page)
+    return keys
+
+
+def _sniff_delimiter(line: str) -> str:
+    return ";" if line.count(";") > line.count(",") else ","
+
+
+# ---------- importação ----------
+def import_history(
+    fh,
+    user_id: str,
+    batch_size: Optional[int] = None,
+    on_progress: Optional[Progress] = None,
+) -> ImportResult:
+    """Importa um CSV (arquivo binário, ex.: UploadedFile) para o usuário."""
+    batch_size = int(batch_size or get_config("IMPORT_BATCH_SIZE", BATCH_SIZE))
+    size = getattr(fh, "size", None) or 0
+    text = io.TextIOWrapper(fh, encoding="utf-8-sig", errors="replace", newline="")
+    res = ImportResult()
+    try:
+        first = text.readline()
+        delim = _sniff_delimiter(first)
+        header = [_norm_header(h) for h in next(csv.reader([first], delimiter=delim), [])]
+        res.fmt = detect_format(header)
+        if res.fmt is None:
+            return res
+        weight_col = next((h for h in header if _WEIGHT_COL.match(h)), None)
+
+        seen: Dict[str, Set[tuple]] = {}
+        batches: Dict[str, List[dict]] = {}
+
+        def _flush(table: str):
+            rows = batches.pop(table, [])
+            if not rows:
+                return
+            try:
+                db_insert_rows(table, rows)
+                res.inserted[table] = res.inserted.get(table, 0) + len(rows)
+            except Exception as e:
+                logger.warning("import: lote de %d em %s falhou: %s", len(rows), table, e)
+                res.failed += len(rows)
+            if on_progress:
+                on_progress(min(fh.tell() / size, 1.0) if size else 0.0, res)
+
+        for raw in csv.reader(text, delimiter=delim):
+            if not any(c.strip() for c in raw):
+                continue
+            res.read += 1
+            mapped = _map_row(res.fmt, user_id, dict(zip(header, raw)), weight_col)
+            if mapped is None:
+                res.invalid += 1
+                continue
+            table, row = mapped
+            if table not in seen:
+                seen[table] = _existing_keys(table, user_id)
+            k = _key(table, row)
+            if k in seen[table]:
+                res.duplicates += 1
+                continue
+            seen[table].add(k)
+            batch = batches.setdefault(table, [])
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _flush(table)
+        for table in list(batches):
+            _flush(table)
+    finally:
+        text.detach()
+    if res.inserted.get("weight_logs"):
+        from services.body_composition import invalidate_body_composition
+        invalidate_body_composition(user_id)
+    logger.info(
+        "import: user=%s fmt=%s lidas=%d inseridas=%s duplicadas=%d inválidas=%d falhas=%d",
+        user_id, res.fmt, res.read, res.inserted, res.duplicates, res.invalid, res.failed,
+    )
+    return res
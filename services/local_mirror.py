@@ -0,0 +1,340 @@
+# services/local_mirror.py
+# -------------------------------------------------------------
+# Espelho local (SQLite) dos dados do usuário — opcional
+# - Ativado pelo secret LOCAL_MIRROR_PATH (um arquivo por deploy)
+# - Tabelas espelhadas: food_diary, weight_logs, measurements,
+#   followups, fasting_log (linha inteira em JSON + colunas indexadas)
+# - Leituras servidas localmente; gravações aplicadas localmente primeiro
+#   (id gerado no cliente) e enviadas ao Supabase por uma thread de sync
+# - Conflitos resolvidos por id: vence o maior updated_at (ou created_at),
+#   comparados em UTC; linha local ainda não enviada só é sobrescrita
+#   por versão mais nova
+# - Pull incremental pelo updated_at; exclusões chegam pelos tombstones
+#   de deleted_rows (supabase/migrations/*_mirror_sync.sql)
+# - A sync roda com o cliente da sessão dona dos dados (JWT do usuário,
+#   guardado por referência fraca): usuário sem sessão viva fica com as
+#   linhas pendentes até voltar
+# -------------------------------------------------------------
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from helpers import logger
+
+MIRROR_TABLES = ("food_diary", "weight_logs", "measurements", "followups", "fasting_log")
+SYNC_INTERVAL_SEC = 15.0
+PUSH_BATCH = 200
+
+# (op, coluna, valor) — ops suportadas nas leituras locais
+Filter = Tuple[str, str, Any]
+_SQL_OPS = {"eq": "=", "gte": ">=", "lte": "<=", "gt": ">", "lt": "<"}
+
+
+def _utc_iso(value: Any) -> str:
+    """Timestamp em ISO UTC com fuso e microssegundos (comparável como
+       texto). Sem fuso = UTC (datetime.utcnow() das versões antigas)."""
+    if not value:
+        return ""
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return str(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _version(row: Dict[str, Any]) -> str:
+    return _utc_iso(row.get("updated_at") or row.get("created_at"))
+
+
+class LocalMirror:
+    def __init__(self, path: str, sync_interval: float = SYNC_INTERVAL_SEC):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._hydrated: set = set()          # (table, user_id) já sincronizados
+        self._clients: Dict[str, Any] = {}           # user_id -> ClientRef da sessão
+        self._stop = threading.Event()
+        self._create_schema()
+        self._thread = threading.Thread(
+            target=self._sync_loop, args=(sync_interval,), name="caloria-mirror-sync", daemon=True
+        )
+        self._thread.start()
+
+    # ---------- schema ----------
+    def _create_schema(self):
+        with self._lock:
+            for t in MIRROR_TABLES:
+                self._db.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {t} (
+                        id TEXT PRIMARY KEY,
+                        user_id TEXT NOT NULL,
+                        version TEXT,
+                        data TEXT NOT NULL,
+                        dirty INTEGER NOT NULL DEFAULT 0,
+                        deleted INTEGER NOT NULL DEFAULT 0
+                    )""")
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS {t}_user ON {t}(user_id, deleted)")
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS {t}_dirty ON {t}(dirty)")
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS _sync_state (
+                    tbl TEXT, user_id TEXT, cursor TEXT,
+                    PRIMARY KEY (tbl, user_id)
+                )""")
+
+    # ---------- leitura ----------
+    def select(
+        self,
+        table: str,
+        user_id: str,
+        filters: Iterable[Filter] = (),
+        order: Optional[str] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        self._check(table)
+        self._remember_client(user_id)
+        self.ensure_hydrated(table, user_id)
+        sql = [f"SELECT data FROM {table} WHERE user_id = ? AND deleted = 0"]
+        args: List[Any] = [user_id]
+        for op, col, val in filters:
+            if op == "in":
+                vals = list(val)
+                if not vals:
+                    return []
+                sql.append(f"AND json_extract(data, '$.{col}') IN ({','.join('?' * len(vals))})")
+                args.extend(str(v) if not isinstance(v, (int, float)) else v for v in vals)
+            else:
+                sql.append(f"AND json_extract(data, '$.{col}') {_SQL_OPS[op]} ?")
+                args.append(val if isinstance(val, (int, float)) else str(val))
+        if order:
+            sql.append(f"ORDER BY json_extract(data, '$.{order}') {'DESC' if desc else 'ASC'}")
+        if limit:
+            sql.append("LIMIT ?")
+            args.append(int(limit))
+        with self._lock:
+            cur = self._db.execute(" ".join(sql), args)
+            return [json.loads(r[0]) for r in cur.fetchall()]
+
+    # ---------- escrita (local primeiro) ----------
+    def insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        self._check(table)
+        row = dict(row)
+        row.setdefault("id", str(uuid.uuid4()))
+        row.setdefault("created_at", _now_iso())
+        self._remember_client(row["user_id"])
+        # a versão local fica só nos metadados: não inventa colunas no servidor
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {table} (id, user_id, version, data, dirty, deleted) VALUES (?, ?, ?, ?, 1, 0)",
+                (str(row["id"]), str(row["user_id"]), _now_iso(), json.dumps(row, default=str)),
+            )
+        return row
+
+    def delete(self, table: str, row_id: str):
+        self._check(table)
+        with self._lock:
+            r = self._db.execute(f"SELECT user_id FROM {table} WHERE id = ?", (str(row_id),)).fetchone()
+            self._db.execute(
+                f"UPDATE {table} SET deleted = 1, dirty = 1, version = ? WHERE id = ?",
+                (_now_iso(), str(row_id)),
+            )
+        if r:
+            self._remember_client(r[0])
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(
+                self._db.execute(f"SELECT COUNT(*) FROM {t} WHERE dirty = 1").fetchone()[0]
+                for t in MIRROR_TABLES
+            )
+
+    # ---------- clientes por usuário ----------
+    def _remember_client(self, user_id: str):
+        """Guarda (fraco) o cliente da sessão atual para a sync desse usuário."""
+        from services.client_pool import capture_client
+        try:
+            self._clients[str(user_id)] = capture_client()
+        except TypeError:
+            pass
+
+    def _client_for(self, user_id: str):
+        ref = self._clients.get(str(user_id))
+        client = ref.get() if ref is not None else None
+        if client is None:
+            self._clients.pop(str(user_id), None)
+        return client
+
+    # ---------- sync ----------
+    def ensure_hydrated(self, table: str, user_id: str):
+        """Na primeira leitura de (tabela, usuário) puxa o histórico todo."""
+        if (table, user_id) in self._hydrated:
+            return
+        try:
+            self.pull(table, user_id)
+        except Exception as e:
+            logger.warning("mirror: sem acesso ao Supabase para %s (%s); servindo cópia local.", table, e)
+        self._hydrated.add((table, user_id))
+
+    def _cursor(self, key: str, user_id: str) -> Optional[str]:
+        with self._lock:
+            r = self._db.execute(
+                "SELECT cursor FROM _sync_state WHERE tbl = ? AND user_id = ?", (key, user_id)
+            ).fetchone()
+        return r[0] if r else None
+
+    def _set_cursor(self, key: str, user_id: str, cursor: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO _sync_state (tbl, user_id, cursor) VALUES (?, ?, ?)",
+                (key, user_id, cursor),
+            )
+
+    def pull(self, table: str, user_id: str) -> int:
+        """Linhas alteradas (updated_at) e excluídas (tombstones) desde o
+           último pull, com o cliente da sessão do usuário."""
+        from helpers import db_fetch_all
+
+        client = self._client_for(user_id)
+        if client is None:
+            raise RuntimeError("sem sessão ativa do usuário")
+        # chaves novas: cursores antigos (por created_at) são ignorados
+        upd_key, del_key = f"{table}@updated_at", f"{table}@deleted"
+        cursor, del_cursor = self._cursor(upd_key, user_id), self._cursor(del_key, user_id)
+
+        def _q():
+            q = client.table(table).select("*").eq("user_id", user_id)
+            if cursor:
+                q = q.gte("updated_at", cursor)
+            return q.order("updated_at")
+
+        def _q_del():
+            q = client.table("deleted_rows").select("row_id, deleted_at").eq("tbl", table).eq("user_id", user_id)
+            if del_cursor:
+                q = q.gte("deleted_at", del_cursor)
+            return q.order("deleted_at")
+
+        rows = db_fetch_all(_q)
+        tombs = db_fetch_all(_q_del)
+        self.merge_remote(table, rows)
+        self.apply_tombstones(table, tombs)
+        if rows:
+            self._set_cursor(upd_key, user_id, max(_version(x) for x in rows))
+        if tombs:
+            self._set_cursor(del_key, user_id, max(_utc_iso(x.get("deleted_at")) for x in tombs))
+        return len(rows) + len(tombs)
+
+    def merge_remote(self, table: str, rows: List[Dict[str, Any]]):
+        """Aplica linhas do servidor. Linha local pendente (dirty) só é
+           substituída se a versão remota for mais nova."""
+        with self._lock:
+            for row in rows:
+                rid = str(row["id"])
+                cur = self._db.execute(
+                    f"SELECT version, dirty FROM {table} WHERE id = ?", (rid,)
+                ).fetchone()
+                if cur and cur[1] and _utc_iso(cur[0]) >= _version(row):
+                    continue
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {table} (id, user_id, version, data, dirty, deleted) VALUES (?, ?, ?, ?, 0, 0)",
+                    (rid, str(row["user_id"]), _version(row), json.dumps(row, default=str)),
+                )
+
+    def apply_tombstones(self, table: str, tombs: List[Dict[str, Any]]):
+        """Remove linhas excluídas no servidor; edição local pendente mais
+           nova que a exclusão vence (é reenviada no próximo push)."""
+        with self._lock:
+            for t in tombs:
+                rid = str(t["row_id"])
+                cur = self._db.execute(f"SELECT version, dirty FROM {table} WHERE id = ?", (rid,)).fetchone()
+                if cur and cur[1] and _utc_iso(cur[0]) > _utc_iso(t.get("deleted_at")):
+                    continue
+                self._db.execute(f"DELETE FROM {table} WHERE id = ?", (rid,))
+
+    def push(self, status: Optional[Dict[str, str]] = None) -> int:
+        """Envia gravações locais pendentes, por usuário, com o cliente da
+           sessão dele. Em falha (ou sem sessão viva) mantém como dirty;
+           a falha de cada tabela vai para `status` (se dado)."""
+        sent = 0
+        live = {}
+        for u in list(self._clients):
+            client = self._client_for(u)
+            if client is not None:
+                live[u] = client
+        for t in MIRROR_TABLES:
+            for user_id, client in live.items():
+                with self._lock:
+                    rows = self._db.execute(
+                        f"SELECT id, data, deleted, version FROM {t} WHERE dirty = 1 AND user_id = ? LIMIT ?",
+                        (user_id, PUSH_BATCH),
+                    ).fetchall()
+                if not rows:
+                    continue
+                upserts = [json.loads(d) for (_, d, deleted, _) in rows if not deleted]
+                deletes = [rid for (rid, _, deleted, _) in rows if deleted]
+                try:
+                    if upserts:
+                        client.table(t).upsert(upserts, on_conflict="id", returning="minimal").execute()
+                    if deletes:
+                        client.table(t).delete().in_("id", deletes).execute()
+                except Exception as e:
+                    logger.warning("mirror: push de %s falhou (%s); %d linha(s) seguem pendentes.", t, e, len(rows))
+                    if status is not None:
+                        status[t] = f"push: {e}"
+                    continue
+                with self._lock:
+                    for rid, _, deleted, version in rows:
+                        # só limpa se não houve nova edição local durante o envio
+                        if deleted:
+                            self._db.execute(f"DELETE FROM {t} WHERE id = ? AND version = ?", (rid, version))
+                        else:
+                            self._db.execute(f"UPDATE {t} SET dirty = 0 WHERE id = ? AND version = ?", (rid, version))
+                sent += len(rows)
+        return sent
+
+    def sync_once(self) -> Dict[str, str]:
+        """Push + pull das tabelas hidratadas. Uma tabela com erro (coluna
+           faltando, RLS...) é logada e não impede as demais. Devolve o
+           status por tabela: "ok" ou a mensagem da (última) falha."""
+        status: Dict[str, str] = {}
+        self.push(status)
+        for table, user_id in list(self._hydrated):
+            if self._client_for(user_id) is None:
+                continue                     # volta a sincronizar quando o usuário voltar
+            try:
+                self.pull(table, user_id)
+            except Exception as e:
+                logger.warning("mirror: pull de %s (user=%s) falhou: %s", table, user_id, e)
+                status[table] = f"pull: {e}"
+                continue
+            status.setdefault(table, "ok")
+        return status
+
+    def _sync_loop(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.sync_once()
+            except Exception as e:
+                logger.warning("mirror: ciclo de sync falhou: %s", e)
+
+    def close(self):
+        self._stop.set()
+        try:
+            self.push()
+        finally:
+            with self._lock:
+                self._db.close()
+
+    def _check(self, table: str):
+        if table not in MIRROR_TABLES:
+            raise ValueError(f"Tabela não espelhada: {table}")
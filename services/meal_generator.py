@@ -0,0 +1,165 @@
+# services/meal_generator.py
+# -------------------------------------------------------------
+# Gerador de cardápio por metas de macros a partir do catálogo de receitas
+# - Busca em feixe (beam search) vetorizada sobre a matriz receita x macro:
+#   a cada refeição, expande todos os estados do feixe com todas as
+#   receitas da(s) categoria(s) da refeição x porções e mantém os BEAM
+#   melhores pelo erro relativo acumulado (kcal, P, C, G) frente à meta
+#   proporcional até aquela refeição
+# - Sem repetir receita no mesmo dia; na semana, receitas já usadas
+#   levam uma penalidade (variedade sem inviabilizar catálogos pequenos)
+# - Ruído pequeno e semeado no erro: "gerar outro" dá outro cardápio
+# - Tolerâncias: kcal ±5%, macros ±10% (o resultado informa se bateu)
+# -------------------------------------------------------------
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.recipe_catalog import RecipeCatalog
+
+# (refeição, categorias aceitas, fração das kcal do dia)
+DEFAULT_SLOTS: Tuple[Tuple[str, Tuple[str, ...], float], ...] = (
+    ("Café da manhã", ("Café da manhã",), 0.25),
+    ("Almoço", ("Almoço",), 0.35),
+    ("Lanche", ("Lanche", "Sobremesa"), 0.12),
+    ("Jantar", ("Jantar", "Almoço"), 0.28),
+)
+PORTIONS = np.array([0.5, 1.0, 1.5, 2.0], dtype=np.float32)
+WEIGHTS = np.array([1.0, 1.0, 0.6, 0.6], dtype=np.float32)     # kcal, P, C, G
+TOLERANCE = np.array([0.05, 0.10, 0.10, 0.10], dtype=np.float32)
+BEAM = 24
+JITTER = 0.002
+REPEAT_PENALTY = 0.05                                          # receita já usada na semana
+MAX_DAYS = 7
+
+
+@dataclass
+class PlannedMeal:
+    slot: str
+    index: int                      # linha no catálogo
+    portions: float
+    macros: Tuple[float, float, float, float]
+
+
+@dataclass
+class DayPlan:
+    meals: List[PlannedMeal]
+    totals: Tuple[float, float, float, float]
+    target: Tuple[float, float, float, float]
+    deviation: Tuple[float, float, float, float] = field(default=(0.0, 0.0, 0.0, 0.0))   # relativo
+
+    @property
+    def within_tolerance(self) -> bool:
+        return bool(np.all(np.abs(np.array(self.deviation)) <= TOLERANCE))
+
+
+def _slot_candidates(catalog: RecipeCatalog, categorias: Sequence[str], pool: np.ndarray):
+    idx = np.flatnonzero(catalog.category_mask(categorias) & pool)
+    if idx.size == 0:
+        return idx, idx, None
+    cand = (catalog.macros[idx][:, None, :] * PORTIONS[None, :, None]).reshape(-1, 4)
+    return np.repeat(idx, PORTIONS.size), np.tile(PORTIONS, idx.size), cand
+
+
+def generate_day(
+    catalog: RecipeCatalog,
+    target: Sequence[float],
+    slots=DEFAULT_SLOTS,
+    pool: Optional[np.ndarray] = None,
+    avoid: Optional[np.ndarray] = None,
+    seed: Optional[int] = None,
+    beam: int = BEAM,
+) -> Optional[DayPlan]:
+    """Um dia de cardápio para `target` = (kcal, prot_g, carb_g, gord_g).
+       `pool`: máscara de receitas permitidas; `avoid`: já usadas (penalidade)."""
+    n = len(catalog)
+    if n == 0:
+        return None
+    tgt = np.maximum(np.asarray(target, dtype=np.float32), 1.0)
+    pool = np.ones(n, dtype=bool) if pool is None else pool
+    avoid_pen = np.zeros(n, dtype=np.float32) if avoid is None else avoid.astype(np.float32) * REPEAT_PENALTY
+    rng = np.random.default_rng(seed)
+
+    totals = np.zeros((1, 4), dtype=np.float32)       # estados do feixe
+    score = np.zeros(1, dtype=np.float32)             # penalidades acumuladas (variedade)
+    used = np.zeros((1, n), dtype=bool)
+    picks: List[List[Tuple[str, int, float]]] = [[]]
+    share_done = 0.0
+    share_total = sum(s[2] for s in slots)
+
+    for slot, categorias, share in slots:
+        rec, por, cand = _slot_candidates(catalog, categorias, pool)
+        if cand is None:
+            continue
+        share_done += share
+        goal = tgt * (share_done / share_total)
+        # erro relativo ponderado de cada (estado, candidato): (B, C)
+        diff = (totals[:, None, :] + cand[None, :, :] - goal) / tgt
+        err = (diff * diff) @ WEIGHTS
+        err += score[:, None] + avoid_pen[rec][None, :]
+        err[used[:, rec]] = np.inf                    # sem repetir receita no dia
+        err += rng.uniform(0.0, JITTER, size=err.shape).astype(np.float32)
+
+        flat = err.ravel()
+        k = min(beam, int(np.isfinite(flat).sum()))
+        if k == 0:
+            continue
+        best = np.argpartition(flat, k - 1)[:k]
+        b_idx, c_idx = np.unravel_index(best, err.shape)
+
+        totals = totals[b_idx] + cand[c_idx]
+        score = score[b_idx] + avoid_pen[rec[c_idx]]
+        used = used[b_idx].copy()
+        used[np.arange(k), rec[c_idx]] = True
+        picks = [picks[b] + [(slot, int(rec[c]), float(por[c]))] for b, c in zip(b_idx, c_idx)]
+
+    final = (((totals - tgt) / tgt) ** 2) @ WEIGHTS + score
+    b = int(np.argmin(final))
+    meals = [
+        PlannedMeal(slot, i, p, tuple(float(x) for x in catalog.macros[i] * p))
+        for slot, i, p in picks[b]
+    ]
+    tot = tuple(float(x) for x in totals[b])
+    return DayPlan(
+        meals=meals, totals=tot, target=tuple(float(x) for x in tgt),
+        deviation=tuple(float(x) for x in (totals[b] - tgt) / tgt),
+    )
+
+
+def generate_plan(
+    catalog: RecipeCatalog,
+    target: Sequence[float],
+    days: int = 1,
+    pool: Optional[np.ndarray] = None,
+    seed: Optional[int] = None,
+) -> List[DayPlan]:
+    """`days` dias seguidos, variando receitas entre os dias."""
+    avoid = np.zeros(len(catalog), dtype=bool)
+    out: List[DayPlan] = []
+    for d in range(max(1, min(days, MAX_DAYS))):
+        day = generate_day(catalog, target, pool=pool, avoid=avoid,
+                           seed=None if seed is None else seed + d)
+        if day is None:
+            break
+        out.append(day)
+        for m in day.meals:
+            avoid[m.index] = True
+    return out
+
+
+def plan_rows(catalog: RecipeCatalog, day: DayPlan, locked: Optional[np.ndarray] = None) -> List[Dict]:
+    """Linhas para exibição; receitas em `locked` aparecem sem título."""
+    rows = []
+    for m in day.meals:
+        bloqueada = locked is not None and bool(locked[m.index])
+        rows.append({
+            "Refeição": m.slot,
+            "Receita": "🔒 Receita PRO" if bloqueada else catalog.titles[m.index],
+            "Porções": m.portions,
+            "kcal": round(m.macros[0]),
+            "P (g)": round(m.macros[1]),
+            "C (g)": round(m.macros[2]),
+            "G (g)": round(m.macros[3]),
+        })
+    return rows
@@ -0,0 +1,69 @@
+# services/meal_plans.py
+# -------------------------------------------------------------
+# Índice em memória dos cardápios prontos (tabela meal_plans)
+# - Só (id, kcal_alvo, titulo), ordenado por kcal_alvo; recarregado a
+#   cada INDEX_TTL_SEC (um processo, compartilhado entre sessões)
+# - nearest(kcal, k): os k cardápios mais próximos via bisect, sem
+#   consulta ao banco; o JSON de refeições é buscado só para o escolhido
+#   (helpers.get_meal_plans_near)
+# -------------------------------------------------------------
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Tuple
+
+import streamlit as st
+
+INDEX_TTL_SEC = 600
+
+
+class MealPlanIndex:
+    def __init__(self, ttl: float = INDEX_TTL_SEC):
+        self.ttl = ttl
+        # (kcal_alvo, linhas) publicados juntos: leitores nunca misturam recargas
+        self._index: Tuple[List[float], List[Dict[str, Any]]] = ([], [])
+        self._loaded_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _load(self):
+        from helpers import db_fetch_all, logger, supabase
+
+        rows = db_fetch_all(
+            lambda: supabase.table("meal_plans").select("id, kcal_alvo, titulo").order("kcal_alvo").order("id")
+        )
+        rows = [r for r in rows if r.get("kcal_alvo") is not None]     # já vem ordenado
+        self._index = ([float(r["kcal_alvo"]) for r in rows], rows)
+        self._loaded_at = time.monotonic()
+        logger.info("meal_plans: índice com %d cardápio(s)", len(rows))
+
+    def _ensure_fresh(self):
+        if time.monotonic() - self._loaded_at < self.ttl:
+            return
+        with self._lock:
+            if time.monotonic() - self._loaded_at >= self.ttl:
+                self._load()
+
+    def invalidate(self):
+        self._loaded_at = float("-inf")
+
+    def nearest(self, kcal: float, k: int = 1) -> List[Dict[str, Any]]:
+        """Os k cardápios com kcal_alvo mais perto de `kcal` (mais perto primeiro;
+           no empate, o de menos kcal)."""
+        self._ensure_fresh()
+        keys, plans = self._index
+        lo = bisect_left(keys, kcal) - 1
+        hi = lo + 1
+        out: List[Dict[str, Any]] = []
+        while len(out) < k and (lo >= 0 or hi < len(keys)):
+            if hi >= len(keys) or (lo >= 0 and kcal - keys[lo] <= keys[hi] - kcal):
+                out.append(plans[lo])
+                lo -= 1
+            else:
+                out.append(plans[hi])
+                hi += 1
+        return out
+
+
+@st.cache_resource
+def get_meal_plan_index() -> MealPlanIndex:
+    return MealPlanIndex()
@@ -0,0 +1,124 @@
+# services/micronutrients.py
+# -------------------------------------------------------------
+# Micronutrientes do dia (aba Diário) vs RDA
+# - Composição: colunas de micronutrientes de `recipes` (por porção),
+#   já carregadas no catálogo de receitas (services.recipe_catalog:
+#   matriz receita x nutriente float32) — sem leitura própria de recipes
+# - Itens do diário resolvidos pela descrição == título da receita
+#   (normalizado); porções = kcal registrada / kcal da receita
+# - Total do dia = porções @ matriz[itens]  (um produto, sem laço)
+# - RDA: tabela rda_nutrients inteira num índice em memória
+#   (nutriente, sexo) -> faixas de idade, com fallback para sexo "ALL"
+# -------------------------------------------------------------
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import streamlit as st
+
+from helpers import db_fetch_all, supabase
+from services.recipe_catalog import MICRO_COLUMNS, RecipeCatalog, get_recipe_catalog
+
+RDA_TTL_SEC = 86400
+
+# (nome na rda_nutrients, coluna em recipes, unidade)
+NUTRIENTS: Tuple[Tuple[str, str, str], ...] = (
+    ("Vitamina A", "vitamina_a_ug", "µg"),
+    ("Vitamina C", "vitamina_c_mg", "mg"),
+    ("Vitamina D", "vitamina_d_ug", "µg"),
+    ("Vitamina B12", "vitamina_b12_ug", "µg"),
+    ("Cálcio", "calcio_mg", "mg"),
+    ("Ferro", "ferro_mg", "mg"),
+    ("Magnésio", "magnesio_mg", "mg"),
+    ("Zinco", "zinco_mg", "mg"),
+    ("Potássio", "potassio_mg", "mg"),
+)
+
+
+def normalize_name(s: Optional[str]) -> str:
+    s = unicodedata.normalize("NFKD", (s or "").lower())
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", s).strip()
+
+
+@dataclass(frozen=True)
+class CompositionIndex:
+    keys: Dict[str, int]            # título normalizado -> linha
+    kcal: np.ndarray                # (n,) kcal por porção
+    matrix: np.ndarray              # (n, N) nutrientes por porção
+    present: np.ndarray             # (N,) bool: coluna existe na tabela
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _composition_for(version: str, _catalog: RecipeCatalog) -> CompositionIndex:
+    cols = [MICRO_COLUMNS.index(c) for _, c, _ in NUTRIENTS]
+    keys: Dict[str, int] = {}
+    for i, t in enumerate(_catalog.titles):
+        keys.setdefault(normalize_name(t), i)
+    return CompositionIndex(
+        keys=keys, kcal=_catalog.macros[:, 0],
+        matrix=_catalog.micros[:, cols], present=_catalog.micro_present[cols],
+    )
+
+
+def get_composition_index() -> CompositionIndex:
+    """Índice de composição do catálogo atual (cacheado por versão)."""
+    catalog = get_recipe_catalog()
+    return _composition_for(catalog.version, catalog)
+
+
+class RdaIndex:
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self._by: Dict[Tuple[str, str], List[Tuple[float, float, float, str]]] = {}
+        for r in rows:
+            self._by.setdefault((r.get("nutrient"), r.get("sex")), []).append(
+                (float(r.get("age_min") or 0), float(r.get("age_max") or 999), r.get("rda_value"), r.get("unit"))
+            )
+
+    def lookup(self, nutrient: str, sex: str, age: float) -> Tuple[Optional[float], Optional[str]]:
+        """Mesma regra de helpers.get_rda_value, sem ida ao banco."""
+        for s in (sex, "ALL"):
+            for a0, a1, val, unit in self._by.get((nutrient, s), ()):
+                if a0 <= age <= a1:
+                    return val, unit
+        return None, None
+
+
+@st.cache_resource(ttl=RDA_TTL_SEC, show_spinner=False)
+def get_rda_index() -> RdaIndex:
+    return RdaIndex(db_fetch_all(lambda: supabase.table("rda_nutrients").select("*").order("id")))
+
+
+@dataclass
+class DailyMicros:
+    resolved: int                   # itens do diário com composição conhecida
+    items: int
+    rows: List[Dict[str, Any]]      # nutriente, total, unidade, rda, pct
+
+
+def daily_micros(diary_rows: Sequence[Dict[str, Any]], sex: str = "M", age: float = 30) -> DailyMicros:
+    comp = get_composition_index()
+    idx, portions = [], []
+    for r in diary_rows:
+        i = comp.keys.get(normalize_name(r.get("description")))
+        if i is None:
+            continue
+        kcal = float(r.get("kcal") or 0.0)
+        idx.append(i)
+        portions.append(kcal / comp.kcal[i] if kcal > 0 and comp.kcal[i] > 0 else 1.0)
+
+    totals = np.asarray(portions, dtype=np.float32) @ comp.matrix[idx] if idx else np.zeros(len(NUTRIENTS))
+    rda = get_rda_index()
+    out = []
+    for (nome, _, unidade), total, present in zip(NUTRIENTS, totals, comp.present):
+        if not present:
+            continue
+        alvo, _ = rda.lookup(nome, sex, age)
+        out.append({
+            "nutriente": nome, "total": float(total), "unidade": unidade,
+            "rda": float(alvo) if alvo else None,
+            "pct": float(total) / float(alvo) * 100 if alvo else None,
+        })
+    return DailyMicros(resolved=len(idx), items=len(diary_rows), rows=out)
@@ -0,0 +1,192 @@
+# services/pdf_export.py
+# -------------------------------------------------------------
+# PDF do plano diário (aba "Plano")
+# - Memoizado pelo hash do dict `resumo` (LRU limitado, por processo)
+# - Gerado numa thread de trabalho: o script não espera (salvo pedido
+#   explícito de `wait`); a UI mostra "gerando…" e consulta de novo
+#   (fragmento com run_every); falhas esperam RETRY_AFTER_SEC
+# - Conteúdo: dados de entrada, metas, tabela de macros (g / kcal / %),
+#   gráfico de pizza das kcal por macro e cardápio sugerido (se houver)
+# -------------------------------------------------------------
+import hashlib
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Dict, Optional, Tuple
+
+from helpers import logger
+
+MAX_CACHED = 64
+INLINE_WAIT_SEC = 0.0       # espera no script antes de cair no "gerando…" (0: não bloqueia)
+RETRY_AFTER_SEC = 30.0      # após uma falha, não tenta de novo antes disso
+
+_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_pending: Dict[str, Future] = {}
+_failed: Dict[str, float] = {}          # chave -> monotonic da última falha
+_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="caloria-pdf")
+
+MACRO_CORES = ("#2BAEAE", "#FF7A3D", "#6C757D")
+
+
+def resumo_key(resumo: Dict[str, Any]) -> str:
+    raw = json.dumps(resumo, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def plan_pdf(resumo: Dict[str, Any], wait: float = INLINE_WAIT_SEC) -> Tuple[Optional[bytes], str]:
+    """(pdf, status) com status "ok" | "gerando" | "erro". Usa o cache;
+       senão agenda a geração no worker e espera até `wait` s."""
+    key = resumo_key(resumo)
+    with _lock:
+        pdf = _cache.get(key)
+        if pdf is not None:
+            _cache.move_to_end(key)
+            return pdf, "ok"
+        fut = _pending.get(key)
+        if fut is None:
+            if time.monotonic() - _failed.get(key, float("-inf")) < RETRY_AFTER_SEC:
+                return None, "erro"
+            fut = _pending[key] = _pool.submit(_build_and_store, key, dict(resumo))
+    try:
+        return fut.result(timeout=wait), "ok"
+    except FutureTimeout:
+        return None, "gerando"
+    except Exception:
+        return None, "erro"
+
+
+def _build_and_store(key: str, resumo: Dict[str, Any]) -> bytes:
+    try:
+        pdf = build_plan_pdf(resumo, _meal_plan_for(resumo.get("kcal_alvo")))
+        with _lock:
+            _cache[key] = pdf
+            _cache.move_to_end(key)
+            while len(_cache) > MAX_CACHED:
+                _cache.popitem(last=False)
+        return pdf
+    except Exception as e:
+        logger.warning("pdf: falha ao gerar plano: %s", e)
+        with _lock:
+            _failed[key] = time.monotonic()
+            while len(_failed) > MAX_CACHED:
+                _failed.pop(next(iter(_failed)))
+        raise
+    finally:
+        with _lock:
+            _pending.pop(key, None)
+
+
+def _meal_plan_for(kcal_alvo) -> Optional[dict]:
+    if not kcal_alvo:
+        return None
+    try:
+        from helpers import get_meal_plan_for_target
+        return get_meal_plan_for_target(round(float(kcal_alvo)))
+    except Exception as e:
+        logger.info("pdf: cardápio indisponível (%s)", e)
+        return None
+
+
+# ---------- ReportLab ----------
+def _macro_chart(resumo: Dict[str, Any]):
+    from reportlab.graphics.charts.piecharts import Pie
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+
+    valores = [float(resumo.get(k) or 0) for k in ("kcal_prot", "kcal_carb", "kcal_gord")]
+    if sum(valores) <= 0:
+        return None
+    d = Drawing(220, 150)
+    pie = Pie()
+    pie.x, pie.y, pie.width, pie.height = 45, 10, 130, 130
+    pie.data = valores
+    pie.labels = [f"{n} {v / sum(valores) * 100:.0f}%" for n, v in zip(("Prot.", "Carbo", "Gord."), valores)]
+    pie.sideLabels = True
+    for i, cor in enumerate(MACRO_CORES):
+        pie.slices[i].fillColor = colors.HexColor(cor)
+        pie.slices[i].strokeColor = colors.white
+    d.add(pie)
+    return d
+
+
+def _table(rows, col_widths=None, header=True):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
+    t = Table(rows, colWidths=col_widths, hAlign="LEFT")
+    style = [
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#DEE2E6")),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+    ]
+    if header:
+        style += [
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2BAEAE")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ]
+    t.setStyle(TableStyle(style))
+    return t
+
+
+def build_plan_pdf(resumo: Dict[str, Any], cardapio: Optional[dict] = None) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, title="Plano Diário — calorIA",
+                            leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm)
+    styles = getSampleStyleSheet()
+    r = resumo
+    story = [Paragraph("Plano Diário", styles["Title"]), Spacer(1, 6)]
+
+    story.append(Paragraph("Seus dados", styles["Heading2"]))
+    story.append(_table([
+        ["Peso", f"{r.get('peso')} kg", "Altura", f"{r.get('altura')} cm"],
+        ["Idade", f"{r.get('idade')} anos", "Sexo", str(r.get("sexo", ""))],
+        ["Atividade", Paragraph(str(r.get("atividade", "")), styles["BodyText"]), "Objetivo",
+         f"{r.get('objetivo', '')} ({r.get('ajuste_percent', 0):+}%)"],
+    ], col_widths=[2.5 * cm, 6 * cm, 2.5 * cm, 5 * cm], header=False))
+    story.append(Spacer(1, 10))
+
+    story.append(Paragraph("Metas", styles["Heading2"]))
+    story.append(_table([
+        ["BMR", "TDEE", "Alvo diário", "Água"],
+        [f"{r.get('bmr')} kcal", f"{r.get('tdee')} kcal", f"{r.get('kcal_alvo')} kcal", f"{r.get('agua_l')} L"],
+    ]))
+    story.append(Spacer(1, 10))
+
+    story.append(Paragraph("Macronutrientes", styles["Heading2"]))
+    total_kcal = sum(float(r.get(k) or 0) for k in ("kcal_prot", "kcal_carb", "kcal_gord")) or 1.0
+    linhas = [["Macro", "Gramas", "kcal", "% das kcal"]]
+    for nome, g, kcal in (("Proteína", "g_prot", "kcal_prot"), ("Carboidratos", "g_carb", "kcal_carb"),
+                          ("Gorduras", "g_gord", "kcal_gord")):
+        linhas.append([nome, f"{r.get(g)} g", f"{r.get(kcal)}", f"{float(r.get(kcal) or 0) / total_kcal * 100:.0f}%"])
+    story.append(_table(linhas))
+    chart = _macro_chart(r)
+    if chart is not None:
+        story.append(Spacer(1, 6))
+        story.append(chart)
+
+    for aviso in r.get("avisos") or []:
+        story.append(Paragraph(f"Aviso: {aviso}", styles["Italic"]))
+
+    if cardapio and cardapio.get("refeicoes"):
+        story.append(Spacer(1, 10))
+        story.append(Paragraph(
+            f"Cardápio sugerido: {cardapio.get('titulo', '')} ({cardapio.get('kcal_alvo', '')} kcal)",
+            styles["Heading2"],
+        ))
+        for ref in cardapio["refeicoes"]:
+            itens = ", ".join(str(i) for i in ref.get("itens") or [])
+            story.append(Paragraph(f"<b>{ref.get('nome', '')}</b>: {itens}", styles["BodyText"]))
+
+    doc.build(story)
+    return buf.getvalue()
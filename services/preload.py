@@ -0,0 +1,72 @@
+# services/preload.py
+# -------------------------------------------------------------
+# Trabalho útil enquanto o splash está na tela (1º carregamento da sessão)
+# e logo após o login
+# - Cliente Supabase da sessão criado (e sessão de auth restaurada) antes
+#   de tudo: as leituras do usuário dependem dele
+# - Demais tarefas em paralelo via services.fanout (ScriptRunContext e
+#   cliente da sessão): fila de gravação, espelho local, índice de RDA e,
+#   se já houver usuário, perfil, pontos, flag de coaching e (com a aba
+#   de jejum ligada) histórico de jejum
+# - Imports pesados (PDF/gráficos) continuam sob demanda (nada aqui)
+# - run_preload() devolve as leituras (Reads); o chamador as guarda em
+#   st.session_state["_preload"] (no login, com keep_for_next_rerun(),
+#   por causa do st.rerun()) e o roteador as usa em vez de ler de novo
+# -------------------------------------------------------------
+import time
+from typing import Any, Callable, Dict, Optional
+
+from helpers import logger
+from services.fanout import Reads, fan_out
+
+LOGIN_PRELOAD_SEC = 4.0        # espera máxima no login (o resto segue em segundo plano)
+RDA_WARM = ("Vitamina C", "Vitamina D", "Cálcio", "Ferro", "Magnésio")
+
+
+def _warm_write_queue():
+    from services.write_queue import get_write_queue
+    get_write_queue()
+
+
+def _warm_mirror():
+    from helpers import get_local_mirror
+    get_local_mirror()
+
+
+def _warm_rda():
+    from helpers import get_rda_value
+    for nut in RDA_WARM:
+        get_rda_value(nut, "M", 30)
+
+
+def user_tasks(uid: str) -> Dict[str, Callable[[], Any]]:
+    """Leituras do usuário que o roteador faz no 1º rerun (mesmos nomes)."""
+    import streamlit as st
+    from helpers import db_get_profile, get_points, is_user_coaching
+    from services.fasting import refresh_history
+    tasks = {
+        "perfil": lambda: db_get_profile(uid) or {},
+        "coaching": lambda: is_user_coaching(uid),
+        "pontos": lambda: get_points(uid),
+    }
+    if st.session_state.get("jejum_ativo"):
+        tasks["jejum"] = lambda: refresh_history(uid)
+    return tasks
+
+
+def run_preload(uid: Optional[str], timeout: float) -> Reads:
+    """Cliente da sessão + tarefas em paralelo, esperando até `timeout` s
+       (o que passar disso termina em segundo plano)."""
+    from services.client_pool import current_client
+
+    t0 = time.perf_counter()
+    current_client()
+    logger.info("preload: cliente da sessão em %.0f ms", (time.perf_counter() - t0) * 1000.0)
+    tasks: Dict[str, Callable[[], Any]] = {
+        "write_queue": _warm_write_queue,
+        "mirror": _warm_mirror,
+        "rda": _warm_rda,
+    }
+    if uid:
+        tasks.update(user_tasks(uid))
+    return fan_out(tasks, "preload", timeout=max(0.0, timeout - (time.perf_counter() - t0)))
@@ -0,0 +1,129 @@
+# services/profiling.py
+# -------------------------------------------------------------
+# Tempo de renderização por seção + profiler sob demanda
+# - with section("diario"): ...  (ou @section("apply_theme") em funções)
+#   mede o bloco e alimenta janelas móveis por seção (p50/p90/p99)
+# - Com o secret ENABLE_PROFILER=true, a sidebar oferece "perfilar o
+#   próximo rerun": cProfile liga no begin_rerun e desliga no end_rerun
+#   da mesma sessão; o resultado (.pstats) fica disponível para download
+# - Sem dependências do helpers (é importado por ele)
+# -------------------------------------------------------------
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional
+
+import streamlit as st
+
+WINDOW = 500                      # amostras por seção
+PERCENTILES = (50, 90, 99)
+
+_samples: Dict[str, Deque[float]] = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def section(name: str) -> Iterator[None]:
+    """Mede o bloco (ms). Também funciona como decorador."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, (time.perf_counter() - t0) * 1000.0)
+
+
+def record(name: str, ms: float):
+    with _lock:
+        buf = _samples.get(name)
+        if buf is None:
+            buf = _samples[name] = deque(maxlen=WINDOW)
+        buf.append(ms)
+
+
+def _pct(sorted_vals: List[float], p: float) -> float:
+    k = (len(sorted_vals) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def percentiles() -> List[dict]:
+    """Uma linha por seção: n, p50/p90/p99 e máximo (ms), mais lentas primeiro."""
+    with _lock:
+        snap = {k: sorted(v) for k, v in _samples.items() if v}
+    rows = []
+    for name, vals in snap.items():
+        row = {"seção": name, "n": len(vals)}
+        for p in PERCENTILES:
+            row[f"p{p} (ms)"] = round(_pct(vals, p), 1)
+        row["máx (ms)"] = round(vals[-1], 1)
+        rows.append(row)
+    return sorted(rows, key=lambda r: r[f"p{PERCENTILES[-1]} (ms)"], reverse=True)
+
+
+# ---------- profiler de um rerun ----------
+def profiler_enabled() -> bool:
+    try:
+        flag = st.secrets.get("ENABLE_PROFILER", "false")
+    except FileNotFoundError:
+        flag = "false"
+    return str(flag).lower() == "true"
+
+
+def start_profile_if_requested() -> Optional[cProfile.Profile]:
+    """Chamado no begin_rerun: liga o cProfile se a sessão pediu."""
+    if not st.session_state.pop("_profile_next", False):
+        return None
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:            # outro profiler ativo no processo
+        st.session_state["_profile_error"] = "Outro profiler está ativo; tente de novo."
+        return None
+    return prof
+
+
+def stop_profile(prof: Optional[cProfile.Profile], page: str):
+    """Desliga o cProfile e guarda .pstats + resumo em texto na sessão."""
+    if prof is None:
+        return
+    prof.disable()
+    text = io.StringIO()
+    pstats.Stats(prof, stream=text).sort_stats("cumulative").print_stats(40)
+    prof.create_stats()
+    raw = marshal.dumps(prof.stats)          # mesmo formato do dump_stats()
+    st.session_state["_profile_result"] = {
+        "page": page, "pstats": raw, "text": text.getvalue(), "at": time.strftime("%H:%M:%S"),
+    }
+
+
+def render_profiler_controls():
+    with st.sidebar.expander("⏱️ Profiler", expanded=False):
+        err = st.session_state.pop("_profile_error", None)
+        if err:
+            st.warning(err)
+        if st.button("Perfilar o próximo rerun", key="btn_profile_next", use_container_width=True):
+            st.session_state["_profile_next"] = True
+            st.rerun()
+        res = st.session_state.get("_profile_result")
+        if res:
+            st.caption(f"Último perfil: {res['page']} às {res['at']}")
+            st.download_button(
+                "⬇️ Baixar .pstats", data=res["pstats"],
+                file_name=f"caloria_{res['page']}.pstats", mime="application/octet-stream",
+                key="btn_profile_dl", use_container_width=True,
+            )
+            st.download_button(
+                "⬇️ Baixar resumo (.txt)", data=res["text"].encode("utf-8"),
+                file_name=f"caloria_{res['page']}_profile.txt", mime="text/plain",
+                key="btn_profile_txt", use_container_width=True,
+            )
+        rows = percentiles()
+        if rows:
+            st.caption("Tempo por seção (neste processo)")
+            st.dataframe(rows, hide_index=True, use_container_width=True)
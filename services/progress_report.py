@@ -0,0 +1,575 @@
+# services/progress_report.py
+# -------------------------------------------------------------
+# Relatório de progresso em PDF (paciente e coach)
+# - Roda como job em segundo plano (pool de threads) com progresso
+#   consultável pela UI; um job ativo por usuário
+# - Lê weight_logs, measurements, followups e food_diary em páginas
+#   (db_user_pages) e agrega de forma incremental: as linhas cruas de
+#   cada página são descartadas depois de viradas em flowables/somas
+# - Gráficos com reportlab.graphics a partir de séries reduzidas
+#   (médias semanais/mensais + downsample para MAX_CHART_POINTS)
+# - Fotos de progresso entram como miniaturas (1 por mês, no máximo
+#   MAX_PHOTOS) já redimensionadas pelo Storage (transformação de
+#   imagem); só se o projeto não oferecer transformação o original é
+#   baixado e reduzido com Pillow
+# - Jobs terminados expiram após JOB_TTL_SEC (verificado ao iniciar,
+#   consultar e baixar) e o PDF é descartado assim que é baixado
+# -------------------------------------------------------------
+import io
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import streamlit as st
+
+from helpers import db_get_profile, db_user_pages, logger, supabase
+
+PAGE_SIZE = 500
+TABLE_CHUNK = 30                 # linhas por Table (quebra de página barata)
+MAX_CHART_POINTS = 120
+MAX_PHOTOS = 12
+THUMB_PX = 320
+THUMB_TRANSFORM = {"width": THUMB_PX, "height": THUMB_PX, "resize": "contain", "quality": 70, "format": "origin"}
+JOB_TTL_SEC = 15 * 60            # PDFs prontos ficam na memória por este tempo
+POLL_SEC = 0.8
+
+MEDIDAS = (("chest_cm", "Tórax"), ("arm_cm", "Braço"), ("waist_cm", "Cintura"), ("abdomen_cm", "Abdômen"),
+           ("hip_cm", "Quadril"), ("thigh_cm", "Coxa"), ("calf_cm", "Pantur."))
+NOTAS = (("sleep", "Sono"), ("bowel", "Intest."), ("hunger", "Fome"), ("motivation", "Motiv."),
+         ("stress", "Estresse"), ("anxiety", "Ansied."), ("adherence", "Adesão"))
+CORES = ("#2BAEAE", "#FF7A3D", "#6C757D", "#845EC2", "#D65DB1", "#FFC75F", "#008F7A")
+
+# etapas e peso de cada uma na barra de progresso
+ETAPAS = (("peso", 0.15), ("medidas", 0.10), ("followups", 0.15), ("diario", 0.25),
+          ("fotos", 0.15), ("pdf", 0.20))
+
+
+@dataclass
+class ReportJob:
+    id: str
+    user_id: str
+    status: str = "fila"                 # fila | rodando | pronto | erro
+    stage: str = "Na fila…"
+    progress: float = 0.0
+    pdf: Optional[bytes] = None
+    error: Optional[str] = None
+    started: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("fila", "rodando")
+
+
+_jobs: "OrderedDict[str, ReportJob]" = OrderedDict()
+_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="caloria-report")
+
+
+def _expire_jobs():
+    now = time.time()
+    for jid in [j.id for j in _jobs.values() if j.finished and now - j.finished > JOB_TTL_SEC]:
+        _jobs.pop(jid, None)
+
+
+def start_report(user_id: str) -> ReportJob:
+    """Agenda o relatório; se já houver um em andamento para o usuário, devolve esse."""
+    with _lock:
+        _expire_jobs()
+        for job in _jobs.values():
+            if job.user_id == user_id and job.active:
+                return job
+        job = ReportJob(id=uuid.uuid4().hex[:12], user_id=user_id)
+        _jobs[job.id] = job
+    from services.client_pool import current_client
+    _pool.submit(_run_job, job, current_client())
+    return job
+
+
+def get_job(job_id: Optional[str]) -> Optional[ReportJob]:
+    if not job_id:
+        return None
+    with _lock:
+        _expire_jobs()
+        return _jobs.get(job_id)
+
+
+def discard_job(job_id: str):
+    """Libera o PDF da memória (depois do download)."""
+    with _lock:
+        _expire_jobs()
+        _jobs.pop(job_id, None)
+
+
+def _run_job(job: ReportJob, client=None):
+    from services.client_pool import use_client
+    t0 = time.perf_counter()
+    job.status = "rodando"
+    try:
+        with use_client(client):                 # consultas com o JWT de quem pediu
+            job.pdf = build_progress_report(job.user_id, job)
+        job.status, job.stage, job.progress = "pronto", "Pronto", 1.0
+        logger.info("relatorio: user=%s %.0f KB em %.0f ms", job.user_id,
+                    len(job.pdf) / 1024, (time.perf_counter() - t0) * 1000)
+    except Exception as e:
+        logger.exception("relatorio: falha para user=%s", job.user_id)
+        job.status, job.error = "erro", str(e)
+    finally:
+        job.finished = time.time()
+
+
+class _Progress:
+    """Converte (etapa, fração da etapa) em progresso global do job."""
+
+    def __init__(self, job: Optional[ReportJob]):
+        self.job = job
+        self.base = 0.0
+        self.weight = 0.0
+
+    def stage(self, name: str, label: str):
+        done = 0.0
+        for n, w in ETAPAS:
+            if n == name:
+                self.base, self.weight = done, w
+                break
+            done += w
+        self.update(0.0, label)
+
+    def update(self, frac: float, label: Optional[str] = None):
+        if self.job is None:
+            return
+        self.job.progress = min(0.99, self.base + self.weight * max(0.0, min(frac, 1.0)))
+        if label:
+            self.job.stage = label
+
+    def pages(self, it: Iterator[List[dict]]) -> Iterator[List[dict]]:
+        """Repassa as páginas avançando a barra (total desconhecido: 1 - 1/(n+1))."""
+        for n, page in enumerate(it, start=1):
+            yield page
+            self.update(1 - 1 / (n + 1))
+
+
+# ---------- séries ----------
+def _d(v) -> Optional[date]:
+    if not v:
+        return None
+    if isinstance(v, date):
+        return v
+    try:
+        return datetime.fromisoformat(str(v)[:10]).date()
+    except ValueError:
+        return None
+
+
+def _num(v) -> Optional[float]:
+    try:
+        return float(v) if v is not None and v != "" else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _Mean:
+    """Média incremental por chave (semana, mês...)."""
+
+    def __init__(self):
+        self.acc: Dict[object, List[float]] = {}
+
+    def add(self, key, v: Optional[float]):
+        if v is None:
+            return
+        a = self.acc.setdefault(key, [0.0, 0])
+        a[0] += v
+        a[1] += 1
+
+    def items(self) -> List[Tuple[object, float]]:
+        return [(k, s / n) for k, (s, n) in sorted(self.acc.items())]
+
+
+def _week(d: date) -> date:
+    return date.fromordinal(d.toordinal() - d.weekday())
+
+
+def _month(d: date) -> str:
+    return d.strftime("%Y-%m")
+
+
+def downsample(points: Sequence[Tuple[float, float]], max_points: int = MAX_CHART_POINTS) -> List[Tuple[float, float]]:
+    """Reduz a série a no máximo `max_points` por média de blocos contíguos."""
+    if len(points) <= max_points:
+        return list(points)
+    out = []
+    step = len(points) / max_points
+    for i in range(max_points):
+        block = points[int(i * step):int((i + 1) * step)] or [points[-1]]
+        out.append((sum(p[0] for p in block) / len(block), sum(p[1] for p in block) / len(block)))
+    return out
+
+
+# ---------- ReportLab ----------
+def _styles():
+    from reportlab.lib.styles import getSampleStyleSheet
+    return getSampleStyleSheet()
+
+
+def _table(rows, col_widths=None):
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
+
+    t = Table(rows, colWidths=col_widths, hAlign="LEFT", repeatRows=1)
+    t.setStyle(TableStyle([
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#DEE2E6")),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#2BAEAE")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+        ("TOPPADDING", (0, 0), (-1, -1), 2),
+    ]))
+    return t
+
+
+def _chunked_tables(header: List[str], rows: Iterator[List[str]], col_widths=None):
+    """Gera uma Table a cada TABLE_CHUNK linhas (em vez de uma tabela gigante)."""
+    buf: List[List[str]] = []
+    for r in rows:
+        buf.append(r)
+        if len(buf) >= TABLE_CHUNK:
+            yield _table([header] + buf, col_widths)
+            buf = []
+    if buf:
+        yield _table([header] + buf, col_widths)
+
+
+def _line_chart(series: Dict[str, List[Tuple[date, float]]], width=460, height=170):
+    """Gráfico de linhas com eixo x em datas; cada série já reduzida."""
+    from reportlab.graphics.charts.legends import Legend
+    from reportlab.graphics.charts.lineplots import LinePlot
+    from reportlab.graphics.shapes import Drawing
+    from reportlab.lib import colors
+
+    data = []
+    nomes = []
+    for nome, pts in series.items():
+        pts = downsample([(d.toordinal(), v) for d, v in pts])
+        if pts:
+            data.append(pts)
+            nomes.append(nome)
+    if not data:
+        return None
+
+    d = Drawing(width, height)
+    lp = LinePlot()
+    lp.x, lp.y = 40, 30
+    lp.width, lp.height = width - 60, height - (60 if len(nomes) > 1 else 45)
+    lp.data = data
+    lp.xValueAxis.labelTextFormat = lambda v: date.fromordinal(int(v)).strftime("%d/%m/%y")
+    lp.xValueAxis.labels.fontSize = 7
+    lp.yValueAxis.labels.fontSize = 7
+    for i in range(len(data)):
+        lp.lines[i].strokeColor = colors.HexColor(CORES[i % len(CORES)])
+        lp.lines[i].strokeWidth = 1.2
+    d.add(lp)
+    if len(nomes) > 1:
+        lg = Legend()
+        lg.x, lg.y = 40, height - 8
+        lg.fontSize = 7
+        lg.alignment = "right"
+        lg.columnMaximum = 1
+        lg.dx = lg.dy = 6
+        lg.deltax = 60
+        lg.colorNamePairs = [(colors.HexColor(CORES[i % len(CORES)]), n) for i, n in enumerate(nomes)]
+        d.add(lg)
+    return d
+
+
+def _fmt(v: Optional[float], nd: int = 1) -> str:
+    return "-" if v is None else f"{v:.{nd}f}"
+
+
+# ---------- seções ----------
+def _section_weights(uid: str, prog: _Progress, styles) -> Iterator:
+    from reportlab.platypus import Paragraph, Spacer
+
+    prog.stage("peso", "Lendo pesos…")
+    semana, mes = _Mean(), _Mean()
+    first = last = None
+    vmin = vmax = None
+    n = 0
+    for page in prog.pages(db_user_pages("weight_logs", uid, columns="id, ref_date, weight_kg", page_size=PAGE_SIZE)):
+        for r in page:
+            d, w = _d(r.get("ref_date")), _num(r.get("weight_kg"))
+            if d is None or w is None:
+                continue
+            n += 1
+            first = first or (d, w)
+            last = (d, w)
+            vmin = w if vmin is None else min(vmin, w)
+            vmax = w if vmax is None else max(vmax, w)
+            semana.add(_week(d), w)
+            mes.add(_month(d), w)
+
+    yield Paragraph("Peso", styles["Heading2"])
+    if not n:
+        yield Paragraph("Sem registros de peso.", styles["Italic"])
+        return
+    yield _table([
+        ["Registros", "Inicial", "Atual", "Variação", "Mínimo", "Máximo"],
+        [str(n), f"{first[1]:.1f} kg", f"{last[1]:.1f} kg", f"{last[1] - first[1]:+.1f} kg",
+         f"{vmin:.1f} kg", f"{vmax:.1f} kg"],
+    ])
+    chart = _line_chart({"Peso (média semanal)": semana.items()})
+    if chart is not None:
+        yield Spacer(1, 6)
+        yield chart
+
+    def _linhas():
+        prev = None
+        for m, w in mes.items():
+            yield [m, f"{w:.1f}", "-" if prev is None else f"{w - prev:+.1f}"]
+            prev = w
+    yield Spacer(1, 6)
+    yield from _chunked_tables(["Mês", "Média (kg)", "Var. (kg)"], _linhas())
+
+
+def _section_measurements(uid: str, prog: _Progress, styles) -> Iterator:
+    from reportlab.platypus import Paragraph
+
+    prog.stage("medidas", "Lendo medidas…")
+    yield Paragraph("Medidas corporais (cm) e variação desde a medição anterior", styles["Heading2"])
+    cols = [c for c, _ in MEDIDAS]
+
+    def _linhas():
+        prev: Dict[str, float] = {}
+        for page in prog.pages(db_user_pages(
+            "measurements", uid, columns="id, ref_date, " + ", ".join(cols), page_size=PAGE_SIZE,
+        )):
+            for r in page:
+                linha = [str(_d(r.get("ref_date")) or "-")]
+                for c in cols:
+                    v = _num(r.get(c)) or None          # 0 = não medido
+                    if v is None:
+                        linha.append("-")
+                        continue
+                    linha.append(f"{v:.1f}" if c not in prev else f"{v:.1f} ({v - prev[c]:+.1f})")
+                    prev[c] = v
+                yield linha
+
+    header = ["Data"] + [n for _, n in MEDIDAS]
+    vazio = True
+    for t in _chunked_tables(header, _linhas()):
+        vazio = False
+        yield t
+    if vazio:
+        yield Paragraph("Sem medições registradas.", styles["Italic"])
+
+
+def _section_followups(uid: str, prog: _Progress, styles) -> Iterator:
+    from reportlab.platypus import Paragraph, Spacer
+
+    prog.stage("followups", "Lendo follow ups…")
+    mensal = {c: _Mean() for c, _ in NOTAS}
+    cols = [c for c, _ in NOTAS]
+
+    def _linhas():
+        for page in prog.pages(db_user_pages(
+            "followups", uid, columns="id, ref_date, weight_kg, " + ", ".join(cols), page_size=PAGE_SIZE,
+        )):
+            for r in page:
+                d = _d(r.get("ref_date"))
+                if d is None:
+                    continue
+                for c in cols:
+                    mensal[c].add(date(d.year, d.month, 1), _num(r.get(c)))
+                yield [str(d), _fmt(_num(r.get("weight_kg")))] + [_fmt(_num(r.get(c)), 0) for c in cols]
+
+    # as tabelas saem depois do gráfico, mas são montadas no mesmo passe
+    tabelas = list(_chunked_tables(["Data", "Peso"] + [n for _, n in NOTAS], _linhas()))
+    yield Paragraph("Follow ups (notas 0–10)", styles["Heading2"])
+    if not tabelas:
+        yield Paragraph("Sem follow ups registrados.", styles["Italic"])
+        return
+    chart = _line_chart({n: mensal[c].items() for c, n in NOTAS if c in ("sleep", "stress", "adherence", "motivation")})
+    if chart is not None:
+        yield Paragraph("Médias mensais", styles["Italic"])
+        yield chart
+        yield Spacer(1, 6)
+    yield from tabelas
+
+
+def _section_diary(uid: str, prog: _Progress, styles) -> Iterator:
+    from reportlab.platypus import Paragraph, Spacer
+
+    prog.stage("diario", "Lendo diário alimentar…")
+    dias: Dict[date, List[float]] = {}                 # dia -> [kcal, prot, carb, gord]
+    for page in prog.pages(db_user_pages(
+        "food_diary", uid, columns="id, ref_date, kcal, protein_g, carbs_g, fat_g", page_size=PAGE_SIZE,
+    )):
+        for r in page:
+            d = _d(r.get("ref_date"))
+            if d is None:
+                continue
+            acc = dias.setdefault(d, [0.0, 0.0, 0.0, 0.0])
+            for i, c in enumerate(("kcal", "protein_g", "carbs_g", "fat_g")):
+                acc[i] += _num(r.get(c)) or 0.0
+
+    yield Paragraph("Diário alimentar (médias por dia registrado)", styles["Heading2"])
+    if not dias:
+        yield Paragraph("Sem refeições registradas.", styles["Italic"])
+        return
+    semana = _Mean()
+    mes: Dict[str, List[float]] = {}
+    for d, (kcal, p, c, g) in sorted(dias.items()):
+        semana.add(_week(d), kcal)
+        acc = mes.setdefault(_month(d), [0, 0.0, 0.0, 0.0, 0.0])
+        acc[0] += 1
+        for i, v in enumerate((kcal, p, c, g), start=1):
+            acc[i] += v
+    n_dias = len(dias)
+    dias.clear()
+
+    yield Paragraph(f"{n_dias} dia(s) com registro.", styles["BodyText"])
+    chart = _line_chart({"kcal/dia (média semanal)": semana.items()})
+    if chart is not None:
+        yield chart
+        yield Spacer(1, 6)
+    linhas = ([m, str(n), f"{k / n:.0f}", f"{p / n:.0f}", f"{c / n:.0f}", f"{g / n:.0f}"]
+              for m, (n, k, p, c, g) in sorted(mes.items()))
+    yield from _chunked_tables(["Mês", "Dias", "kcal", "Prot. (g)", "Carb. (g)", "Gord. (g)"], linhas)
+
+
+def _image(data: bytes):
+    """Miniatura já pequena como flowable Image (lado maior 150 pt)."""
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import Image
+
+    w, h = ImageReader(io.BytesIO(data)).getSize()
+    scale = 150.0 / max(w, h)
+    return Image(io.BytesIO(data), width=w * scale, height=h * scale)
+
+
+def _thumbnail(data: bytes) -> bytes:
+    """Reduz o original com Pillow (projeto sem transformação de imagem)."""
+    from PIL import Image as PILImage
+
+    with PILImage.open(io.BytesIO(data)) as im:
+        im.thumbnail((THUMB_PX, THUMB_PX))
+        out = io.BytesIO()
+        im.convert("RGB").save(out, format="JPEG", quality=70, optimize=True)
+    return out.getvalue()
+
+
+def _photo(bucket, path: str):
+    """Miniatura redimensionada pelo Storage; original + Pillow se falhar."""
+    try:
+        return _image(bucket.download(path, {"transform": THUMB_TRANSFORM}))
+    except Exception as e:
+        logger.info("relatorio: transformação indisponível para %s (%s), reduzindo localmente", path, e)
+    return _image(_thumbnail(bucket.download(path)))
+
+
+def _section_photos(uid: str, prog: _Progress, styles) -> Iterator:
+    from reportlab.platypus import Paragraph, Table
+
+    prog.stage("fotos", "Preparando fotos…")
+    yield Paragraph("Fotos de progresso", styles["Heading2"])
+    bucket = supabase.storage.from_("progress-photos")
+    try:
+        meses = sorted((f["name"] for f in bucket.list(path=uid) or []), reverse=True)[:MAX_PHOTOS]
+    except Exception as e:
+        logger.warning("relatorio: não listou fotos de %s: %s", uid, e)
+        meses = []
+    celulas = []
+    for i, mes in enumerate(sorted(meses)):
+        try:
+            itens = sorted(x["name"] for x in bucket.list(path=f"{uid}/{mes}") or [])
+            if not itens:
+                continue
+            img = _photo(bucket, f"{uid}/{mes}/{itens[0]}")  # 1ª foto do mês
+            celulas.append([img, Paragraph(mes, styles["Italic"])])
+        except Exception as e:
+            logger.info("relatorio: foto de %s/%s ignorada: %s", uid, mes, e)
+        prog.update((i + 1) / max(len(meses), 1))
+    if not celulas:
+        yield Paragraph("Sem fotos enviadas.", styles["Italic"])
+        return
+    por_linha = 3
+    for i in range(0, len(celulas), por_linha):
+        grupo = celulas[i:i + por_linha]
+        yield Table([[c[0] for c in grupo], [c[1] for c in grupo]], hAlign="LEFT")
+
+
+def build_progress_report(uid: str, job: Optional[ReportJob] = None) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer
+
+    prog = _Progress(job)
+    styles = _styles()
+    perfil = db_get_profile(uid) or {}
+    nome = perfil.get("full_name") or perfil.get("nome") or perfil.get("email") or "Paciente"
+
+    story = [
+        Paragraph("Relatório de progresso", styles["Title"]),
+        Paragraph(f"{nome} • gerado em {datetime.now().strftime('%d/%m/%Y %H:%M')}", styles["BodyText"]),
+        Spacer(1, 10),
+    ]
+    story.extend(_section_weights(uid, prog, styles))
+    story.append(Spacer(1, 10))
+    story.extend(_section_measurements(uid, prog, styles))
+    story.append(PageBreak())
+    story.extend(_section_followups(uid, prog, styles))
+    story.append(Spacer(1, 10))
+    story.extend(_section_diary(uid, prog, styles))
+    story.append(PageBreak())
+    story.extend(_section_photos(uid, prog, styles))
+
+    prog.stage("pdf", "Montando PDF…")
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4, title=f"Relatório de progresso — {nome}",
+                            leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm)
+    total = max(len(story), 1)
+    doc.setProgressCallBack(lambda kind, n: kind == "PROGRESS" and prog.update(n / total))
+    doc.build(story)
+    return buf.getvalue()
+
+
+# ---------- UI ----------
+def render_report_controls(user_id: str, key: str = "me"):
+    """Botão "gerar" + progresso + download. Enquanto o job roda, só um
+       fragmento (run_every) é reexecutado; ao terminar, a página volta."""
+    state_key = f"_report_job_{key}"
+    job = get_job(st.session_state.get(state_key))
+    if job is not None and job.user_id != user_id:
+        job = None
+    busy = job is not None and job.active
+
+    if st.button("📑 Gerar relatório de progresso (PDF)", key=f"btn_report_{key}", disabled=busy):
+        job = start_report(user_id)
+        st.session_state[state_key] = job.id
+        busy = True
+
+    if job is None:
+        st.caption("Peso, medidas, follow ups, médias do diário e fotos em um único PDF.")
+    elif busy:
+        _report_progress(job.id)
+    elif job.status == "pronto":
+        st.download_button(
+            "⬇️ Baixar relatório", data=job.pdf, mime="application/pdf",
+            file_name=f"Relatorio_Progresso_{datetime.now().strftime('%Y%m%d')}.pdf",
+            key=f"btn_report_dl_{key}", on_click=discard_job, args=(job.id,),
+        )
+    else:
+        st.error(f"Não foi possível gerar o relatório: {job.error}")
+
+
+@st.fragment(run_every=POLL_SEC)
+def _report_progress(job_id: str):
+    job = get_job(job_id)
+    if job is None or not job.active:
+        st.rerun()                  # terminou: redesenha a página com o download
+    st.progress(job.progress, text=job.stage)
@@ -0,0 +1,97 @@
+# services/recipe_catalog.py
+# -------------------------------------------------------------
+# Catálogo de receitas como matriz NumPy (compartilhada pelo processo)
+# - Uma leitura paginada de `recipes` (só as colunas usadas) a cada
+#   CATALOG_TTL_SEC; vira arrays alinhados por índice:
+#   macros (n x 4: kcal, proteína, carbo, gordura — por porção),
+#   categoria, flag de degustação grátis, tempo de preparo e
+#   micronutrientes por porção (n x len(MICRO_COLUMNS); colunas que não
+#   existem na instalação ficam zeradas e com micro_present=False)
+# - `version` (hash de ids + macros + micros) identifica o conteúdo: estruturas
+#   derivadas são cacheadas por versão, não por recarga
+# - Base do gerador de cardápios (services.meal_generator) e do
+#   recomendador de receitas (services.recipe_recommender); também da
+#   composição de micronutrientes do diário (services.micronutrients)
+# -------------------------------------------------------------
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+import numpy as np
+import streamlit as st
+
+from helpers import db_fetch_all, logger, supabase
+
+CATALOG_TTL_SEC = 600
+COLUMNS = "id, titulo, categoria, tempo_min, kcal, proteina_g, carbo_g, gordura_g, degustacao_gratis"
+MACROS = ("kcal", "proteina_g", "carbo_g", "gordura_g")
+MICRO_COLUMNS = (
+    "vitamina_a_ug", "vitamina_c_mg", "vitamina_d_ug", "vitamina_b12_ug",
+    "calcio_mg", "ferro_mg", "magnesio_mg", "zinco_mg", "potassio_mg",
+)
+_UNDEFINED_COLUMN = "42703"
+
+
+@dataclass(frozen=True)
+class RecipeCatalog:
+    ids: List[Any]
+    titles: List[str]
+    categories: np.ndarray        # (n,) object
+    macros: np.ndarray            # (n, 4) float32
+    free: np.ndarray              # (n,) bool
+    minutes: np.ndarray           # (n,) float32 (nan = sem tempo)
+    version: str = ""
+    micros: np.ndarray = field(default_factory=lambda: np.zeros((0, len(MICRO_COLUMNS)), dtype=np.float32))
+    micro_present: np.ndarray = field(default_factory=lambda: np.zeros(len(MICRO_COLUMNS), dtype=bool))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def category_mask(self, categorias) -> np.ndarray:
+        return np.isin(self.categories, list(categorias))
+
+
+def build_catalog(rows: List[Dict[str, Any]]) -> RecipeCatalog:
+    def _f(v) -> float:
+        try:
+            return float(v)
+        except (TypeError, ValueError):
+            return np.nan
+
+    rows = [r for r in rows if r.get("kcal") not in (None, "")]
+    macros = np.array([[_f(r.get(c)) for c in MACROS] for r in rows], dtype=np.float32).reshape(-1, 4)
+    macros = np.nan_to_num(macros, nan=0.0)
+    ids = [r["id"] for r in rows]
+    micros = np.array(
+        [[_f(r.get(c)) for c in MICRO_COLUMNS] for r in rows], dtype=np.float32
+    ).reshape(-1, len(MICRO_COLUMNS))
+    h = hashlib.sha1(repr(ids).encode("utf-8"))
+    h.update(macros.tobytes())
+    h.update(micros.tobytes())
+    return RecipeCatalog(
+        ids=ids,
+        titles=[r.get("titulo") or "" for r in rows],
+        categories=np.array([r.get("categoria") or "" for r in rows], dtype=object),
+        macros=macros,
+        free=np.array([bool(r.get("degustacao_gratis")) for r in rows], dtype=bool),
+        minutes=np.array([_f(r.get("tempo_min")) for r in rows], dtype=np.float32),
+        version=h.hexdigest()[:16],
+        micros=np.nan_to_num(micros, nan=0.0),
+        micro_present=np.array([any(r.get(c) is not None for r in rows) for c in MICRO_COLUMNS], dtype=bool),
+    )
+
+
+@st.cache_resource(ttl=CATALOG_TTL_SEC, show_spinner=False)
+def get_recipe_catalog() -> RecipeCatalog:
+    cols = f"{COLUMNS}, {', '.join(MICRO_COLUMNS)}"
+    try:
+        rows = db_fetch_all(lambda: supabase.table("recipes").select(cols).order("id"))
+    except Exception as e:
+        # instalação sem as colunas de micronutrientes: catálogo só com macros
+        if str(getattr(e, "code", "")) != _UNDEFINED_COLUMN:
+            raise
+        logger.info("recipes: sem colunas de micronutrientes (%s)", e)
+        rows = db_fetch_all(lambda: supabase.table("recipes").select(COLUMNS).order("id"))
+    cat = build_catalog(rows)
+    logger.info("recipes: catálogo com %d receita(s)", len(cat))
+    return cat
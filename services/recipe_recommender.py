@@ -0,0 +1,105 @@
+# services/recipe_recommender.py
+# -------------------------------------------------------------
+# "O que cabe no que falta hoje": ranking de receitas pelo saldo de macros
+# - Saldo = metas do dia (session_state) - totais do diário, sem negativos
+# - Matriz receita x porção x macro (n x P x 4) montada uma vez por
+#   versão do catálogo e compartilhada entre sessões (cache_resource)
+# - Distância ponderada e relativa ao saldo (com pisos, para saldos
+#   pequenos); passar do saldo pesa OVERSHOOT vezes mais que faltar.
+#   Cada receita entra com a melhor porção
+# -------------------------------------------------------------
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import streamlit as st
+
+from services.recipe_catalog import RecipeCatalog
+
+PORTIONS = np.array([0.5, 1.0, 1.5, 2.0], dtype=np.float32)
+WEIGHTS = np.array([1.0, 1.2, 0.6, 0.6], dtype=np.float32)     # kcal, P, C, G
+FLOORS = np.array([150.0, 10.0, 15.0, 5.0], dtype=np.float32)  # escala mínima por macro
+OVERSHOOT = 2.0
+MIN_KCAL_LEFT = 80.0                                           # abaixo disso: meta do dia batida
+
+
+@dataclass(frozen=True)
+class Recommendation:
+    index: int                      # linha no catálogo
+    portions: float
+    macros: Tuple[float, float, float, float]
+    score: float
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _portion_matrix(version: str, _catalog: RecipeCatalog) -> np.ndarray:
+    return _catalog.macros[:, None, :] * PORTIONS[None, :, None]
+
+
+def remaining_macros(targets: Sequence[Optional[float]], consumed: Sequence[float]) -> Optional[np.ndarray]:
+    """(kcal, P, C, G) que ainda faltam; None se alguma meta não estiver definida."""
+    if any(t is None for t in targets):
+        return None
+    rest = np.asarray(targets, dtype=np.float32) - np.asarray(consumed, dtype=np.float32)
+    return np.maximum(rest, 0.0)
+
+
+def score_recipes(catalog: RecipeCatalog, remaining: Sequence[float]) -> Tuple[np.ndarray, np.ndarray]:
+    """(erro, índice da melhor porção) por receita, para o saldo `remaining`."""
+    rem = np.asarray(remaining, dtype=np.float32)
+    mat = _portion_matrix(catalog.version, catalog)                  # (n, P, 4)
+    diff = (mat - rem) / np.maximum(rem, FLOORS)
+    diff = np.where(diff > 0, diff * OVERSHOOT, diff)
+    err = (diff * diff) @ WEIGHTS                                    # (n, P)
+    best = err.argmin(axis=1)
+    return err[np.arange(len(best)), best], best
+
+
+def recommend(
+    catalog: RecipeCatalog,
+    remaining: Sequence[float],
+    k: int = 5,
+    pool: Optional[np.ndarray] = None,
+) -> List[Recommendation]:
+    """As k receitas que melhor cabem no saldo (melhor primeiro)."""
+    if len(catalog) == 0 or remaining[0] < MIN_KCAL_LEFT:
+        return []
+    err, best = score_recipes(catalog, remaining)
+    if pool is not None:
+        err = np.where(pool, err, np.inf)
+    k = min(k, int(np.isfinite(err).sum()))
+    if k <= 0:
+        return []
+    top = np.argpartition(err, k - 1)[:k]
+    top = top[np.argsort(err[top], kind="stable")]
+    return [
+        Recommendation(
+            index=int(i), portions=float(PORTIONS[best[i]]),
+            macros=tuple(float(x) for x in catalog.macros[i] * PORTIONS[best[i]]),
+            score=float(err[i]),
+        )
+        for i in top
+    ]
+
+
+def fit_by_id(catalog: RecipeCatalog, remaining: Sequence[float]) -> Dict[object, Tuple[float, float]]:
+    """{id da receita: (erro, porções)} — para ordenar listas já carregadas."""
+    if len(catalog) == 0:
+        return {}
+    err, best = score_recipes(catalog, remaining)
+    return {rid: (float(e), float(PORTIONS[b])) for rid, e, b in zip(catalog.ids, err, best)}
+
+
+def recommendation_rows(catalog: RecipeCatalog, recs: List[Recommendation]) -> List[Dict]:
+    return [
+        {
+            "Receita": catalog.titles[r.index],
+            "Categoria": catalog.categories[r.index],
+            "Porções": r.portions,
+            "kcal": round(r.macros[0]),
+            "P (g)": round(r.macros[1]),
+            "C (g)": round(r.macros[2]),
+            "G (g)": round(r.macros[3]),
+        }
+        for r in recs
+    ]
@@ -0,0 +1,180 @@
+# services/tracing.py
+# -------------------------------------------------------------
+# Tracing das chamadas ao Supabase por rerun
+# - begin_rerun(página) no topo de cada página abre um trace com id de
+#   correlação; end_rerun() no fim fecha, loga 1 linha no logger "caloria"
+#   e (com o secret DEBUG_TRACE=true) mostra o waterfall na sidebar
+# - Chamadas são associadas à sessão pela ScriptRunContext da thread;
+#   threads de fundo (fila de gravação, sync) ficam fora do trace
+# - Rerun interrompido (st.stop / st.rerun / switch_page) é logado no
+#   início do próximo rerun da mesma sessão, com status "interrompido"
+# - session_writes(): gravações do rerun aberto (services/fanout.py
+#   descarta leituras pré-carregadas quando a sessão grava depois delas)
+# - Também registra o tempo total da página em services.profiling e
+#   liga/desliga o profiler de um rerun (secret ENABLE_PROFILER)
+# -------------------------------------------------------------
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from helpers import get_config, logger
+from services.db_instrument import Call
+from services.profiling import (
+    profiler_enabled, record, render_profiler_controls,
+    start_profile_if_requested, stop_profile,
+)
+
+MAX_OPEN_TRACES = 500
+
+
+@dataclass
+class RerunTrace:
+    rid: str
+    page: str
+    started: float                                   # perf_counter
+    calls: List[Call] = field(default_factory=list)
+    profiler: Any = None
+
+    @property
+    def db_ms(self) -> float:
+        return sum(c.ms for c in self.calls)
+
+    def summary(self, status: str) -> str:
+        # rerun interrompido só é visto no próximo: duração desconhecida
+        wall = f"{(time.perf_counter() - self.started) * 1000.0:.0f}" if status == "ok" else "?"
+        reads = sum(1 for c in self.calls if c.category == "read")
+        writes = sum(1 for c in self.calls if c.category == "write")
+        slowest = max(self.calls, key=lambda c: c.ms, default=None)
+        return (
+            f"rerun id={self.rid} page={self.page} status={status} ms={wall} "
+            f"calls={len(self.calls)} reads={reads} writes={writes} db_ms={self.db_ms:.0f} "
+            f"rows={sum(c.rows or 0 for c in self.calls)} "
+            f"bytes_out={sum(c.payload_bytes for c in self.calls)} "
+            f"slowest={f'{slowest.key}:{slowest.ms:.0f}ms' if slowest else '-'}"
+        )
+
+
+_traces: Dict[str, RerunTrace] = {}                  # session_id -> trace aberto
+_lock = threading.Lock()
+_installed = False
+
+
+def _session_id() -> Optional[str]:
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
+
+
+def _sink(call: Call):
+    sid = _session_id()
+    if sid is None:
+        return
+    tr = _traces.get(sid)
+    if tr is not None:
+        tr.calls.append(call)
+
+
+def _install():
+    global _installed
+    if _installed:
+        return
+    from helpers import supabase
+    with _lock:
+        if not _installed and hasattr(supabase, "add_sink"):
+            supabase.add_sink(_sink)
+            _installed = True
+
+
+def session_writes() -> Optional[Dict[str, int]]:
+    """Gravações por alvo (tabela/bucket) no rerun aberto desta sessão
+       (None sem trace)."""
+    sid = _session_id()
+    tr = _traces.get(sid) if sid else None
+    if tr is None:
+        return None
+    out: Dict[str, int] = {}
+    for c in list(tr.calls):
+        if c.category == "write":
+            for t in c.tables:
+                out[t] = out.get(t, 0) + 1
+    return out
+
+
+def trace_enabled() -> bool:
+    return str(get_config("DEBUG_TRACE", "false")).lower() == "true"
+
+
+def begin_rerun(page: str) -> str:
+    """Abre o trace do rerun atual e retorna o id de correlação."""
+    _install()
+    sid = _session_id() or "-"
+    tr = RerunTrace(rid=uuid.uuid4().hex[:8], page=page, started=time.perf_counter())
+    with _lock:
+        prev = _traces.pop(sid, None)
+        if len(_traces) >= MAX_OPEN_TRACES:      # sessões que sumiram no meio do rerun
+            _traces.pop(next(iter(_traces)))
+        _traces[sid] = tr
+    if prev is not None:
+        logger.info(prev.summary("interrompido"))
+        stop_profile(prev.profiler, prev.page)
+    st.session_state["_rerun_id"] = tr.rid
+    tr.profiler = start_profile_if_requested()
+    return tr.rid
+
+
+def end_rerun():
+    """Fecha o trace: loga a linha-resumo e desenha o painel de debug."""
+    sid = _session_id() or "-"
+    with _lock:
+        tr = _traces.pop(sid, None)
+    if tr is None:
+        return
+    stop_profile(tr.profiler, tr.page)
+    record(f"página:{tr.page}", (time.perf_counter() - tr.started) * 1000.0)
+    logger.info(tr.summary("ok"))
+    if trace_enabled():
+        render_trace_panel(tr)
+    if profiler_enabled():
+        render_profiler_controls()
+
+
+def render_trace_panel(tr: RerunTrace):
+    import pandas as pd
+
+    with st.sidebar.expander(f"🛠️ Debug • rerun {tr.rid}", expanded=False):
+        st.caption(
+            f"{tr.page} • {len(tr.calls)} chamada(s) • {tr.db_ms:.0f} ms no backend • "
+            f"{(time.perf_counter() - tr.started) * 1000:.0f} ms no total"
+        )
+        if not tr.calls:
+            st.write("Nenhuma chamada ao backend neste rerun.")
+            return
+        df = pd.DataFrame([{
+            "#": i + 1,
+            "alvo": f"{c.kind}:{c.key}",
+            "início (ms)": round((c.started - tr.started) * 1000.0, 1),
+            "fim (ms)": round((c.started - tr.started) * 1000.0 + c.ms, 1),
+            "duração (ms)": round(c.ms, 1),
+            "linhas": c.rows,
+            "payload (B)": c.payload_bytes,
+            "filtros": " ".join(c.filters),
+            "ok": c.ok,
+        } for i, c in enumerate(tr.calls)])
+
+        try:
+            import altair as alt
+            chart = alt.Chart(df).mark_bar().encode(
+                x=alt.X("início (ms):Q", title="ms desde o início do rerun"),
+                x2="fim (ms):Q",
+                y=alt.Y("#:O", title=None),
+                color=alt.Color("ok:N", legend=None),
+                tooltip=["alvo", "duração (ms)", "linhas", "filtros"],
+            ).properties(height=max(80, 18 * len(df)))
+            st.altair_chart(chart, use_container_width=True)
+        except Exception:
+            pass
+        st.dataframe(df, hide_index=True, use_container_width=True)
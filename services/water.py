@@ -0,0 +1,172 @@
+# services/water.py
+# -------------------------------------------------------------
+# Consumo de água persistido (tabela public.water_log, criada em
+# supabase/migrations/20261019000500_water_log.sql)
+# - Uma linha por (user_id, ref_date) com o total do dia em ml
+# - Buffer com debounce: cliques seguidos em ➕/➖ só atualizam memória;
+#   após WATER_DEBOUNCE_SEC sem mudanças (ou ao navegar/sair) o valor final
+#   de cada (usuário, dia) vai para a fila write-behind (services.write_queue),
+#   que agrupa tudo em um upsert em lote e cuida das novas tentativas
+# - Histórico diário cacheado para o gráfico; valores enviados à fila
+#   ficam em memória por WATER_HISTORY_TTL_SEC e se sobrepõem ao cache
+#   (e à leitura do dia), então o gráfico não mostra o valor antigo nem
+#   enquanto a gravação ainda está na fila
+# -------------------------------------------------------------
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, Tuple, Optional
+
+import streamlit as st
+
+from helpers import logger
+
+WATER_TABLE = "water_log"
+WATER_DEBOUNCE_SEC = 3.0
+WATER_HISTORY_TTL_SEC = 300
+
+
+class WaterBuffer:
+    """Coalesce gravações de água por (user_id, ref_date)."""
+
+    def __init__(self, write_queue, debounce_sec: float = WATER_DEBOUNCE_SEC):
+        self.write_queue = write_queue
+        self.debounce_sec = debounce_sec
+        self._pending: Dict[Tuple[str, str], Tuple[int, float, Any]] = {}
+        self._recent: Dict[Tuple[str, str], Tuple[int, float]] = {}    # já enviados: (ml, monotonic)
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def set(self, uid: str, ref_date: date, ml: int):
+        from services.client_pool import capture_client
+        ref = capture_client()                        # o timer grava com o JWT da sessão (ref. fraca)
+        with self._lock:
+            self._pending[(uid, str(ref_date))] = (int(ml), time.monotonic(), ref)
+            self._schedule_locked(self.debounce_sec)
+
+    def get(self, uid: str, ref_date: date) -> Optional[int]:
+        """Valor pendente ou enviado há menos de WATER_HISTORY_TTL_SEC."""
+        key = (uid, str(ref_date))
+        with self._lock:
+            item = self._pending.get(key) or self._recent.get(key)
+        return item[0] if item else None
+
+    def _prune_recent_locked(self, now: float):
+        for k in [k for k, (_, ts) in self._recent.items() if now - ts >= WATER_HISTORY_TTL_SEC]:
+            del self._recent[k]
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def _schedule_locked(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self):
+        self.flush(only_due=True)
+
+    def flush(self, uid: Optional[str] = None, only_due: bool = False) -> int:
+        """Envia as entradas pendentes para a fila de gravação.
+           uid: restringe a um usuário (ex.: ao sair/navegar).
+           only_due: só entradas paradas há mais de debounce_sec."""
+        now = time.monotonic()
+        with self._lock:
+            keys = [
+                k for k, (_, ts, _) in self._pending.items()
+                if (uid is None or k[0] == uid) and (not only_due or now - ts >= self.debounce_sec)
+            ]
+            batch = {k: self._pending.pop(k) for k in keys}
+            self._prune_recent_locked(now)
+            if self._pending:
+                self._schedule_locked(self.debounce_sec)
+        if not batch:
+            return 0
+
+        from services.client_pool import use_client
+        sent = 0
+        for (u, d), (ml, _, ref) in batch.items():
+            client = ref.get()
+            if client is None:                        # logout antes do debounce
+                logger.warning("water_log: %s/%s descartado: sessão encerrada.", u, d)
+                continue
+            with use_client(client, ref.session):
+                self.write_queue.upsert(WATER_TABLE, {"user_id": u, "ref_date": d, "ml": ml}, on_conflict="user_id,ref_date")
+            with self._lock:
+                if (u, d) not in self._pending:           # novo clique desde o flush prevalece
+                    self._recent[(u, d)] = (ml, now)
+            sent += 1
+        logger.info("water_log: %d linha(s) enviadas à fila de gravação", sent)
+        return sent
+
+
+@st.cache_resource
+def get_water_buffer() -> WaterBuffer:
+    from services.write_queue import get_write_queue
+    return WaterBuffer(get_write_queue())
+
+
+def load_water_ml(uid: str, ref_date: date) -> int:
+    """Total do dia: valor pendente no buffer ou o gravado no banco."""
+    pending = get_water_buffer().get(uid, ref_date)
+    if pending is not None:
+        return pending
+    from helpers import supabase
+    try:
+        res = (
+            supabase.table(WATER_TABLE)
+            .select("ml")
+            .eq("user_id", uid)
+            .eq("ref_date", str(ref_date))
+            .limit(1)
+            .execute()
+        )
+        return int((res.data or [{}])[0].get("ml") or 0)
+    except Exception:
+        return 0
+
+
+def set_water_ml(uid: str, ref_date: date, ml: int):
+    get_water_buffer().set(uid, ref_date, max(0, int(ml)))
+
+
+def flush_water(uid: Optional[str] = None) -> int:
+    return get_water_buffer().flush(uid)
+
+
+@st.cache_data(ttl=WATER_HISTORY_TTL_SEC, show_spinner=False)
+def _water_history_cached(uid: str, days: int, until: str):
+    from helpers import supabase, db_fetch_all
+    since = date.fromisoformat(until) - timedelta(days=days - 1)
+    return db_fetch_all(
+        lambda: supabase.table(WATER_TABLE)
+        .select("ref_date, ml")
+        .eq("user_id", uid)
+        .gte("ref_date", str(since))
+        .lte("ref_date", until)
+        .order("ref_date")
+    )
+
+
+def water_history(uid: str, days: int = 30):
+    """Série diária (ml) dos últimos `days` dias, com zeros nos dias vazios.
+       Usa o histórico cacheado e sobrepõe os valores pendentes/recém-enviados."""
+    import pandas as pd
+
+    hoje = date.today()
+    rows = _water_history_cached(uid, days, str(hoje))
+    idx = pd.date_range(hoje - timedelta(days=days - 1), hoje, freq="D").date
+    serie = pd.Series(0, index=idx, name="ml", dtype="int64")
+    for r in rows:
+        d = date.fromisoformat(str(r["ref_date"])[:10])
+        if d in serie.index:
+            serie[d] = int(r.get("ml") or 0)
+    buf = get_water_buffer()
+    for d in serie.index:
+        recente = buf.get(uid, d)
+        if recente is not None:
+            serie[d] = recente
+    return serie
@@ -0,0 +1,271 @@
+# services/write_queue.py
+# -------------------------------------------------------------
+# Fila write-behind para gravações de baixo valor (eventos de pontos,
+# badges, upsert de perfil pós-login, água...)
+# - Uma thread de trabalho por processo consome a fila
+# - Inserts/upserts da mesma tabela (e mesmo on_conflict) viram UMA
+#   requisição em lote; updates e RPCs são executados um a um
+# - Lote recusado é reenviado item a item: só a linha ruim vai para o
+#   retry (backoff exponencial) e, após MAX_ATTEMPTS, é descartada
+# - Esvaziada no encerramento do processo (atexit)
+# - Cada item guarda uma referência fraca ao cliente da sessão que o
+#   enfileirou (JWT do usuário): a fila não segura clientes despejados
+#   ou de sessões encerradas; lotes só juntam itens da mesma sessão
+# - metrics() expõe profundidade da fila e contadores
+# -------------------------------------------------------------
+import atexit
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import streamlit as st
+
+from helpers import logger
+
+BATCH_MAX_ROWS = 500
+BATCH_WAIT_SEC = 0.25      # espera curta para juntar itens do mesmo lote
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SEC = 0.5
+BACKOFF_MAX_SEC = 30.0
+
+
+@dataclass
+class WriteOp:
+    table: str                               # tabela (ou função, em "rpc")
+    op: str                                  # "insert" | "upsert" | "update" | "rpc"
+    payload: Dict[str, Any]
+    on_conflict: Optional[str] = None
+    match: Dict[str, Any] = field(default_factory=dict)   # filtros eq() do update
+    attempts: int = 0
+    not_before: float = 0.0                  # monotonic; para backoff
+    client: Any = None                       # ClientRef da sessão que enfileirou
+    client_key: Any = None                   # identifica a sessão nos lotes
+
+    def batch_key(self) -> Optional[Tuple[str, str, Optional[str], Any]]:
+        if self.op in ("insert", "upsert"):
+            return (self.table, self.op, self.on_conflict, self.client_key)
+        return None
+
+
+class WriteQueue:
+    def __init__(self):
+        self._q: "queue.Queue[WriteOp]" = queue.Queue()
+        self._retry: List[WriteOp] = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._stop = threading.Event()
+        self._stats = {
+            "enqueued": 0, "written_rows": 0, "requests": 0,
+            "retries": 0, "dropped": 0, "last_error": None,
+        }
+        self._worker = threading.Thread(target=self._run, name="caloria-write-queue", daemon=True)
+        self._worker.start()
+
+    # ---------- API ----------
+    def insert(self, table: str, row: Dict[str, Any]):
+        self._put(WriteOp(table, "insert", row))
+
+    def upsert(self, table: str, row: Dict[str, Any], on_conflict: Optional[str] = None):
+        self._put(WriteOp(table, "upsert", row, on_conflict=on_conflict))
+
+    def update(self, table: str, values: Dict[str, Any], **match):
+        self._put(WriteOp(table, "update", values, match=match))
+
+    def rpc(self, fn: str, params: Dict[str, Any]):
+        self._put(WriteOp(fn, "rpc", params))
+
+    def depth(self) -> int:
+        with self._lock:
+            return self._q.qsize() + len(self._retry) + self._in_flight
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+            out["depth"] = self._q.qsize() + len(self._retry) + self._in_flight
+            out["retry_pending"] = len(self._retry)
+        return out
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Bloqueia até a fila esvaziar (ou timeout). Retorna True se esvaziou."""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._q.qsize() + len(self._retry) + self._in_flight > 0:
+                # itens em backoff podem ser antecipados durante o flush
+                for op in self._retry:
+                    op.not_before = 0.0
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    return False
+                self._idle.wait(min(left, 0.1))
+        return True
+
+    def shutdown(self, timeout: float = 5.0):
+        ok = self.flush(timeout)
+        self._stop.set()
+        if not ok:
+            logger.warning("write_queue: encerrando com %d gravação(ões) pendente(s).", self.depth())
+
+    # ---------- internos ----------
+    def _put(self, op: WriteOp):
+        from services.client_pool import capture_client
+        op.client = capture_client()
+        op.client_key = op.client.key()
+        with self._lock:
+            self._stats["enqueued"] += 1
+        self._q.put(op)
+
+    def _take_batch(self) -> List[WriteOp]:
+        """Primeiro item disponível + o que chegar em BATCH_WAIT_SEC."""
+        ops: List[WriteOp] = []
+        now = time.monotonic()
+        with self._lock:
+            ready = [op for op in self._retry if op.not_before <= now]
+            self._retry = [op for op in self._retry if op.not_before > now]
+            ops.extend(ready)
+            self._in_flight += len(ready)
+        if not ops:
+            try:
+                op = self._q.get(timeout=0.2)
+            except queue.Empty:
+                return []
+            with self._lock:
+                self._in_flight += 1
+            ops.append(op)
+            time.sleep(BATCH_WAIT_SEC)
+        while len(ops) < BATCH_MAX_ROWS:
+            try:
+                op = self._q.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._in_flight += 1
+            ops.append(op)
+        return ops
+
+    def _run(self):
+        while not self._stop.is_set():
+            ops = self._take_batch()
+            if not ops:
+                continue
+            groups: Dict[Any, List[WriteOp]] = {}
+            singles: List[WriteOp] = []
+            for op in ops:
+                key = op.batch_key()
+                if key is None:
+                    singles.append(op)
+                else:
+                    groups.setdefault(key, []).append(op)
+            for group in groups.values():
+                self._execute(group, _write_group)
+            for op in singles:
+                self._execute([op], _write_single)
+
+    def _execute(self, group: List[WriteOp], write: Callable[[List[WriteOp]], None]):
+        from services.client_pool import use_client
+        client = group[0].client.get()
+        if client is None:
+            # logout: sem JWT do usuário, a gravação não passaria no RLS
+            with self._idle:
+                self._stats["dropped"] += len(group)
+                self._in_flight -= len(group)
+                self._idle.notify_all()
+            logger.warning("write_queue: %d item(ns) de %s descartado(s): sessão encerrada.",
+                           len(group), group[0].table)
+            return
+        try:
+            with use_client(client, group[0].client.session):
+                write(group)
+        except Exception as e:
+            with self._idle:
+                self._stats["requests"] += 1
+                self._stats["last_error"] = f"{group[0].table}: {e}"
+            if len(group) > 1 and _rejected(e):
+                # lote recusado pela API: item a item, para isolar a(s) linha(s) ruim(ns)
+                logger.warning("write_queue: lote de %s recusado (%d itens), reenviando um a um: %s",
+                               group[0].table, len(group), e)
+                for op in group:
+                    self._execute([op], write)
+                return
+            dropped = 0
+            with self._idle:
+                self._in_flight -= len(group)
+                for op in group:
+                    op.attempts += 1
+                    if op.attempts >= MAX_ATTEMPTS:
+                        dropped += 1
+                        continue
+                    delay = min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * (2 ** (op.attempts - 1)))
+                    op.not_before = time.monotonic() + delay
+                    self._retry.append(op)
+                    self._stats["retries"] += 1
+                self._stats["dropped"] += dropped
+                self._idle.notify_all()
+            if dropped:
+                logger.error("write_queue: %d item(ns) de %s descartado(s) após %d tentativas: %s",
+                             dropped, group[0].table, MAX_ATTEMPTS, e)
+            else:
+                logger.warning("write_queue: falha em %s (%d item(ns)): %s", group[0].table, len(group), e)
+            return
+        with self._idle:
+            self._stats["requests"] += 1
+            self._stats["written_rows"] += len(group)
+            self._in_flight -= len(group)
+            self._idle.notify_all()
+
+
+def _rejected(e: Exception) -> bool:
+    """Erro da API (linha/dado inválido, com código) — não de rede/transporte."""
+    return getattr(e, "code", None) is not None
+
+
+def _coalesce_upserts(rows: List[Dict[str, Any]], on_conflict: str) -> List[Dict[str, Any]]:
+    """Mantém só a última linha por chave de conflito: o Postgres rejeita
+       um upsert que atualiza a mesma linha duas vezes no mesmo comando."""
+    cols = [c.strip() for c in on_conflict.split(",")]
+    latest: Dict[Tuple, Dict[str, Any]] = {}
+    for row in rows:
+        latest[tuple(row.get(c) for c in cols)] = row
+    return list(latest.values())
+
+
+def _write_group(ops: List[WriteOp]):
+    first = ops[0]
+    rows = [o.payload for o in ops]
+    if first.op == "upsert" and first.on_conflict:
+        rows = _coalesce_upserts(rows, first.on_conflict)
+    _write_rows(first.table, first.op, rows, first.on_conflict)
+
+
+def _write_single(ops: List[WriteOp]):
+    op = ops[0]
+    if op.op == "rpc":
+        from helpers import supabase
+        supabase.rpc(op.table, op.payload).execute()
+    else:
+        _write_update(op.table, op.payload, op.match)
+
+
+def _write_rows(table: str, kind: str, rows: List[Dict[str, Any]], on_conflict: Optional[str]):
+    from helpers import supabase
+    if kind == "insert":
+        supabase.table(table).insert(rows, returning="minimal").execute()
+    else:
+        supabase.table(table).upsert(rows, on_conflict=on_conflict or "", returning="minimal").execute()
+
+
+def _write_update(table: str, values: Dict[str, Any], match: Dict[str, Any]):
+    from helpers import supabase
+    q = supabase.table(table).update(values)
+    for col, val in match.items():
+        q = q.eq(col, val)
+    q.execute()
+
+
+@st.cache_resource
+def get_write_queue() -> WriteQueue:
+    wq = WriteQueue()
+    atexit.register(wq.shutdown)
+    return wq
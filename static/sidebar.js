@@ -0,0 +1,65 @@
+/* calorIA — sidebar no mobile: recolhe ao abrir e mostra overlay clicável.
+   Instalado no <head> do documento principal uma vez por sessão (helpers._install_theme_assets);
+   a guarda abaixo torna reinstalações inócuas. */
+(function () {
+  if (window.__caloriaSidebar) return;
+  window.__caloriaSidebar = true;
+
+  var observed = null;
+
+  function isMobile() {
+    return window.innerWidth <= 768;
+  }
+
+  function getSidebar() {
+    return document.querySelector('[data-testid="stSidebar"]');
+  }
+
+  function getOverlay() {
+    var overlay = document.getElementById('sidebarOverlay');
+    if (!overlay) {
+      overlay = document.createElement('div');
+      overlay.id = 'sidebarOverlay';
+      overlay.className = 'sidebar-overlay';
+      overlay.addEventListener('click', function () {
+        if (isMobile()) collapseSidebar();
+      });
+      document.body.appendChild(overlay);
+    }
+    return overlay;
+  }
+
+  function collapseSidebar() {
+    var sidebar = getSidebar();
+    var sidebarButton = document.querySelector('button[data-testid="baseButton-header"][aria-label*="sidebar"], button[data-testid="baseButton-header"][aria-label*="menu"]');
+    if (sidebar && sidebar.getAttribute('aria-expanded') === 'true' && sidebarButton) {
+      sidebarButton.click();
+    }
+  }
+
+  function syncOverlay() {
+    var sidebar = getSidebar();
+    var open = sidebar && sidebar.getAttribute('aria-expanded') === 'true';
+    getOverlay().classList.toggle('active', Boolean(isMobile() && open));
+  }
+
+  // O Streamlit recria a sidebar ao trocar de página: observa a atual
+  // e re-anexa quando o elemento muda.
+  function watchSidebar() {
+    var sidebar = getSidebar();
+    if (!sidebar || sidebar === observed) return;
+    observed = sidebar;
+    new MutationObserver(syncOverlay).observe(sidebar, {
+      attributes: true, attributeFilter: ['aria-expanded']
+    });
+    syncOverlay();
+  }
+
+  new MutationObserver(watchSidebar).observe(document.body, { childList: true, subtree: true });
+  window.addEventListener('resize', syncOverlay);
+
+  setTimeout(function () {
+    watchSidebar();
+    if (isMobile()) collapseSidebar();
+  }, 200);
+})();
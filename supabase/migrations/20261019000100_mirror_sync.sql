@@ -0,0 +1,47 @@
+-- Espelho local (services/local_mirror.py): pull incremental por
+-- updated_at e exclusões propagadas por tombstones (deleted_rows).
+
+create or replace function public.touch_updated_at() returns trigger
+language plpgsql as $$
+begin
+  new.updated_at := now();
+  return new;
+end $$;
+
+create table if not exists public.deleted_rows (
+  tbl        text        not null,
+  row_id     text        not null,
+  user_id    uuid        not null,
+  deleted_at timestamptz not null default now(),
+  primary key (tbl, row_id)
+);
+create index if not exists deleted_rows_user on public.deleted_rows (user_id, tbl, deleted_at);
+
+alter table public.deleted_rows enable row level security;
+drop policy if exists deleted_rows_owner on public.deleted_rows;
+create policy deleted_rows_owner on public.deleted_rows
+  for select using (user_id = auth.uid());
+
+create or replace function public.record_tombstone() returns trigger
+language plpgsql security definer set search_path = public as $$
+begin
+  insert into public.deleted_rows (tbl, row_id, user_id)
+  values (tg_table_name, old.id::text, old.user_id)
+  on conflict (tbl, row_id) do update set deleted_at = now();
+  return old;
+end $$;
+
+do $$
+declare t text;
+begin
+  foreach t in array array['food_diary', 'weight_logs', 'measurements', 'followups', 'fasting_log'] loop
+    execute format('alter table public.%I add column if not exists updated_at timestamptz not null default now()', t);
+    execute format('create index if not exists %I on public.%I (user_id, updated_at)', t || '_user_updated', t);
+    execute format('drop trigger if exists touch_updated_at on public.%I', t);
+    execute format('create trigger touch_updated_at before update on public.%I
+                    for each row execute function public.touch_updated_at()', t);
+    execute format('drop trigger if exists record_tombstone on public.%I', t);
+    execute format('create trigger record_tombstone after delete on public.%I
+                    for each row execute function public.record_tombstone()', t);
+  end loop;
+end $$;
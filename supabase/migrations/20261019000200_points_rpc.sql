@@ -0,0 +1,37 @@
+-- Pontos e badges atômicos (helpers.add_points / helpers.award_badge).
+
+-- Grava o evento e credita os pontos na mesma transação: evento
+-- repetido (user_id, event_type, event_key) não credita nada.
+create or replace function public.award_points(
+  p_user_id uuid, p_event_type text, p_event_key text, p_points int
+) returns boolean
+language plpgsql as $$
+declare n int;
+begin
+  insert into public.user_points_events (user_id, event_type, event_key, points)
+  values (p_user_id, p_event_type, p_event_key, p_points)
+  on conflict (user_id, event_type, event_key) do nothing;
+  get diagnostics n = row_count;
+  if n = 0 then
+    return false;
+  end if;
+  insert into public.user_points (user_id, points) values (p_user_id, p_points)
+  on conflict (user_id) do update
+    set points = coalesce(public.user_points.points, 0) + excluded.points, updated_at = now();
+  return true;
+end $$;
+
+-- Acrescenta o badge se ainda não houver um com o mesmo nome
+-- (append no servidor: duas concessões seguidas não se sobrescrevem).
+create or replace function public.award_badge(p_user_id uuid, p_badge jsonb) returns boolean
+language plpgsql as $$
+declare n int;
+begin
+  insert into public.user_points (user_id) values (p_user_id) on conflict (user_id) do nothing;
+  update public.user_points
+     set badges = coalesce(badges, '[]'::jsonb) || jsonb_build_array(p_badge), updated_at = now()
+   where user_id = p_user_id
+     and not coalesce(badges, '[]'::jsonb) @> jsonb_build_array(jsonb_build_object('name', p_badge->>'name'));
+  get diagnostics n = row_count;
+  return n > 0;
+end $$;
@@ -0,0 +1,26 @@
+-- Painel do coach (services/coach_cohort.py): agregados calculados no
+-- banco, em vez de trazer cada item do diário para o app.
+-- security invoker (padrão): valem as mesmas políticas RLS das tabelas.
+
+-- Total de kcal por (paciente, dia) desde p_since.
+create or replace function public.coach_diary_daily(p_user_ids uuid[], p_since date)
+returns table (user_id uuid, ref_date date, kcal numeric)
+language sql stable as $$
+  select d.user_id, d.ref_date, sum(d.kcal)::numeric
+    from public.food_diary d
+   where d.user_id = any(p_user_ids)
+     and d.ref_date >= p_since
+   group by d.user_id, d.ref_date
+   order by d.user_id, d.ref_date;
+$$;
+
+-- Último check-in de cada paciente, sem limite de janela.
+create or replace function public.coach_last_checkins(p_user_ids uuid[])
+returns table (user_id uuid, ultimo_checkin date)
+language sql stable as $$
+  select f.user_id, max(f.ref_date)
+    from public.followups f
+   where f.user_id = any(p_user_ids)
+   group by f.user_id
+   order by f.user_id;
+$$;
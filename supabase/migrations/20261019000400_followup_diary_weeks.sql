@@ -0,0 +1,13 @@
+-- Check-ins x resultados (services/followup_analytics.py): dias com
+-- registro no diário por (paciente, semana), contados no banco.
+-- security invoker (padrão): valem as políticas RLS de food_diary.
+
+create or replace function public.diary_days_per_week(p_user_ids uuid[])
+returns table (user_id uuid, semana date, dias int)
+language sql stable as $$
+  select d.user_id, date_trunc('week', d.ref_date)::date, count(distinct d.ref_date)::int
+    from public.food_diary d
+   where d.user_id = any(p_user_ids)
+   group by 1, 2
+   order by 1, 2;
+$$;
@@ -0,0 +1,35 @@
+-- Consumo de água (services/water.py): uma linha por (usuário, dia) com o
+-- total em ml. A fila de gravação faz upsert em lote com
+-- on_conflict=user_id,ref_date, que exige a restrição única abaixo.
+
+create table if not exists public.water_log (
+  id         bigint generated always as identity primary key,
+  user_id    uuid        not null references auth.users (id) on delete cascade,
+  ref_date   date        not null,
+  ml         integer     not null default 0 check (ml >= 0),
+  updated_at timestamptz not null default now(),
+  constraint water_log_user_day unique (user_id, ref_date)
+);
+
+drop trigger if exists touch_updated_at on public.water_log;
+create trigger touch_updated_at before update on public.water_log
+  for each row execute function public.touch_updated_at();
+
+-- Só o próprio usuário lê e grava (upsert = insert + update).
+alter table public.water_log enable row level security;
+
+drop policy if exists water_log_select on public.water_log;
+create policy water_log_select on public.water_log
+  for select using (user_id = auth.uid());
+
+drop policy if exists water_log_insert on public.water_log;
+create policy water_log_insert on public.water_log
+  for insert with check (user_id = auth.uid());
+
+drop policy if exists water_log_update on public.water_log;
+create policy water_log_update on public.water_log
+  for update using (user_id = auth.uid()) with check (user_id = auth.uid());
+
+drop policy if exists water_log_delete on public.water_log;
+create policy water_log_delete on public.water_log
+  for delete using (user_id = auth.uid());